@@ -0,0 +1,237 @@
+"""
+Inter-annotator agreement for projects where several annotators label the same task.
+Annotations are turned into one sparse label table per response_schema field: parallel arrays of
+(item, rater, category code), keeping each annotator's latest annotation per task. Values are compared nominally
+(equal JSON = same category). All metrics are computed with NumPy from those arrays, never per item in Python:
+- observed agreement and Fleiss' kappa (variable raters per item) over items with >= 2 ratings;
+- Krippendorff's alpha (nominal) from per-item category counts;
+- Cohen's kappa for annotator pairs (most active raters first, capped by max_pairs).
+Results are cached per (project, latest annotation id), so they are recomputed only after new annotations.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+
+AGREEMENT_CACHE_SIZE = 64
+FETCH_SIZE = 5000
+
+_cache_lock = threading.Lock()
+_results = OrderedDict()  # (project_id, latest_annotation_id, stage, max_pairs, min_overlap) -> result
+
+
+def _category(value) -> str | None:
+    """Nominal category for a label; empty values count as unlabeled."""
+    if value in (None, "", [], {}):
+        return None
+    return value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+
+
+class LabelTable:
+    """Sparse (item, rater, code) ratings for one field."""
+
+    def __init__(self, items: np.ndarray, raters: np.ndarray, codes: np.ndarray, n_categories: int):
+        self.items = items
+        self.raters = raters
+        self.codes = codes
+        self.n_categories = n_categories
+
+    def pairable(self) -> "LabelTable":
+        """Only ratings on items that at least two raters labelled."""
+        per_item = np.bincount(self.items)
+        keep = per_item[self.items] >= 2
+        return LabelTable(self.items[keep], self.raters[keep], self.codes[keep], self.n_categories)
+
+
+def _item_category_counts(table: LabelTable):
+    """Per-item rating count m_i, per-item sum of squared category counts S_i, and per-category totals n_c."""
+    keys = table.items.astype(np.int64) * table.n_categories + table.codes
+    uniq, counts = np.unique(keys, return_counts=True)
+    pair_items = uniq // table.n_categories
+    n_items = int(table.items.max()) + 1
+    m = np.bincount(table.items, minlength=n_items).astype(np.float64)
+    s = np.bincount(pair_items, weights=counts.astype(np.float64) ** 2, minlength=n_items)
+    n_c = np.bincount(table.codes, minlength=table.n_categories).astype(np.float64)
+    rated = m >= 2
+    return m[rated], s[rated], n_c
+
+
+def fleiss_kappa(table: LabelTable) -> tuple[float | None, float | None]:
+    """(observed agreement, Fleiss' kappa); items may have different numbers of raters."""
+    if table.codes.size == 0:
+        return None, None
+    m, s, n_c = _item_category_counts(table)
+    if m.size == 0:
+        return None, None
+    p_i = (s - m) / (m * (m - 1))
+    p_bar = float(p_i.mean())
+    p_j = n_c / n_c.sum()
+    p_e = float((p_j ** 2).sum())
+    kappa = None if p_e >= 1 else (p_bar - p_e) / (1 - p_e)
+    return p_bar, kappa
+
+
+def krippendorff_alpha(table: LabelTable) -> float | None:
+    """Krippendorff's alpha, nominal metric: 1 - D_o / D_e from the coincidence totals."""
+    if table.codes.size == 0:
+        return None
+    m, s, n_c = _item_category_counts(table)
+    n = float(m.sum())
+    if n <= 1:
+        return None
+    agreeing = float(((s - m) / (m - 1)).sum())  # sum of diagonal coincidences o_cc
+    expected = (n * n - float((n_c ** 2).sum())) / (n - 1)
+    if expected == 0:
+        return None
+    return 1 - (n - agreeing) / expected
+
+
+def cohen_kappa(codes_a: np.ndarray, codes_b: np.ndarray) -> float | None:
+    """Cohen's kappa for two raters over the items both labelled."""
+    n = codes_a.size
+    if n == 0:
+        return None
+    p_o = float((codes_a == codes_b).mean())
+    uniq, inverse = np.unique(np.concatenate([codes_a, codes_b]), return_inverse=True)
+    freq_a = np.bincount(inverse[:n], minlength=uniq.size) / n
+    freq_b = np.bincount(inverse[n:], minlength=uniq.size) / n
+    p_e = float((freq_a * freq_b).sum())
+    return None if p_e >= 1 else (p_o - p_e) / (1 - p_e)
+
+
+def pairwise_cohen(table: LabelTable, rater_ids: list, max_pairs: int, min_overlap: int) -> list[dict]:
+    """Cohen's kappa per rater pair among the most active raters (at most max_pairs pairs)."""
+    if table.codes.size == 0:
+        return []
+    activity = np.bincount(table.raters)
+    ranked = [int(r) for r in np.argsort(-activity, kind="stable") if activity[r] > 0]
+    top = 1
+    while top < len(ranked) and (top + 1) * top // 2 <= max_pairs:
+        top += 1
+    ranked = ranked[:top]
+    by_rater = {}
+    for r in ranked:
+        mask = table.raters == r
+        order = np.argsort(table.items[mask], kind="stable")
+        by_rater[r] = (table.items[mask][order], table.codes[mask][order])
+    pairs = []
+    for i, a in enumerate(ranked):
+        items_a, codes_a = by_rater[a]
+        for b in ranked[i + 1:]:
+            items_b, codes_b = by_rater[b]
+            _, ia, ib = np.intersect1d(items_a, items_b, assume_unique=True, return_indices=True)
+            if ia.size < min_overlap:
+                continue
+            ca, cb = codes_a[ia], codes_b[ib]
+            kappa = cohen_kappa(ca, cb)
+            pairs.append({
+                "annotator_a": rater_ids[a],
+                "annotator_b": rater_ids[b],
+                "items": int(ia.size),
+                "agreement": round(float((ca == cb).mean()), 4),
+                "cohen_kappa": None if kappa is None else round(kappa, 4),
+            })
+    return pairs
+
+
+def load_label_tables(db: Session, project_id: int, fields: list[str], stage: str | None) -> tuple[dict, list]:
+    """{field: LabelTable} from each annotator's latest annotation per task, plus the rater id list (index -> user id)."""
+    q = (
+        db.query(models.Annotation.task_id, models.Annotation.user_id, models.Annotation.response)
+        .join(models.Task, models.Task.id == models.Annotation.task_id)
+        .join(models.Batch, models.Batch.id == models.Task.batch_id)
+        .filter(models.Batch.project_id == project_id)
+        .order_by(models.Annotation.id)
+    )
+    if stage:
+        q = q.filter(models.Annotation.pipeline_stage == stage)
+    latest = {}
+    for task_id, user_id, response in q.yield_per(FETCH_SIZE):
+        latest[(task_id, user_id)] = response  # later ids overwrite earlier ones
+    item_index, rater_index, rater_ids = {}, {}, []
+    columns = {f: ([], [], []) for f in fields}
+    categories = {f: {} for f in fields}
+    for (task_id, user_id), response in latest.items():
+        if not isinstance(response, dict):
+            continue
+        item = item_index.setdefault(task_id, len(item_index))
+        if user_id not in rater_index:
+            rater_index[user_id] = len(rater_ids)
+            rater_ids.append(user_id)
+        rater = rater_index[user_id]
+        for f in fields:
+            cat = _category(response.get(f))
+            if cat is None:
+                continue
+            items, raters, codes = columns[f]
+            items.append(item)
+            raters.append(rater)
+            codes.append(categories[f].setdefault(cat, len(categories[f])))
+    tables = {
+        f: LabelTable(np.asarray(i, dtype=np.int64), np.asarray(r, dtype=np.int64), np.asarray(c, dtype=np.int64), max(len(categories[f]), 1))
+        for f, (i, r, c) in columns.items()
+    }
+    return tables, rater_ids
+
+
+def latest_annotation_id(db: Session, project_id: int) -> int:
+    return (
+        db.query(func.max(models.Annotation.id))
+        .join(models.Task, models.Task.id == models.Annotation.task_id)
+        .join(models.Batch, models.Batch.id == models.Task.batch_id)
+        .filter(models.Batch.project_id == project_id)
+        .scalar()
+    ) or 0
+
+
+def _round(v):
+    return None if v is None else round(float(v), 4)
+
+
+def project_agreement(db: Session, project: models.Project, stage: str | None = "L1", max_pairs: int = 300, min_overlap: int = 2) -> dict:
+    """Agreement per response_schema field (all response keys when the schema is empty); cached per latest annotation id."""
+    last_id = latest_annotation_id(db, project.id)
+    key = (project.id, last_id, stage, max_pairs, min_overlap)
+    with _cache_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+    fields = list((project.response_schema or {}).keys())
+    if not fields:
+        keys = set()
+        for (response,) in (
+            db.query(models.Annotation.response)
+            .join(models.Task, models.Task.id == models.Annotation.task_id)
+            .join(models.Batch, models.Batch.id == models.Task.batch_id)
+            .filter(models.Batch.project_id == project.id)
+            .limit(1000)
+        ):
+            if isinstance(response, dict):
+                keys.update(response.keys())
+        fields = sorted(keys)
+    tables, rater_ids = load_label_tables(db, project.id, fields, stage)
+    out = {}
+    for f, table in tables.items():
+        pairable = table.pairable()
+        observed, fleiss = fleiss_kappa(pairable)
+        out[f] = {
+            "ratings": int(table.codes.size),
+            "items_with_overlap": int(np.unique(pairable.items).size),
+            "annotators": int(np.unique(table.raters).size),
+            "categories": table.n_categories if table.codes.size else 0,
+            "percent_agreement": _round(observed),
+            "fleiss_kappa": _round(fleiss),
+            "krippendorff_alpha": _round(krippendorff_alpha(pairable)),
+            "pairs": pairwise_cohen(pairable, rater_ids, max_pairs, min_overlap),
+        }
+    result = {"project_id": project.id, "latest_annotation_id": last_id, "pipeline_stage": stage, "fields": out}
+    with _cache_lock:
+        _results[key] = result
+        while len(_results) > AGREEMENT_CACHE_SIZE:
+            _results.popitem(last=False)
+    return result
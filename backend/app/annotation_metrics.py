@@ -0,0 +1,91 @@
+"""
+Cheap response metrics stored on Annotation (word_count, field_count, char_length).
+Computed once when the annotation is written (queue submit) so reports sum columns instead of walking JSON.
+Rows written before the columns existed are filled by backfill(): started in the background at app startup,
+or run by hand with `python -m app.annotation_metrics [chunk_size]` from backend/.
+"""
+import logging
+import sys
+import threading
+
+from sqlalchemy import bindparam, select, update
+
+from . import models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def word_count(obj) -> int:
+    """Recursively sum word count from JSON (strings only)."""
+    if obj is None:
+        return 0
+    if isinstance(obj, str):
+        return len(obj.split())
+    if isinstance(obj, dict):
+        return sum(word_count(v) for v in obj.values())
+    if isinstance(obj, list):
+        return sum(word_count(v) for v in obj)
+    return 0
+
+
+def char_length(obj) -> int:
+    """Total characters across all string values."""
+    if isinstance(obj, str):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(char_length(v) for v in obj.values())
+    if isinstance(obj, list):
+        return sum(char_length(v) for v in obj)
+    return 0
+
+
+def field_count(obj) -> int:
+    """Top-level response fields that were filled in (not None, "", [] or {})."""
+    if isinstance(obj, dict):
+        return sum(1 for v in obj.values() if v not in (None, "", [], {}))
+    return 0 if obj in (None, "", [], {}) else 1
+
+
+def response_metrics(response) -> dict:
+    """Column values for an Annotation with this response."""
+    return {"word_count": word_count(response), "field_count": field_count(response), "char_length": char_length(response)}
+
+
+def backfill(chunk_size: int = BACKFILL_CHUNK_SIZE, stop: threading.Event | None = None) -> int:
+    """Fill metrics for annotations that have none, chunk by chunk in id order (one commit per chunk).
+    Checks stop between chunks, so shutdown waits for one chunk at most; the next run resumes. Returns rows updated."""
+    table = models.Annotation.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("_id"))
+        .values(word_count=bindparam("word_count"), field_count=bindparam("field_count"), char_length=bindparam("char_length"))
+    )
+    done, last_id = 0, 0
+    db = SessionLocal()
+    try:
+        while stop is None or not stop.is_set():
+            rows = db.execute(
+                select(table.c.id, table.c.response)
+                .where(table.c.word_count.is_(None), table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            db.connection().execute(stmt, [{"_id": ann_id, **response_metrics(response)} for ann_id, response in rows])
+            db.commit()
+            done += len(rows)
+            last_id = rows[-1][0]
+    finally:
+        db.close()
+    if done:
+        logger.info("Backfilled response metrics for %d annotation(s)", done)
+    return done
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else BACKFILL_CHUNK_SIZE
+    print(f"Backfilled {backfill(size)} annotation(s)")
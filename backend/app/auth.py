@@ -1,15 +1,19 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from .config import settings
-from .database import get_db
+from .database import AsyncSessionLocal, SessionLocal
 from . import models
+from .passwords import get_password_hash, pwd_context, verify_password  # noqa: F401 (re-exported)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer(auto_error=False)
 
 ROLES_OPS = ("super_admin", "admin", "ops_manager")
@@ -17,14 +21,6 @@ ROLES_ANNOTATOR = ("annotator", "ops_manager", "admin", "super_admin")
 ROLES_REVIEWER = ("reviewer", "ops_manager", "admin", "super_admin")
 
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.jwt_expire_minutes)
@@ -39,10 +35,67 @@ def decode_token(token: str) -> dict | None:
         return None
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> models.User:
+@dataclass(frozen=True)
+class Principal:
+    """What request handlers need to know about the caller; cached per user id (see get_current_user)."""
+    id: int
+    role: str
+    is_active: bool
+    workspace_ids: tuple = ()
+
+
+_principal_lock = threading.Lock()
+_principals = OrderedDict()  # user id -> (expires_at, Principal)
+PRINCIPAL_CACHE_METRICS = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _load_principal(db: Session, user_id: int) -> Principal | None:
+    row = (
+        db.query(models.User.id, models.User.role, models.User.is_active, models.User.workspace_ids)
+        .filter(models.User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    ws = row.workspace_ids if isinstance(row.workspace_ids, list) else []
+    return Principal(id=row.id, role=row.role, is_active=bool(row.is_active), workspace_ids=tuple(ws))
+
+
+def get_principal(db: Session, user_id: int) -> Principal | None:
+    """Principal for user_id from the LRU cache (principal_cache_ttl_seconds), loading it on a miss."""
+    now = time.monotonic()
+    with _principal_lock:
+        hit = _principals.get(user_id)
+        if hit and hit[0] > now:
+            _principals.move_to_end(user_id)
+            PRINCIPAL_CACHE_METRICS["hits"] += 1
+            return hit[1]
+    PRINCIPAL_CACHE_METRICS["misses"] += 1
+    principal = _load_principal(db, user_id)
+    if principal is not None and settings.principal_cache_ttl_seconds > 0:
+        with _principal_lock:
+            _principals[user_id] = (now + settings.principal_cache_ttl_seconds, principal)
+            _principals.move_to_end(user_id)
+            while len(_principals) > settings.principal_cache_max_entries:
+                _principals.popitem(last=False)
+    return principal
+
+
+def invalidate_principal(user_id: int | None = None):
+    """Drop one cached principal (all when user_id is None), e.g. after a role change or deactivation."""
+    with _principal_lock:
+        if user_id is None:
+            _principals.clear()
+        else:
+            _principals.pop(user_id, None)
+    PRINCIPAL_CACHE_METRICS["invalidations"] += 1
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Principal:
+    """Caller from the bearer token. Served from the principal cache, so most requests run no user query;
+    load the models.User row only where the full record is needed (e.g. /auth/me).
+    Async (as are the require_* checks) so resolving the caller never takes a threadpool slot; a cache miss
+    loads the user on a short-lived AsyncSession."""
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -52,37 +105,73 @@ def get_current_user(
     payload = decode_token(credentials.credentials)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = db.query(models.User).filter(models.User.id == int(payload["sub"])).first()
+    async with AsyncSessionLocal() as db:
+        user = await db.run_sync(get_principal, int(payload["sub"]))
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="User not found or inactive")
     return user
 
 
-def require_super_admin(user: models.User = Depends(get_current_user)) -> models.User:
+def load_current_user(db: Session, user: Principal) -> models.User:
+    """The caller's models.User row. 401 if it is gone: the principal may still be cached (deleted in another worker
+    or outside the ORM), so it is dropped here too."""
+    row = db.get(models.User, user.id)
+    if row is None:
+        invalidate_principal(user.id)
+        raise HTTPException(status_code=401, detail="User not found or inactive")
+    return row
+
+
+async def require_super_admin(user: Principal = Depends(get_current_user)) -> Principal:
     if user.role != "super_admin":
         raise HTTPException(status_code=403, detail="Super Admin required")
     return user
 
 
-def require_admin(user: models.User = Depends(get_current_user)) -> models.User:
+async def require_admin(user: Principal = Depends(get_current_user)) -> Principal:
     if user.role not in ("super_admin", "admin"):
         raise HTTPException(status_code=403, detail="Admin or Super Admin required")
     return user
 
 
-def require_ops(user: models.User = Depends(get_current_user)) -> models.User:
+async def require_ops(user: Principal = Depends(get_current_user)) -> Principal:
     if user.role not in ROLES_OPS:
         raise HTTPException(status_code=403, detail="Operation Manager (or Admin) required")
     return user
 
 
-def require_annotator(user: models.User = Depends(get_current_user)) -> models.User:
+async def require_annotator(user: Principal = Depends(get_current_user)) -> Principal:
     if user.role not in ROLES_ANNOTATOR:
         raise HTTPException(status_code=403, detail="Annotator access required")
     return user
 
 
-def require_reviewer(user: models.User = Depends(get_current_user)) -> models.User:
+async def require_reviewer(user: Principal = Depends(get_current_user)) -> Principal:
     if user.role not in ROLES_REVIEWER:
         raise HTTPException(status_code=403, detail="Reviewer access required")
     return user
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_user_changes(session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, models.User) and obj.id is not None:
+            session.info.setdefault("principals_changed", set()).add(obj.id)
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _track_bulk_user_writes(state):
+    """Bulk UPDATE / DELETE on users leaves no objects to diff: drop every cached principal on commit."""
+    if (state.is_update or state.is_delete) and any(m.class_ is models.User for m in state.all_mappers):
+        state.session.info.setdefault("principals_changed", set()).add(None)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("principals_changed", ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_user_changes(session):
+    session.info.pop("principals_changed", None)
@@ -0,0 +1,215 @@
+"""
+Small read-through cache for the insight endpoints.
+Entries live for insight_cache_ttl_seconds and are tagged with a global generation; committed ORM writes to projects,
+workspaces, users or the rollup checkpoints bump it, so those changes show up on the next read.
+Task-level writes happen on every queue call (ORM saves / submits / reviews to tasks, annotations, task events and
+batches; Core claims, lease release, reaper, ingestion), so they bump the generation of the projects they touched
+instead: entries cached with project_id= (per-project reports) are dropped, the aggregate dashboards keep serving
+until their TTL runs out.
+Each entry carries an ETag so dashboards can poll with If-None-Match and get 304s.
+With cache_redis_url set (and the redis package installed) the generation and entries are shared by all workers;
+otherwise everything stays in-process.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from sqlalchemy import event, select
+from sqlalchemy.orm.attributes import get_history
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+from .task_stats import on_commit
+
+logger = logging.getLogger(__name__)
+
+_WATCHED = (models.Project, models.Workspace, models.User, models.RollupCheckpoint)  # global bump
+_PROJECT_SCOPED = (models.Task, models.Batch, models.Annotation, models.TaskEvent)  # bump the touched projects
+_DIRTY_KEY = "cache_dirty"
+_DIRTY_PROJECTS_KEY = "cache_dirty_projects"
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> ((generation, project generation), expires_at, value, etag)
+_generation = 0
+_project_generations = {}  # project_id -> counter-move bumps
+_redis = None
+
+CACHE_METRICS = {"hits": 0, "misses": 0, "generation_bumps": 0, "project_generation_bumps": 0}
+
+
+def _shared_store():
+    """redis client when cache_redis_url is configured and usable, else None (in-process only)."""
+    global _redis
+    if not settings.cache_redis_url:
+        return None
+    if _redis is None:
+        try:
+            import redis
+            _redis = redis.Redis.from_url(settings.cache_redis_url)
+            _redis.ping()
+        except Exception as e:  # missing package or unreachable server: fall back to in-process
+            logger.warning("Shared cache unavailable (%s); using in-process cache", e)
+            _redis = False
+    return _redis or None
+
+
+def generation() -> int:
+    store = _shared_store()
+    if store is not None:
+        return int(store.get("insight:generation") or 0)
+    return _generation
+
+
+def _generations(project_id: int | None) -> tuple:
+    """(global, project) generation an entry for project_id is valid for; project part is None for unscoped entries."""
+    if project_id is None:
+        return generation(), None
+    store = _shared_store()
+    if store is not None:
+        glob, proj = store.mget("insight:generation", f"insight:generation:{project_id}")
+        return int(glob or 0), int(proj or 0)
+    return _generation, _project_generations.get(project_id, 0)
+
+
+def bump_generation():
+    """Invalidate every cached entry (called after commits that touch watched tables)."""
+    global _generation
+    store = _shared_store()
+    if store is not None:
+        store.incr("insight:generation")
+    with _lock:
+        _generation += 1
+        _entries.clear()
+    CACHE_METRICS["generation_bumps"] += 1
+
+
+def bump_project_generations(project_ids):
+    """Invalidate the entries cached for these projects (project_id=...); unscoped entries are left to their TTL."""
+    project_ids = {pid for pid in project_ids if pid is not None}
+    if not project_ids:
+        return
+    store = _shared_store()
+    if store is not None:
+        pipe = store.pipeline()
+        for pid in project_ids:
+            pipe.incr(f"insight:generation:{pid}")
+        pipe.execute()
+    with _lock:
+        for pid in project_ids:
+            _project_generations[pid] = _project_generations.get(pid, 0) + 1
+    CACHE_METRICS["project_generation_bumps"] += len(project_ids)
+
+
+def _etag(value) -> str:
+    return '"' + hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:20] + '"'
+
+
+def peek(key: tuple, project_id: int | None = None):
+    """Cached value for key if present and current, without computing (in-process entries only)."""
+    gen = _generations(project_id)
+    with _lock:
+        hit = _entries.get(key)
+        if hit and hit[0] == gen and hit[1] > time.monotonic():
+            CACHE_METRICS["hits"] += 1
+            return hit[2]
+    return None
+
+
+def get_or_compute(key: tuple, compute, project_id: int | None = None) -> tuple:
+    """Cached (value, etag) for key, computing and storing it on a miss. value must be JSON-serialisable.
+    project_id: the value depends on that project's task counters, so Core claims / releases there invalidate it."""
+    gen = _generations(project_id)
+    now = time.monotonic()
+    store = _shared_store()
+    store_key = f"insight:{gen[0]}:{gen[1]}:{json.dumps(key, default=str)}"
+    with _lock:
+        hit = _entries.get(key)
+        if hit and hit[0] == gen and hit[1] > now:
+            _entries.move_to_end(key)
+            CACHE_METRICS["hits"] += 1
+            return hit[2], hit[3]
+    if store is not None:
+        raw = store.get(store_key)
+        if raw is not None:
+            value, etag = json.loads(raw)
+            CACHE_METRICS["hits"] += 1
+            return value, etag
+    CACHE_METRICS["misses"] += 1
+    value = compute()
+    etag = _etag(value)
+    if store is not None:
+        store.setex(store_key, settings.insight_cache_ttl_seconds, json.dumps([value, etag], default=str))
+    with _lock:
+        _entries[key] = (gen, now + settings.insight_cache_ttl_seconds, value, etag)
+        _entries.move_to_end(key)
+        while len(_entries) > settings.insight_cache_max_entries:
+            _entries.popitem(last=False)
+    return value, etag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+def _values(obj, attr: str) -> set:
+    """Current and pre-flush values of obj.attr (both sides of a move)."""
+    hist = get_history(obj, attr)
+    return {v for v in chain(hist.added, hist.unchanged, hist.deleted) if v is not None}
+
+
+def _touched_projects(session, objs) -> set:
+    """Project ids of the task-level objects flushed; batch / task ids are resolved in one query each."""
+    project_ids, batch_ids, task_ids = set(), set(), set()
+    for obj in objs:
+        if isinstance(obj, models.TaskEvent):
+            project_ids |= _values(obj, "project_id")
+        elif isinstance(obj, models.Batch):
+            project_ids |= _values(obj, "project_id")
+        elif isinstance(obj, models.Task):
+            batch_ids |= _values(obj, "batch_id")
+        elif isinstance(obj, models.Annotation):
+            task_ids |= _values(obj, "task_id")
+    if task_ids:
+        batch_ids |= set(session.scalars(select(models.Task.batch_id).where(models.Task.id.in_(task_ids))))
+    if batch_ids:
+        project_ids |= set(session.scalars(select(models.Batch.project_id).where(models.Batch.id.in_(batch_ids))))
+    return project_ids
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_dirty(session, flush_context):
+    flushed = list(chain(session.new, session.dirty, session.deleted))
+    if any(isinstance(obj, _WATCHED) for obj in flushed):
+        session.info[_DIRTY_KEY] = True
+    scoped = [obj for obj in flushed if isinstance(obj, _PROJECT_SCOPED)]
+    if scoped:
+        session.info.setdefault(_DIRTY_PROJECTS_KEY, set()).update(_touched_projects(session, scoped))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _bump_on_commit(session):
+    projects = session.info.pop(_DIRTY_PROJECTS_KEY, None)
+    if session.info.pop(_DIRTY_KEY, False):
+        bump_generation()
+    elif projects:
+        bump_project_generations(projects)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _clear_on_rollback(session):
+    session.info.pop(_DIRTY_KEY, None)
+    session.info.pop(_DIRTY_PROJECTS_KEY, None)
+
+
+@on_commit
+def _bump_on_counter_change(changes):
+    # Core task writes (claims, lease release, reaper, ingestion) never flush ORM objects, so _mark_dirty misses them
+    bump_project_generations(pid for pid, _ in changes)
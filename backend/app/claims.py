@@ -0,0 +1,137 @@
+"""
+Atomic task claiming for the annotator queue.
+Pick + claim happen in a single UPDATE so concurrent "next" calls never hand out the same task.
+SQLite: conditional UPDATE ... WHERE claimed_by_id IS NULL RETURNING, retried when the writer lock is busy.
+PostgreSQL: UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) so claimers skip each other's rows.
+Every UPDATE returns the batch_id of the rows it moved so project_task_stats is adjusted in the same transaction,
+and bumps Task.version_id so an ORM update based on the row as it was before fails instead of miscounting.
+"""
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import String, cast, or_, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from . import models
+from .task_stats import apply_batch_deltas, moved
+
+CLAIM_MAX_RETRIES = 8
+CLAIM_RETRY_BASE_SECONDS = 0.005
+
+
+def _is_lock_error(exc: OperationalError) -> bool:
+    msg = str(getattr(exc, "orig", exc)).lower()
+    return "locked" in msg or "busy" in msg
+
+
+def draft_is_empty():
+    """Task has no saved draft. Cleared drafts are stored as JSON 'null', not SQL NULL."""
+    return or_(models.Task.draft_response.is_(None), cast(models.Task.draft_response, String) == "null")
+
+
+def _claimable_filter(batch_id: int):
+    """Oldest-first queue filter: pending, unclaimed L1 tasks of the batch."""
+    return (
+        models.Task.batch_id == batch_id,
+        models.Task.status == "pending",
+        models.Task.claimed_by_id.is_(None),
+        models.Task.pipeline_stage == "L1",
+    )
+
+
+def _claim_candidates(batch_id: int, limit: int):
+    """SELECT id of the next `limit` claimable tasks, oldest first (served by the partial ix_tasks_queue_pick)."""
+    return select(models.Task.id).where(*_claimable_filter(batch_id)).order_by(models.Task.created_at, models.Task.id).limit(limit)
+
+
+def _run_claim(db: Session, stmt) -> list:
+    """Execute a claim UPDATE ... RETURNING id, batch_id; retry with jittered backoff on SQLite lock contention."""
+    for attempt in range(CLAIM_MAX_RETRIES):
+        try:
+            return db.execute(stmt, execution_options={"synchronize_session": False}).all()
+        except OperationalError as e:
+            db.rollback()
+            if not _is_lock_error(e) or attempt == CLAIM_MAX_RETRIES - 1:
+                raise
+            time.sleep(CLAIM_RETRY_BASE_SECONDS * (2 ** attempt) * (1 + random.random()))
+    return []
+
+
+def claim_next_tasks(db: Session, batch_id: int, user_id: int, limit: int = 1, lease_expires_at: datetime | None = None) -> list[int]:
+    """Claim up to `limit` oldest pending L1 tasks in the batch for user_id in one statement.
+    lease_expires_at marks the block as a lease (see release_unused_leases). Returns claimed task ids (unordered). Caller commits."""
+    now = datetime.utcnow()
+    candidates = _claim_candidates(batch_id, limit)
+    if db.get_bind().dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+    stmt = (
+        update(models.Task)
+        .where(
+            models.Task.id.in_(candidates.scalar_subquery()),
+            # Re-checked on the row itself: a concurrent claimer that won the row makes this a no-op
+            models.Task.claimed_by_id.is_(None),
+            models.Task.status == "pending",
+        )
+        .values(claimed_by_id=user_id, claimed_at=now, status="in_progress", lease_expires_at=lease_expires_at, updated_at=now, version_id=models.Task.version_id + 1)
+        .returning(models.Task.id, models.Task.batch_id)
+    )
+    rows = _run_claim(db, stmt)
+    apply_batch_deltas(db, moved(rows, ("L1", "pending"), ("L1", "in_progress")))
+    return [row.id for row in rows]
+
+
+def claim_specific_task(db: Session, task_id: int, user_id: int, force: bool = False) -> bool:
+    """Claim one task by id. Only succeeds if unclaimed or already ours, unless force (Ops reassign).
+    Returns False if another user holds it. Caller commits."""
+    now = datetime.utcnow()
+    # The task may be in any stage/status; the UPDATE is pinned to the state we read so the counters move the
+    # right row. If someone changes it in between we read again.
+    for _ in range(CLAIM_MAX_RETRIES):
+        current = db.execute(
+            select(models.Task.batch_id, models.Task.pipeline_stage, models.Task.status, models.Task.claimed_by_id)
+            .where(models.Task.id == task_id)
+        ).first()
+        if current is None or (not force and current.claimed_by_id not in (None, user_id)):
+            return False
+        stmt = update(models.Task).where(
+            models.Task.id == task_id,
+            models.Task.pipeline_stage == current.pipeline_stage,
+            models.Task.status == current.status,
+        )
+        if not force:
+            stmt = stmt.where((models.Task.claimed_by_id.is_(None)) | (models.Task.claimed_by_id == user_id))
+        stmt = stmt.values(claimed_by_id=user_id, claimed_at=now, status="in_progress", lease_expires_at=None, updated_at=now, version_id=models.Task.version_id + 1)
+        rows = _run_claim(db, stmt.returning(models.Task.id, models.Task.batch_id))
+        if rows:
+            apply_batch_deltas(db, moved(rows, (current.pipeline_stage, current.status), (current.pipeline_stage, "in_progress")))
+            return True
+    return False
+
+
+def release_unused_leases(
+    db: Session,
+    user_id: int | None = None,
+    batch_id: int | None = None,
+    expired_only: bool = True,
+) -> int:
+    """Return leased tasks that were never worked on (still in_progress, no draft) to the pending pool.
+    expired_only=False releases every unused lease of the user (explicit hand-back). Returns rows released. Caller commits."""
+    now = datetime.utcnow()
+    stmt = update(models.Task).where(
+        models.Task.lease_expires_at.isnot(None),
+        models.Task.status == "in_progress",
+        models.Task.pipeline_stage == "L1",
+        draft_is_empty(),
+    )
+    if expired_only:
+        stmt = stmt.where(models.Task.lease_expires_at < now)
+    if user_id is not None:
+        stmt = stmt.where(models.Task.claimed_by_id == user_id)
+    if batch_id is not None:
+        stmt = stmt.where(models.Task.batch_id == batch_id)
+    stmt = stmt.values(claimed_by_id=None, claimed_at=None, status="pending", lease_expires_at=None, updated_at=now, version_id=models.Task.version_id + 1)
+    rows = _run_claim(db, stmt.returning(models.Task.id, models.Task.batch_id))
+    apply_batch_deltas(db, moved(rows, ("L1", "in_progress"), ("L1", "pending")))
+    return len(rows)
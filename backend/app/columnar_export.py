@@ -0,0 +1,149 @@
+"""
+Columnar (Parquet / Arrow IPC) export of a project's tasks and latest annotations for ML pipelines.
+Each key of Project.response_schema becomes its own typed column "response.<key>"; rows are written in
+row groups of EXPORT_ROW_GROUP_SIZE so memory stays bounded. Requires the optional pyarrow package.
+"""
+import json
+from typing import Iterable, Iterator
+
+EXPORT_ROW_GROUP_SIZE = 10_000
+
+# response_schema value -> column kind; anything else (free_text, single_select, "A, B, C" options) is a string
+_SCHEMA_KINDS = {
+    "number": "float", "float": "float", "decimal": "float", "rating": "float",
+    "integer": "int", "int": "int", "count": "int",
+    "boolean": "bool", "bool": "bool", "checkbox": "bool", "yes_no": "bool",
+    "multi_select": "list", "multiselect": "list", "multi-select": "list", "tags": "list",
+}
+
+
+def require_pyarrow():
+    """Import pyarrow lazily; None if it is not installed."""
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def field_kind(spec) -> str:
+    if isinstance(spec, dict):
+        spec = spec.get("type")
+    return _SCHEMA_KINDS.get(str(spec or "").strip().lower(), "str")
+
+
+def _coerce(kind: str, value):
+    """Best-effort conversion of one response value to the column kind; unconvertible values become null."""
+    if value is None or value == "":
+        return None
+    try:
+        if kind == "float":
+            return float(value)
+        if kind == "int":
+            return int(value)
+        if kind == "bool":
+            if isinstance(value, str):
+                lowered = value.strip().lower()
+                if lowered in ("true", "yes", "1", "y"):
+                    return True
+                if lowered in ("false", "no", "0", "n"):
+                    return False
+                return None
+            return bool(value)
+        if kind == "list":
+            if isinstance(value, list):
+                return [str(v) for v in value]
+            return [v.strip() for v in str(value).split(",") if v.strip()]
+    except (TypeError, ValueError):
+        return None
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+
+def build_schema(pa, response_schema: dict):
+    """Arrow schema: fixed task/annotation columns + one typed column per response_schema key."""
+    types = {"float": pa.float64(), "int": pa.int64(), "bool": pa.bool_(), "list": pa.list_(pa.string()), "str": pa.string()}
+    ts = pa.timestamp("us")
+    fields = [
+        pa.field("task_id", pa.int64(), nullable=False),
+        pa.field("batch_id", pa.int64()),
+        pa.field("batch_name", pa.string()),
+        pa.field("status", pa.string()),
+        pa.field("pipeline_stage", pa.string()),
+        pa.field("claimed_by_id", pa.int64()),
+        pa.field("assigned_reviewer_id", pa.int64()),
+        pa.field("rework_count", pa.int32()),
+        pa.field("created_at", ts),
+        pa.field("updated_at", ts),
+        pa.field("content", pa.string()),
+        pa.field("annotation_id", pa.int64()),
+        pa.field("annotator_id", pa.int64()),
+        pa.field("annotation_stage", pa.string()),
+        pa.field("annotated_at", ts),
+    ]
+    for key, spec in (response_schema or {}).items():
+        fields.append(pa.field(f"response.{key}", types[field_kind(spec)]))
+    # Keys present in responses but not declared in the schema, kept as JSON
+    fields.append(pa.field("response_extra", pa.string()))
+    return pa.schema(fields)
+
+
+def _columns_for(rows: list, response_schema: dict) -> dict:
+    kinds = {key: field_kind(spec) for key, spec in (response_schema or {}).items()}
+    cols = {name: [] for name in (
+        "task_id", "batch_id", "batch_name", "status", "pipeline_stage", "claimed_by_id", "assigned_reviewer_id",
+        "rework_count", "created_at", "updated_at", "content", "annotation_id", "annotator_id", "annotation_stage",
+        "annotated_at", "response_extra",
+    )}
+    for key in kinds:
+        cols[f"response.{key}"] = []
+    for row in rows:
+        (task_id, batch_id, batch_name, status, stage, content, claimed_by_id, reviewer_id, rework_count,
+         created_at, updated_at, ann_id, ann_user_id, ann_response, ann_stage, ann_created_at) = row
+        cols["task_id"].append(task_id)
+        cols["batch_id"].append(batch_id)
+        cols["batch_name"].append(batch_name)
+        cols["status"].append(status)
+        cols["pipeline_stage"].append(stage)
+        cols["claimed_by_id"].append(claimed_by_id)
+        cols["assigned_reviewer_id"].append(reviewer_id)
+        cols["rework_count"].append(rework_count or 0)
+        cols["created_at"].append(created_at)
+        cols["updated_at"].append(updated_at)
+        cols["content"].append(json.dumps(content or {}, default=str))
+        cols["annotation_id"].append(ann_id)
+        cols["annotator_id"].append(ann_user_id)
+        cols["annotation_stage"].append(ann_stage)
+        cols["annotated_at"].append(ann_created_at)
+        response = ann_response if isinstance(ann_response, dict) else {}
+        for key, kind in kinds.items():
+            cols[f"response.{key}"].append(_coerce(kind, response.get(key)))
+        extra = {k: v for k, v in response.items() if k not in kinds}
+        cols["response_extra"].append(json.dumps(extra, default=str) if extra else None)
+    return cols
+
+
+def iter_columnar(rows: Iterable, response_schema: dict, fmt: str, sink) -> Iterator[None]:
+    """Write rows to sink as Parquet ("parquet") or Arrow IPC file ("arrow"), one row group per
+    EXPORT_ROW_GROUP_SIZE rows; yields after each group so the caller can drain the sink."""
+    pa = require_pyarrow()
+    schema = build_schema(pa, response_schema)
+    out = pa.PythonFile(sink, mode="w")
+    if fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(out, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(out, schema)
+    try:
+        group = []
+        for row in rows:
+            group.append(row)
+            if len(group) >= EXPORT_ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_pydict(_columns_for(group, response_schema), schema=schema))
+                group = []
+                yield
+        if group:
+            writer.write_table(pa.Table.from_pydict(_columns_for(group, response_schema), schema=schema))
+    finally:
+        writer.close()
+    yield
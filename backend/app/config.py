@@ -3,10 +3,50 @@ from pathlib import Path
 
 
 class Settings(BaseSettings):
-    database_url: str = "sqlite:///./annotation_studio.db"
+    database_url: str = "sqlite:///./annotation_studio.db"  # or postgresql+psycopg://user:pw@host/db (see app.pg_copy)
+    async_database_url: str = ""  # async routers' engine; "" = database_url with aiosqlite / asyncpg
+    db_pool_size: int = 10  # persistent connections per engine (sync and async; file SQLite and server databases)
+    db_max_overflow: int = 20  # extra connections under bursts
+    db_pool_timeout_seconds: int = 30  # wait for a free connection before failing
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True  # server databases: test connections on checkout
+    sqlite_journal_mode: str = "wal"  # "" keeps the file's current mode
+    sqlite_busy_timeout_ms: int = 30000  # wait for the write lock instead of "database is locked"; async writers can hold it across awaits
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456  # 256 MiB; 0 disables memory-mapped reads
     jwt_secret: str = "annotation-studio-v1-secret-change-in-production"
     jwt_algorithm: str = "HS256"
     jwt_expire_minutes: int = 60 * 24 * 7  # 7 days
+    password_hash_workers: int = 0  # bcrypt process pool for login; 0 = half the CPUs
+    password_hash_max_pending: int = 0  # hash/verify calls admitted at once before 429; 0 = 8 per worker
+    principal_cache_ttl_seconds: int = 30  # authenticated-user cache in auth.get_current_user; 0 disables
+    principal_cache_max_entries: int = 10000
+    queue_lease_size: int = 10  # default tasks handed out per /queue/lease call
+    queue_lease_max_size: int = 100
+    queue_lease_minutes: int = 30  # unused leased tasks go back to the pool after this
+    claim_ttl_minutes: int = 240  # in_progress claims older than this are released (per-project override: Project.claim_ttl_minutes)
+    reaper_enabled: bool = True
+    reaper_interval_seconds: int = 60
+    tasks_page_size: int = 100  # /tasks page size when a cursor is given without limit
+    tasks_page_size_max: int = 1000
+    tasks_count_cache_seconds: int = 60  # X-Total-Count reuse per filter set
+    ingest_chunk_size: int = 5000  # rows per INSERT/COPY chunk in bulk ingestion
+    ingest_use_copy: bool = True  # PostgreSQL (psycopg/psycopg2): COPY instead of multi-row INSERT
+    upload_max_row_errors: int = 1000  # per-row errors reported back for one batch upload
+    rollups_enabled: bool = True
+    rollup_interval_seconds: int = 60  # throughput_hourly / throughput_daily aggregator
+    rollup_settle_seconds: int = 5  # rows younger than this wait for the next pass
+    export_cursor_settle_seconds: int = 300  # delta exports re-read this far behind the previous cursor (rows committed late)
+    insight_cache_ttl_seconds: int = 30  # /insight responses; committed writes invalidate earlier
+    insight_cache_max_entries: int = 512
+    cache_redis_url: str = ""  # e.g. redis://localhost:6379/0 to share the insight cache between workers (needs redis)
+    insight_stream_heartbeat_seconds: int = 15  # SSE keep-alive comment on idle /insight/stream connections
+    insight_stream_queue_size: int = 256  # per-connection backlog before it is collapsed into a resync
+    event_broker_url: str = ""  # e.g. redis://localhost:6379/0 to fan /insight/stream events out across workers (needs redis)
+    forecast_enabled: bool = True
+    forecast_interval_seconds: int = 30  # re-forecast projects whose counters or assignments changed
+    forecast_full_interval_seconds: int = 3600  # every project (rates drift as the window moves)
+    forecast_window_days: int = 14  # throughput history used for rates
     upload_dir: Path = Path(__file__).resolve().parent.parent / "uploads"
 
     class Config:
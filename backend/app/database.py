@@ -1,23 +1,150 @@
-from sqlalchemy import create_engine
+"""
+Engine, session factory and declarative base.
+SQLite files get WAL journaling (readers no longer block on the writer), busy_timeout (wait for the write lock instead
+of failing with "database is locked"), synchronous=NORMAL (safe with WAL, far fewer fsyncs) and mmap_size, set on
+every new connection. Server databases get a sized QueuePool with pre-ping and recycling. All knobs live in
+config.Settings (db_* / sqlite_*); pool_status() reports pool use for GET /db/pool.
+Next to the sync engine is an async one on the same database (aiosqlite / asyncpg, see _async_url) for async def
+endpoints: get_async_db yields an AsyncSession whose flush/commit hooks are the SessionLocal ones, and sync helpers
+taking a Session run on it through `await db.run_sync(helper, ...)`.
+"""
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
 
+_is_sqlite = settings.database_url.startswith("sqlite")
+_is_sqlite_memory = _is_sqlite and (":memory:" in settings.database_url or settings.database_url.rstrip("/") == "sqlite:")
+
 connect_args = {}
-if settings.database_url.startswith("sqlite"):
+engine_args = {}
+if _is_sqlite:
     connect_args["check_same_thread"] = False
+    connect_args["timeout"] = settings.sqlite_busy_timeout_ms / 1000  # driver-level wait, same as busy_timeout
+if not _is_sqlite_memory:
+    engine_args.update(
+        poolclass=QueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping and not _is_sqlite,  # a local file can't drop the connection
+    )
+
+
+def _async_url(url: str) -> str:
+    """database_url with an async driver: sqlite -> aiosqlite, postgresql -> asyncpg (psycopg 3 is async already)."""
+    if settings.async_database_url:
+        return settings.async_database_url
+    backend, sep, rest = url.partition("://")
+    dialect, _, driver = backend.partition("+")
+    if dialect == "sqlite":
+        driver = "aiosqlite"
+    elif dialect == "postgresql" and driver in ("", "psycopg2"):
+        driver = "asyncpg"
+    return f"{dialect}+{driver}{sep}{rest}" if driver else url
+
 
 engine = create_engine(
     settings.database_url,
     connect_args=connect_args,
     echo=False,
+    **engine_args,
+)
+async_engine = create_async_engine(
+    _async_url(settings.database_url),
+    connect_args=connect_args,
+    echo=False,
+    **({**engine_args, "poolclass": AsyncAdaptedQueuePool} if engine_args else {}),
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Same Session subclass as SessionLocal, so its after_flush / after_commit listeners (task_stats, cache, ...) apply.
+# Objects stay loaded after commit: an expired attribute can't lazy-load outside run_sync.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, sync_session_class=SessionLocal.class_, autoflush=False, expire_on_commit=False,
+)
 Base = declarative_base()
 
 
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    if not _is_sqlite:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}")
+        if not _is_sqlite_memory and settings.sqlite_journal_mode:
+            cursor.execute(f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+        if settings.sqlite_synchronous:
+            cursor.execute(f"PRAGMA synchronous = {settings.sqlite_synchronous}")
+        if settings.sqlite_mmap_size:
+            cursor.execute(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}")
+    finally:
+        cursor.close()
+
+
+_metrics_lock = threading.Lock()
+POOL_METRICS = {"connects": 0, "checkouts": 0, "peak_checked_out": 0, "invalidated": 0}
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def _count_connect(dbapi_connection, connection_record):
+    POOL_METRICS["connects"] += 1
+
+
+@event.listens_for(engine, "checkout")
+@event.listens_for(async_engine.sync_engine, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    with _metrics_lock:
+        POOL_METRICS["checkouts"] += 1
+        out = sum(p.checkedout() for p in (engine.pool, async_engine.pool) if isinstance(p, QueuePool))
+        POOL_METRICS["peak_checked_out"] = max(POOL_METRICS["peak_checked_out"], out)
+
+
+@event.listens_for(engine, "invalidate")
+@event.listens_for(async_engine.sync_engine, "invalidate")
+def _count_invalidate(dbapi_connection, connection_record, exception):
+    POOL_METRICS["invalidated"] += 1
+
+
+def _describe_pool(pool) -> dict:
+    out = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        out.update({
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity > 0 else None,
+        })
+    return out
+
+
+def pool_status() -> dict:
+    """Current pool use plus counters since startup (both engines); saturation = checked out / (pool_size + max_overflow)."""
+    out = {"dialect": engine.dialect.name, **_describe_pool(engine.pool), **POOL_METRICS}
+    out["async"] = {"driver": async_engine.dialect.driver, **_describe_pool(async_engine.pool)}
+    if _is_sqlite:
+        with engine.connect() as conn:
+            out["sqlite_journal_mode"] = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    return out
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,193 @@
+"""
+Pub/sub behind the live insight stream (/insight/stream, Server-Sent Events).
+Task counter moves (app.task_stats) are published once per commit. Each open stream is a Subscription with a bounded
+queue, and delivery is one loop callback per event loop for all of its subscribers: a thousand dashboards cost a
+thousand queue puts per commit instead of a thousand aggregate queries per polling interval. A subscriber that falls
+behind has its backlog replaced by a single "resync" message and re-reads the snapshot.
+The broker is swappable: InProcessBroker (default, one worker process), RedisBroker when settings.event_broker_url is
+set (all workers share one channel; any local redis-compatible server works as a stand-in), or set_broker() for tests.
+publish() runs inside the after_commit hook of the writing request, so it never waits on the network: RedisBroker hands
+messages to a publisher thread.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+
+from .config import settings
+from .task_stats import on_commit
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "insight:events"
+
+EVENT_METRICS = {"published": 0, "delivered": 0, "resyncs": 0, "subscribers": 0, "publish_dropped": 0}
+PUBLISH_QUEUE_SIZE = 10000  # RedisBroker messages waiting for the publisher thread
+
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+class Subscription:
+    """One consumer's bounded queue; iterate with `await sub.get()`. Close when the stream ends."""
+
+    def __init__(self, broker, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self._broker = broker
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, message: dict):
+        """Enqueue without blocking; a full queue is collapsed into a single resync message."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+            EVENT_METRICS["resyncs"] += 1
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fan-out to subscribers in this process. publish() may be called from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # event loop -> set of Subscription
+
+    def subscribe(self, maxsize: int | None = None) -> Subscription:
+        """Must be called from the event loop that will consume the subscription."""
+        sub = Subscription(self, asyncio.get_running_loop(), maxsize or settings.insight_stream_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(sub.loop, set()).add(sub)
+            EVENT_METRICS["subscribers"] += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(sub.loop)
+            if subs and sub in subs:
+                subs.remove(sub)
+                EVENT_METRICS["subscribers"] -= 1
+                if not subs:
+                    del self._subscribers[sub.loop]
+
+    def publish(self, message: dict):
+        EVENT_METRICS["published"] += 1
+        with self._lock:
+            targets = [(loop, tuple(subs)) for loop, subs in self._subscribers.items()]
+        for loop, subs in targets:
+            try:
+                loop.call_soon_threadsafe(self._deliver, subs, message)
+            except RuntimeError:  # loop closed (e.g. app shut down)
+                pass
+
+    @staticmethod
+    def _deliver(subs: tuple, message: dict):
+        for sub in subs:
+            sub.put(message)
+        EVENT_METRICS["delivered"] += len(subs)
+
+
+class RedisBroker:
+    """Publishes to a redis channel through a publisher thread; one listener thread per process feeds a local
+    InProcessBroker. Messages dropped on a full publish queue or a redis error are replaced by one resync."""
+
+    def __init__(self, client, channel: str = CHANNEL):
+        self._redis = client
+        self._channel = channel
+        self._local = InProcessBroker()
+        self._listener = None
+        self._lock = threading.Lock()
+        self._outbox = queue.Queue(maxsize=PUBLISH_QUEUE_SIZE)
+        self._lost = threading.Event()
+        self._publisher = threading.Thread(target=self._publish_loop, name="insight-events-publish", daemon=True)
+        self._publisher.start()
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._channel)
+        for item in pubsub.listen():
+            try:
+                self._local.publish(json.loads(item["data"]))
+            except Exception:
+                logger.exception("Dropped malformed insight event")
+
+    def subscribe(self, maxsize: int | None = None) -> Subscription:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="insight-events", daemon=True)
+                self._listener.start()
+        return self._local.subscribe(maxsize)
+
+    def unsubscribe(self, sub: Subscription):
+        self._local.unsubscribe(sub)
+
+    def publish(self, message: dict):
+        try:
+            self._outbox.put_nowait(json.dumps(message, default=str))
+        except queue.Full:
+            EVENT_METRICS["publish_dropped"] += 1
+            self._lost.set()
+
+    def _publish_loop(self):
+        while True:
+            data = self._outbox.get()
+            try:
+                if self._lost.is_set():
+                    # Subscribers missed deltas: have them re-read the snapshot, then carry on
+                    self._redis.publish(self._channel, json.dumps({"type": "resync"}))
+                    self._lost.clear()
+                self._redis.publish(self._channel, data)
+            except Exception:
+                EVENT_METRICS["publish_dropped"] += 1
+                self._lost.set()
+                logger.exception("Failed to publish insight event")
+
+
+_broker = None
+
+
+def get_broker():
+    """Configured broker: RedisBroker for settings.event_broker_url (when usable), else InProcessBroker."""
+    global _broker
+    if _broker is None:
+        if settings.event_broker_url:
+            try:
+                import redis
+                client = redis.Redis.from_url(settings.event_broker_url)
+                client.ping()
+                _broker = RedisBroker(client)
+            except Exception as e:  # missing package or unreachable server: fall back to in-process
+                logger.warning("Event broker unavailable (%s); using in-process pub/sub", e)
+        if _broker is None:
+            _broker = InProcessBroker()
+    return _broker
+
+
+def set_broker(broker):
+    """Replace the broker (stand-ins in tests, or a custom transport)."""
+    global _broker
+    _broker = broker
+
+
+@on_commit
+def _publish_counter_changes(changes):
+    """{(project_id, stage): Counter} -> one task_counts message; stage None (project recounted) asks for a resync."""
+    out = []
+    for (project_id, stage), counts in changes.items():
+        if stage is None:
+            out.append({"project_id": project_id, "pipeline_stage": None, "resync": True})
+            continue
+        deltas = {col: n for col, n in counts.items() if n}
+        if deltas:
+            out.append({"project_id": project_id, "pipeline_stage": stage, "deltas": deltas})
+    if out:
+        get_broker().publish({"type": "task_counts", "changes": out})
@@ -0,0 +1,299 @@
+"""
+Completion forecasts per project and assignee.
+Throughput comes from the daily rollups (app.rollups: submits per annotator, reviews per reviewer, active time measured
+from Task.claimed_at) over the last forecast_window_days; a user's rate is tasks per day they actually worked, falling
+back to their rate across all projects. The backlog per stage comes from project_task_stats, inflated by the project's
+reject ratio (every rejected review is another L1 pass). Each assignee's share is annotator_pct / reviewer_pct
+(equal split when unset); reviewers cannot finish before the annotation they wait on.
+Results land in project_forecasts and in Project.annotator_eta_days / reviewer_eta_days, so /projects/my-assignments
+reads precomputed values. Projects are marked dirty when their task counters or assignments change, and the background
+loop re-forecasts only those (everything every forecast_full_interval_seconds). All arithmetic is NumPy over every
+(project, assignee) at once. One full pass by hand: `python -m app.forecast` from backend/.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import bindparam, delete, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+from .task_stats import on_commit
+
+logger = logging.getLogger(__name__)
+
+MAX_REWORK_RATIO = 0.9
+FORECAST_METRICS = {"passes": 0, "projects_forecast_total": 0, "last_pass_at": None, "last_pass_seconds": None, "last_error": None}
+
+_dirty_lock = threading.Lock()
+_dirty = set()
+_DIRTY_KEY = "forecast_dirty"
+_ASSIGNMENT_FIELDS = ("annotator_ids", "reviewer_ids", "annotator_pct", "reviewer_pct")
+
+
+def mark_dirty(project_ids):
+    with _dirty_lock:
+        _dirty.update(project_ids)
+
+
+def _take_dirty() -> set:
+    global _dirty
+    with _dirty_lock:
+        taken, _dirty = _dirty, set()
+    return taken
+
+
+def _shares(ids: list, pct) -> np.ndarray:
+    """Fraction of the stage backlog per assignee: their pct when set, else an equal split."""
+    pct = pct if isinstance(pct, list) else []
+    weights = np.array([float(pct[i]) if i < len(pct) and pct[i] is not None else np.nan for i in range(len(ids))])
+    if not ids:
+        return weights
+    if np.isnan(weights).all() or np.nansum(weights) <= 0:
+        return np.full(len(ids), 1.0 / len(ids))
+    weights = np.nan_to_num(weights, nan=0.0)
+    return weights / weights.sum()
+
+
+def _rates(db: Session, since: datetime, project_ids: list | None) -> tuple[dict, dict]:
+    """Tasks per worked day from throughput_daily per (project, user, role), and per-project [reviews, rejects]."""
+    t = models.ThroughputDaily
+    done = t.submits + t.approvals + t.rejects
+    q = select(t.project_id, t.user_id, t.role, func.sum(done), func.count(), func.sum(t.approvals), func.sum(t.rejects)).where(
+        t.bucket_start >= since, done > 0
+    )
+    if project_ids is not None:
+        q = q.where(t.project_id.in_(project_ids))
+    per_project, reviews = {}, {}
+    for project_id, user_id, role, n, days, approvals, rejects in db.execute(q.group_by(t.project_id, t.user_id, t.role)):
+        per_project[(project_id, user_id, role)] = float(n) / days
+        if role == "reviewer":
+            r = reviews.setdefault(project_id, [0, 0])
+            r[0] += int(approvals or 0) + int(rejects or 0)
+            r[1] += int(rejects or 0)
+    return per_project, reviews
+
+
+def _overall_rates(db: Session, since: datetime, user_ids: set) -> dict:
+    """Tasks per worked day across all projects per (user, role), for assignees with no history on the project."""
+    if not user_ids:
+        return {}
+    t = models.ThroughputDaily
+    done = t.submits + t.approvals + t.rejects
+    per_day = (
+        select(t.user_id, t.role, t.bucket_start, func.sum(done).label("n"))
+        .where(t.bucket_start >= since, done > 0, t.user_id.in_(user_ids))
+        .group_by(t.user_id, t.role, t.bucket_start)
+        .subquery()
+    )
+    rows = db.execute(select(per_day.c.user_id, per_day.c.role, func.sum(per_day.c.n), func.count()).group_by(per_day.c.user_id, per_day.c.role))
+    return {(user_id, role): float(n) / days for user_id, role, n, days in rows}
+
+
+def forecast(db: Session, project_ids: list | None = None, today: date | None = None) -> int:
+    """Re-forecast the given projects (all when None) and store the results. Returns projects written."""
+    today = today or datetime.utcnow().date()
+    since = datetime.combine(today - timedelta(days=settings.forecast_window_days), datetime.min.time())
+    pq = select(
+        models.Project.id, models.Project.annotator_ids, models.Project.reviewer_ids,
+        models.Project.annotator_pct, models.Project.reviewer_pct,
+    )
+    if project_ids is not None:
+        pq = pq.where(models.Project.id.in_(project_ids))
+    projects = db.execute(pq).all()
+    if not projects:
+        return 0
+    ids = [p.id for p in projects]
+    index = {pid: i for i, pid in enumerate(ids)}
+    n = len(ids)
+
+    # Remaining work per project: L1 not yet submitted, Review not yet decided
+    l1_left, review_left = np.zeros(n), np.zeros(n)
+    s = models.ProjectTaskStat
+    stats = select(s.project_id, s.pipeline_stage, s.pending + s.in_progress).where(s.pipeline_stage.in_(("L1", "Review")))
+    if project_ids is not None:
+        stats = stats.where(s.project_id.in_(ids))
+    for project_id, stage, open_tasks in db.execute(stats):
+        if project_id in index:
+            (l1_left if stage == "L1" else review_left)[index[project_id]] += open_tasks or 0
+
+    per_project, reviews = _rates(db, since, ids if project_ids is not None else None)
+    missing = {
+        uid
+        for p in projects
+        for role, uids in (("annotator", p.annotator_ids), ("reviewer", p.reviewer_ids))
+        for uid in (uids if isinstance(uids, list) else [])
+        if uid is not None and (p.id, uid, role) not in per_project
+    }
+    overall = _overall_rates(db, since, missing)
+    contributors = {}
+    for (project_id, uid, role), v in per_project.items():
+        contributors.setdefault((project_id, role), []).append((uid, v))
+    reviewed = np.zeros(n)
+    rejected = np.zeros(n)
+    for project_id, (r, rej) in reviews.items():
+        if project_id in index:
+            reviewed[index[project_id]], rejected[index[project_id]] = r, rej
+    rework = np.minimum(np.divide(rejected, reviewed, out=np.zeros(n), where=reviewed > 0), MAX_REWORK_RATIO)
+    review_backlog = (l1_left + review_left) / (1 - rework)
+    annotation_backlog = l1_left / (1 - rework) + review_left * rework / (1 - rework)
+
+    # One entry per (project, assignee, role) plus non-assigned contributors (they add to team rate only)
+    p_idx, role_idx, share, rate, assigned = [], [], [], [], []
+    for p in projects:
+        i = index[p.id]
+        for role_i, (role, uids, pct) in enumerate((("annotator", p.annotator_ids, p.annotator_pct), ("reviewer", p.reviewer_ids, p.reviewer_pct))):
+            uids = uids if isinstance(uids, list) else []
+            shares = _shares(uids, pct)
+            for uid, sh in zip(uids, shares):
+                p_idx.append(i)
+                role_idx.append(role_i)
+                share.append(sh)
+                rate.append(per_project.get((p.id, uid, role), overall.get((uid, role), np.nan)))
+                assigned.append(True)
+            listed = set(uids)
+            for uid, v in contributors.get((p.id, role), ()):
+                if uid not in listed:
+                    p_idx.append(i)
+                    role_idx.append(role_i)
+                    share.append(0.0)
+                    rate.append(v)
+                    assigned.append(False)
+    p_idx = np.array(p_idx, dtype=np.int64)
+    role_idx = np.array(role_idx, dtype=np.int64)
+    share = np.array(share, dtype=np.float64)
+    rate = np.array(rate, dtype=np.float64)
+    assigned = np.array(assigned, dtype=bool)
+
+    known = ~np.isnan(rate) & (rate > 0)
+    team_rate = np.zeros((2, n))
+    np.add.at(team_rate, (role_idx[known], p_idx[known]), rate[known])
+    backlog = np.stack([annotation_backlog, review_backlog])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        project_eta = np.where(backlog == 0, 0.0, np.where(team_rate > 0, backlog / team_rate, np.nan))
+        own = backlog[role_idx, p_idx] * share
+        eta = np.where(own == 0, 0.0, np.where(known, own / rate, np.nan))
+    # Review can't end before the annotation it waits on
+    project_eta[1] = np.fmax(project_eta[1], project_eta[0])
+    eta = np.where(role_idx == 1, np.where(np.isnan(eta), eta, np.fmax(eta, project_eta[0][p_idx])), eta)
+    finish = np.fmax(project_eta[0], project_eta[1])
+    finish_ok = ~np.isnan(finish)
+    completion = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+    completion[finish_ok] = np.busday_offset(np.datetime64(today, "D"), np.ceil(finish[finish_ok]).astype(np.int64), roll="forward")
+
+    # Per-assignee ETA lists in the order of annotator_ids / reviewer_ids
+    eta_lists = {pid: ([], []) for pid in ids}
+    for i, r, e in zip(p_idx[assigned], role_idx[assigned], eta[assigned]):
+        eta_lists[ids[i]][r].append(None if np.isnan(e) else round(float(e), 2))
+
+    now = datetime.utcnow()
+
+    def _opt(v):
+        return None if np.isnan(v) else round(float(v), 3)
+
+    rows = [
+        {
+            "project_id": pid,
+            "annotation_backlog": round(float(annotation_backlog[i]), 2),
+            "review_backlog": round(float(review_backlog[i]), 2),
+            "annotation_rate": _opt(team_rate[0][i]) if team_rate[0][i] > 0 else None,
+            "review_rate": _opt(team_rate[1][i]) if team_rate[1][i] > 0 else None,
+            "rework_ratio": round(float(rework[i]), 4),
+            "annotation_eta_days": _opt(project_eta[0][i]),
+            "review_eta_days": _opt(project_eta[1][i]),
+            "completion_date": None if np.isnat(completion[i]) else completion[i].item(),
+            "computed_at": now,
+        }
+        for i, pid in enumerate(ids)
+    ]
+    table = models.ProjectForecast.__table__
+    projects_table = models.Project.__table__
+    conn = db.connection()
+    conn.execute(delete(table).where(table.c.project_id.in_(ids)))
+    conn.execute(insert(table), rows)
+    conn.execute(
+        update(projects_table)
+        .where(projects_table.c.id == bindparam("_id"))
+        # a forecast is not an edit: keep updated_at (project lists are ordered by it)
+        .values(annotator_eta_days=bindparam("a_eta"), reviewer_eta_days=bindparam("r_eta"), updated_at=projects_table.c.updated_at),
+        [{"_id": pid, "a_eta": a, "r_eta": r} for pid, (a, r) in eta_lists.items()],
+    )
+    return n
+
+
+def run_pass(full: bool = False) -> int:
+    """Forecast dirty projects (every project when full). Returns projects written."""
+    started = time.perf_counter()
+    project_ids = None if full else sorted(_take_dirty())
+    if project_ids == []:
+        return 0
+    db = SessionLocal()
+    try:
+        n = forecast(db, project_ids)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        if project_ids:
+            mark_dirty(project_ids)  # retry next pass
+        FORECAST_METRICS["last_error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        db.close()
+    FORECAST_METRICS["passes"] += 1
+    FORECAST_METRICS["projects_forecast_total"] += n
+    FORECAST_METRICS["last_pass_at"] = datetime.utcnow().isoformat()
+    FORECAST_METRICS["last_pass_seconds"] = round(time.perf_counter() - started, 4)
+    FORECAST_METRICS["last_error"] = None
+    return n
+
+
+async def run_forever():
+    """Full pass at startup, then dirty projects every forecast_interval_seconds (started from main.lifespan)."""
+    last_full = None
+    while True:
+        full = last_full is None or time.monotonic() - last_full >= settings.forecast_full_interval_seconds
+        try:
+            await asyncio.to_thread(run_pass, full)
+            if full:
+                last_full = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Forecast pass failed")
+        await asyncio.sleep(settings.forecast_interval_seconds)
+
+
+@on_commit
+def _counters_moved(changes):
+    mark_dirty(project_id for project_id, _ in changes)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_assignment_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, models.Project) or obj.id is None:
+            continue
+        state = inspect(obj)
+        if obj in session.new or any(state.attrs[f].history.has_changes() for f in _ASSIGNMENT_FIELDS):
+            session.info.setdefault(_DIRTY_KEY, set()).add(obj.id)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _mark_committed(session):
+    ids = session.info.pop(_DIRTY_KEY, None)
+    if ids:
+        mark_dirty(ids)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_DIRTY_KEY, None)
+
+
+if __name__ == "__main__":
+    print(f"Forecast {run_pass(full=True)} project(s)")
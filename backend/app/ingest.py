@@ -0,0 +1,142 @@
+"""
+High-throughput task ingestion.
+Rows are written in chunks through Core INSERT executemany (SQLAlchemy batches these into multi-row
+INSERT ... RETURNING) and through COPY on PostgreSQL with psycopg 3 / psycopg2. No ORM objects, no per-row flush or refresh.
+Used by POST /tasks/bulk, POST /tasks/bulk-ingest and batch file uploads (NDJSON/CSV parsed row by row).
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import IO, Iterable, Iterator
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .task_stats import apply_batch_deltas
+
+_COPY_COLUMNS = ("id", "batch_id", "status", "pipeline_stage", "content", "rework_count", "created_at", "updated_at")
+
+
+def task_content(item) -> dict:
+    """Normalise one ingested item to Task.content (non-dict values are wrapped as {"text": ...})."""
+    return item if isinstance(item, dict) else {"text": str(item)}
+
+
+def _use_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return settings.ingest_use_copy and dialect.name == "postgresql" and dialect.driver in ("psycopg", "psycopg2")
+
+
+def _copy_chunk(db: Session, batch_id: int, contents: list[dict], now: datetime) -> list[int]:
+    """COPY one chunk. Ids are reserved from the tasks sequence first so the caller still gets them back."""
+    ids = [row[0] for row in db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('tasks', 'id')) FROM generate_series(1, :n)"),
+        {"n": len(contents)},
+    )]
+    rows = [(tid, batch_id, "pending", "L1", json.dumps(c), 0, now, now) for tid, c in zip(ids, contents)]
+    sql = f"COPY tasks ({', '.join(_COPY_COLUMNS)}) FROM STDIN"
+    cursor = db.connection().connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy"):  # psycopg 3
+            with cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:  # psycopg2: CSV format takes care of quoting JSON text
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for row in rows:
+                writer.writerow([v.isoformat() if isinstance(v, datetime) else v for v in row])
+            buf.seek(0)
+            cursor.copy_expert(sql + " WITH (FORMAT csv)", buf)
+    finally:
+        cursor.close()
+    return ids
+
+
+def insert_task_chunk(db: Session, batch_id: int, contents: list[dict], now: datetime | None = None) -> list[int]:
+    """Insert one chunk of pending L1 tasks for the batch; returns the new ids. Caller commits."""
+    if not contents:
+        return []
+    now = now or datetime.utcnow()
+    if _use_copy(db):
+        ids = _copy_chunk(db, batch_id, contents, now)
+    else:
+        table = models.Task.__table__
+        rows = [
+            {"batch_id": batch_id, "status": "pending", "pipeline_stage": "L1", "content": c, "rework_count": 0, "created_at": now, "updated_at": now}
+            for c in contents
+        ]
+        result = db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+        ids = [row[0] for row in result]
+    apply_batch_deltas(db, {(batch_id, "L1", "pending"): len(ids)})
+    return ids
+
+
+def ingest_tasks(db: Session, batch_id: int, items: Iterable, chunk_size: int | None = None, commit: bool = True) -> dict:
+    """Insert items as tasks in bounded chunks (one commit per chunk when commit=True).
+    Returns {"count", "first_id", "last_id"}; ids are ascending but may have gaps if other writers interleave."""
+    chunk_size = chunk_size or settings.ingest_chunk_size
+    count, first_id, last_id = 0, None, None
+    chunk = []
+
+    def flush():
+        nonlocal count, first_id, last_id
+        ids = insert_task_chunk(db, batch_id, chunk)
+        if commit:
+            db.commit()
+        if ids:
+            count += len(ids)
+            first_id = min(ids) if first_id is None else min(first_id, min(ids))
+            last_id = max(ids) if last_id is None else max(last_id, max(ids))
+        chunk.clear()
+
+    for item in items:
+        chunk.append(task_content(item))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return {"count": count, "first_id": first_id, "last_id": last_id}
+
+
+def iter_ndjson_rows(stream: IO[bytes]) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Yield (line_no, content, error) per non-blank NDJSON line without reading the whole file."""
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8", errors="replace", newline="")
+    try:
+        for line_no, line in enumerate(text_stream, 1):
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(value, dict) or not value:
+                yield line_no, None, "Row must be a non-empty JSON object"
+                continue
+            yield line_no, value, None
+    finally:
+        text_stream.detach()
+
+
+def iter_csv_rows(stream: IO[bytes]) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Yield (row_no, content, error) per CSV data row; the header row names the content keys."""
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        reader = csv.DictReader(text_stream)
+        if not reader.fieldnames:
+            return
+        for row_no, row in enumerate(reader, 2):
+            if None in row:
+                yield row_no, None, "More values than header columns"
+                continue
+            content = {k: v for k, v in row.items() if k}
+            if not any((v or "").strip() for v in content.values()):
+                yield row_no, None, "Empty row"
+                continue
+            yield row_no, content, None
+    finally:
+        text_stream.detach()
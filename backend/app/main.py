@@ -1,59 +1,20 @@
-from contextlib import asynccontextmanager
+import asyncio
+import threading
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy import text
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
 
-from .database import engine, Base, SessionLocal
-from .models import User, Workspace, Project, Media, UserTagged, ActivitySpec, ActivityInstance, Batch, Task, TaskClaimRequest
+from .database import async_engine, engine, Base, SessionLocal
+from .models import User, Workspace, Project, Media, UserTagged, ActivitySpec, ActivityInstance, Batch, Task
 from .auth import get_password_hash
-from .routers import auth_router, users_router, workspaces_router, projects_router, activity_router, batches_router, tasks_router, queue_router, insight_router, db_router, requests_router
-
-
-def _migrate_users_table():
-    """Add new User columns if they don't exist (for existing DBs)."""
-    with engine.connect() as conn:
-        for sql in [
-            "ALTER TABLE users ADD COLUMN external_id VARCHAR(50)",
-            "ALTER TABLE users ADD COLUMN workspace_id INTEGER",
-            "ALTER TABLE users ADD COLUMN first_name VARCHAR(100)",
-            "ALTER TABLE users ADD COLUMN middle_name VARCHAR(100)",
-            "ALTER TABLE users ADD COLUMN last_name VARCHAR(100)",
-            "ALTER TABLE users ADD COLUMN workspace_ids VARCHAR(500)",
-            "ALTER TABLE users ADD COLUMN mobile VARCHAR(50)",
-            "ALTER TABLE users ADD COLUMN userid VARCHAR(50)",
-            "ALTER TABLE users ADD COLUMN availability VARCHAR(20)",
-            "ALTER TABLE users ADD COLUMN max_load INTEGER",
-            "ALTER TABLE workspaces ADD COLUMN created_by_id INTEGER",
-            "ALTER TABLE workspaces ADD COLUMN total_projects INTEGER",
-            "ALTER TABLE workspaces ADD COLUMN status VARCHAR(50)",
-            "ALTER TABLE workspaces ADD COLUMN close_date VARCHAR(50)",
-            "ALTER TABLE workspaces ADD COLUMN project_data VARCHAR(1000)",
-            "ALTER TABLE projects ADD COLUMN num_annotators INTEGER",
-            "ALTER TABLE projects ADD COLUMN num_reviewers INTEGER",
-            "ALTER TABLE projects ADD COLUMN close_by_id INTEGER",
-            "ALTER TABLE projects ADD COLUMN annotator_ids VARCHAR(500)",
-            "ALTER TABLE projects ADD COLUMN reviewer_ids VARCHAR(500)",
-            "ALTER TABLE projects ADD COLUMN annotator_pct VARCHAR(500)",
-            "ALTER TABLE projects ADD COLUMN reviewer_pct VARCHAR(500)",
-            "ALTER TABLE projects ADD COLUMN annotator_eta_days VARCHAR(500)",
-            "ALTER TABLE projects ADD COLUMN reviewer_eta_days VARCHAR(500)",
-            "ALTER TABLE tasks ADD COLUMN due_at VARCHAR(50)",
-            "ALTER TABLE tasks ADD COLUMN rework_count INTEGER",
-            "ALTER TABLE tasks ADD COLUMN draft_response VARCHAR(2000)",
-        ]:
-            try:
-                conn.execute(text(sql))
-                conn.commit()
-            except Exception:
-                conn.rollback()
-                pass
-    # Create task_claim_requests if missing
-    if "task_claim_requests" not in [t.name for t in Base.metadata.sorted_tables]:
-        Base.metadata.create_all(bind=engine, tables=[TaskClaimRequest.__table__])
+from .config import settings
+from . import annotation_metrics, forecast, migrations, passwords, reaper, rollups
+from .routers import auth_router, users_router, workspaces_router, projects_router, activity_router, batches_router, tasks_router, queue_router, insight_router, db_router, requests_router, export_router
 
 
 def _ensure_user(db, email, password, full_name, role, availability="100%", max_load=50):
@@ -73,7 +34,7 @@ def _ensure_user(db, email, password, full_name, role, availability="100%", max_
         db.commit()
         db.refresh(u)
     else:
-        u.hashed_password = get_password_hash(password)
+        # Existing users keep their password: bcrypt per seeded user made every startup slow
         u.role = role
         if not getattr(u, "first_name", None) and full_name:
             u.first_name = full_name
@@ -489,10 +450,27 @@ def seed_db():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    passwords.configure(settings.password_hash_workers, settings.password_hash_max_pending)
     Base.metadata.create_all(bind=engine)
-    _migrate_users_table()
+    migrations.upgrade(engine)
     seed_db()
+    reaper_task = asyncio.create_task(reaper.run_forever()) if settings.reaper_enabled else None
+    rollup_task = asyncio.create_task(rollups.run_forever()) if settings.rollups_enabled else None
+    forecast_task = asyncio.create_task(forecast.run_forever()) if settings.forecast_enabled else None
+    # Response metrics for annotations written before the columns existed; no-op once filled
+    backfill_stop = threading.Event()
+    backfill_task = asyncio.create_task(asyncio.to_thread(annotation_metrics.backfill, stop=backfill_stop))
     yield
+    for task in (reaper_task, rollup_task, forecast_task):
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    # A thread can't be cancelled: ask it to stop after the current chunk and wait, before the engines go away
+    backfill_stop.set()
+    await backfill_task
+    passwords.shutdown()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -508,8 +486,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
+@app.exception_handler(StaleDataError)
+async def stale_row(request: Request, exc: StaleDataError):
+    """An ORM update lost to a concurrent writer (Task.version_id moved): nothing was written, the client reloads."""
+    return JSONResponse(status_code=409, content={"detail": "The task was changed by someone else; reload and try again"})
+
+
 app.include_router(auth_router.router)
 app.include_router(users_router.router)
 app.include_router(workspaces_router.router)
@@ -521,6 +506,7 @@ app.include_router(queue_router.router)
 app.include_router(insight_router.router)
 app.include_router(db_router.router)
 app.include_router(requests_router.router)
+app.include_router(export_router.router)
 
 frontend_path = Path(__file__).resolve().parent.parent.parent / "frontend" / "dist"
 
@@ -0,0 +1,171 @@
+"""
+Versioned schema migrations for existing databases.
+A fresh DB gets every table, column and index from Base.metadata.create_all; the steps here bring an older DB
+up to date. Each step runs once, inside a transaction, and is recorded in schema_migrations.
+Steps must be idempotent (check before ALTER/CREATE) so a DB created by create_all passes through them cleanly.
+Add new steps at the end of MIGRATIONS with the next version number.
+Run: automatically from main.lifespan, or `python -m app.migrations [upgrade|current]` from backend/.
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import inspect, insert, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Connection, Engine
+
+from . import models, task_stats
+from .database import Base, engine as default_engine
+
+
+def _add_missing_columns(conn: Connection, table_name: str, column_names: list[str]):
+    """ALTER TABLE ... ADD COLUMN for model columns not yet in the DB; the SQL type comes from the model."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    table = Base.metadata.tables[table_name]
+    quote = conn.dialect.identifier_preparer.quote
+    for name in column_names:
+        if name in existing:
+            continue
+        col_type = table.c[name].type.compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(name)} {col_type}")
+
+
+def _create_indexes(conn: Connection, table_name: str, index_names: list[str]):
+    """Create model-declared indexes by name if missing (dialect options such as partial WHERE are honoured)."""
+    table = Base.metadata.tables[table_name]
+    for idx in table.indexes:
+        if idx.name in index_names:
+            idx.create(bind=conn, checkfirst=True)
+
+
+def _m0001_legacy_columns(conn: Connection):
+    """Columns previously added by the ALTER-and-ignore loop in main._migrate_users_table."""
+    _add_missing_columns(conn, "users", [
+        "external_id", "workspace_id", "first_name", "middle_name", "last_name",
+        "workspace_ids", "mobile", "userid", "availability", "max_load",
+    ])
+    _add_missing_columns(conn, "workspaces", ["created_by_id", "total_projects", "status", "close_date", "project_data"])
+    _add_missing_columns(conn, "projects", [
+        "num_annotators", "num_reviewers", "close_by_id", "annotator_ids", "reviewer_ids",
+        "annotator_pct", "reviewer_pct", "annotator_eta_days", "reviewer_eta_days",
+    ])
+    _add_missing_columns(conn, "tasks", ["due_at", "rework_count", "draft_response"])
+
+
+def _m0002_leases_and_claim_ttl(conn: Connection):
+    _add_missing_columns(conn, "tasks", ["lease_expires_at"])
+    _add_missing_columns(conn, "projects", ["claim_ttl_minutes"])
+
+
+def _m0003_queue_hot_path_indexes(conn: Connection):
+    _create_indexes(conn, "tasks", [
+        "ix_tasks_queue_pick", "ix_tasks_batch_stage_status", "ix_tasks_claimed_by_status",
+        "ix_tasks_review_queue", "ix_tasks_status_claimed_at", "ix_tasks_lease_expires_at",
+    ])
+    _create_indexes(conn, "annotations", ["ix_annotations_task_created"])
+    _create_indexes(conn, "batches", ["ix_batches_project_id"])
+    _create_indexes(conn, "user_tagged", ["ix_user_tagged_project_role"])
+
+
+def _m0004_task_keyset_indexes(conn: Connection):
+    _create_indexes(conn, "tasks", ["ix_tasks_created_at_id", "ix_tasks_batch_created_at_id"])
+
+
+def _m0005_delta_export_index(conn: Connection):
+    # export_snapshots itself is a new table and comes from create_all
+    _create_indexes(conn, "tasks", ["ix_tasks_batch_updated_at"])
+
+
+def _m0006_project_task_stats(conn: Connection):
+    models.ProjectTaskStat.__table__.create(bind=conn, checkfirst=True)
+    task_stats.rebuild(conn)
+
+
+def _m0007_annotation_metrics(conn: Connection):
+    # Values for existing rows are filled by annotation_metrics.backfill (started from main.lifespan)
+    _add_missing_columns(conn, "annotations", ["word_count", "field_count", "char_length"])
+    _create_indexes(conn, "annotations", ["ix_annotations_user_task_metrics"])
+
+
+def _m0008_throughput_rollups(conn: Connection):
+    # task_events, throughput_hourly/daily and rollup_checkpoints are new tables from create_all
+    _add_missing_columns(conn, "annotations", ["active_seconds"])
+
+
+def _m0009_postgres_jsonb(conn: Connection):
+    """PostgreSQL only: json/varchar -> jsonb for models.JSONDocument columns, then their GIN indexes."""
+    if conn.dialect.name != "postgresql":
+        return
+    quote = conn.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        wanted = [c.name for c in table.columns if c.type is models.JSONDocument]
+        if not wanted:
+            continue
+        existing = {c["name"]: c["type"] for c in inspect(conn).get_columns(table.name)}
+        for name in wanted:
+            if name in existing and not isinstance(existing[name], JSONB):
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {quote(table.name)} ALTER COLUMN {quote(name)} TYPE jsonb USING {quote(name)}::jsonb"
+                )
+    _create_indexes(conn, "projects", ["ix_projects_annotator_ids_gin", "ix_projects_reviewer_ids_gin"])
+
+
+def _m0010_task_events_by_task(conn: Connection):
+    _create_indexes(conn, "task_events", ["ix_task_events_task_id"])
+
+
+def _m0011_task_version_id(conn: Connection):
+    """Optimistic-lock column; existing rows start at version 1."""
+    if "version_id" not in {c["name"] for c in inspect(conn).get_columns("tasks")}:
+        conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN version_id INTEGER NOT NULL DEFAULT 1")
+
+
+# (version, description, step) — append only; never renumber or edit an applied step
+MIGRATIONS = [
+    (1, "legacy user/workspace/project/task columns", _m0001_legacy_columns),
+    (2, "task leases and per-project claim TTL", _m0002_leases_and_claim_ttl),
+    (3, "queue hot-path composite and partial indexes", _m0003_queue_hot_path_indexes),
+    (4, "task list keyset pagination indexes", _m0004_task_keyset_indexes),
+    (5, "delta export index on tasks(batch_id, updated_at)", _m0005_delta_export_index),
+    (6, "materialized project_task_stats counters", _m0006_project_task_stats),
+    (7, "annotation response metrics columns", _m0007_annotation_metrics),
+    (8, "annotation active time for throughput rollups", _m0008_throughput_rollups),
+    (9, "PostgreSQL jsonb document columns and GIN indexes", _m0009_postgres_jsonb),
+    (10, "task_events(task_id, id) index for export tombstones", _m0010_task_events_by_task),
+    (11, "tasks.version_id optimistic lock for counter-exact ORM updates", _m0011_task_version_id),
+]
+
+
+def current_version(bind: Engine | None = None) -> int:
+    bind = bind or default_engine
+    if not inspect(bind).has_table(models.SchemaMigration.__tablename__):
+        return 0
+    with bind.connect() as conn:
+        versions = [v for (v,) in conn.execute(select(models.SchemaMigration.version))]
+    return max(versions, default=0)
+
+
+def upgrade(bind: Engine | None = None) -> list[int]:
+    """Apply pending migrations in order. Returns the versions applied."""
+    bind = bind or default_engine
+    models.SchemaMigration.__table__.create(bind=bind, checkfirst=True)
+    with bind.connect() as conn:
+        done = {v for (v,) in conn.execute(select(models.SchemaMigration.version))}
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version in done:
+            continue
+        with bind.begin() as conn:
+            step(conn)
+            conn.execute(insert(models.SchemaMigration).values(version=version, description=description, applied_at=datetime.utcnow()))
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if cmd == "upgrade":
+        print(f"Applied migrations: {upgrade() or 'none'}; now at version {current_version()}")
+    elif cmd == "current":
+        print(current_version())
+    else:
+        sys.exit("usage: python -m app.migrations [upgrade|current]")
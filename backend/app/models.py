@@ -3,7 +3,8 @@ Data model for Annotation Studio V1.
 Orchestration: ActivitySpec (reference) + ActivityInstance (per project run).
 Projects can be parent/annotator/review/reassignment; parent_id for hierarchy.
 """
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Date, DateTime, JSON, Boolean, Float, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -11,6 +12,11 @@ import uuid
 from .database import Base
 
 
+# JSON documents that are large or filtered on: binary JSONB on PostgreSQL (GIN-indexable, no reparse per read),
+# plain JSON elsewhere. Migration 0009 converts existing PostgreSQL columns.
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
+
 def gen_uuid():
     return str(uuid.uuid4())
 
@@ -100,12 +106,13 @@ class Project(Base):
     num_annotators = Column(Integer, default=0)
     num_reviewers = Column(Integer, default=0)
     close_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    annotator_ids = Column(JSON, default=list)  # [user_id, ...]
-    reviewer_ids = Column(JSON, default=list)
+    annotator_ids = Column(JSONDocument, default=list)  # [user_id, ...]
+    reviewer_ids = Column(JSONDocument, default=list)
     annotator_pct = Column(JSON, default=list)  # [pct, ...] same order as annotator_ids
     reviewer_pct = Column(JSON, default=list)
-    annotator_eta_days = Column(JSON, default=list)  # [days or null, ...] ETA working days per annotator
+    annotator_eta_days = Column(JSON, default=list)  # [days or null, ...] ETA working days per annotator (app.forecast)
     reviewer_eta_days = Column(JSON, default=list)
+    claim_ttl_minutes = Column(Integer, nullable=True)  # abandoned-claim TTL; null = settings default, <= 0 = never reap
 
     workspace = relationship("Workspace", back_populates="projects", foreign_keys=[workspace_id])
     media = relationship("Media", back_populates="project", foreign_keys="Media.project_id")
@@ -122,6 +129,18 @@ class Project(Base):
     )
     user_tagged = relationship("UserTagged", back_populates="project", foreign_keys="UserTagged.project_id")
 
+    __table_args__ = (
+        # /projects/my-assignments: "annotator_ids @> [user_id]" on PostgreSQL (other backends filter in Python)
+        Index(
+            "ix_projects_annotator_ids_gin", "annotator_ids",
+            postgresql_using="gin", postgresql_ops={"annotator_ids": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_projects_reviewer_ids_gin", "reviewer_ids",
+            postgresql_using="gin", postgresql_ops={"reviewer_ids": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
 
 class UserTagged(Base):
     """User_tagged: one row per (user, workspace, project) with start/end dates."""
@@ -139,6 +158,11 @@ class UserTagged(Base):
     workspace = relationship("Workspace", back_populates="user_tagged", foreign_keys=[workspace_id])
     project = relationship("Project", back_populates="user_tagged", foreign_keys=[project_id])
 
+    __table_args__ = (
+        # annotator report: users tagged to a project by role
+        Index("ix_user_tagged_project_role", "project_id", "user_role"),
+    )
+
 
 class ActivitySpec(Base):
     """Reference table: static definition of an activity/node type."""
@@ -188,7 +212,7 @@ class ActivityInstance(Base):
 class Batch(Base):
     __tablename__ = "batches"
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -202,19 +226,52 @@ class Task(Base):
     batch_id = Column(Integer, ForeignKey("batches.id"), nullable=False)
     status = Column(String(50), nullable=False, default="pending")  # pending | in_progress | completed | skipped
     pipeline_stage = Column(String(50), nullable=False, default="L1")
-    content = Column(JSON, nullable=False)
+    content = Column(JSONDocument, nullable=False)
     claimed_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     claimed_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)  # set when handed out via /queue/lease; unused leases return to pool after this
     assigned_reviewer_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     due_at = Column(DateTime, nullable=True)
     rework_count = Column(Integer, default=0)  # times sent back by reviewer; efficiency = (total - rework) / total
-    draft_response = Column(JSON, default=None)  # auto-save partial annotation before submit
+    draft_response = Column(JSONDocument, default=None)  # auto-save partial annotation before submit
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Optimistic lock: ORM updates carry WHERE version_id = <loaded>, Core writers bump it (see app.task_stats)
+    version_id = Column(Integer, nullable=False, default=1, server_default=text("1"))
     batch = relationship("Batch", back_populates="tasks")
     claimed_by = relationship("User", foreign_keys=[claimed_by_id])
     assigned_reviewer = relationship("User", foreign_keys=[assigned_reviewer_id])
     annotations = relationship("Annotation", back_populates="task")
+    __mapper_args__ = {"version_id_col": version_id}
+
+    # Queue hot paths (see migrations 0003). Partial indexes are ignored by backends without support.
+    __table_args__ = (
+        # /queue/next, /queue/lease: oldest pending unclaimed L1 task of a batch
+        Index(
+            "ix_tasks_queue_pick", "batch_id", "created_at", "id",
+            sqlite_where=text("status = 'pending' AND claimed_by_id IS NULL AND pipeline_stage = 'L1'"),
+            postgresql_where=text("status = 'pending' AND claimed_by_id IS NULL AND pipeline_stage = 'L1'"),
+        ),
+        # /tasks keyset pages: newest first on (created_at, id), overall and within a batch
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_batch_created_at_id", "batch_id", "created_at", "id"),
+        # delta export: tasks of a batch changed after a snapshot's high-water mark
+        Index("ix_tasks_batch_updated_at", "batch_id", "updated_at"),
+        # batch task lists and list filters by batch/stage/status/claimer
+        Index("ix_tasks_batch_stage_status", "batch_id", "pipeline_stage", "status", "claimed_by_id", "created_at"),
+        # /queue/my-tasks and per-annotator filters
+        Index("ix_tasks_claimed_by_status", "claimed_by_id", "status", "claimed_at"),
+        # /queue/review: pending Review tasks for a reviewer (or unassigned), oldest update first
+        Index("ix_tasks_review_queue", "pipeline_stage", "status", "assigned_reviewer_id", "updated_at"),
+        # reaper: stale in_progress claims
+        Index("ix_tasks_status_claimed_at", "status", "claimed_at"),
+        # lease expiry sweep
+        Index(
+            "ix_tasks_lease_expires_at", "lease_expires_at",
+            sqlite_where=text("lease_expires_at IS NOT NULL"),
+            postgresql_where=text("lease_expires_at IS NOT NULL"),
+        ),
+    )
 
 
 class Reference(Base):
@@ -236,12 +293,24 @@ class Annotation(Base):
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    response = Column(JSON, nullable=False)
+    response = Column(JSONDocument, nullable=False)
     pipeline_stage = Column(String(50), nullable=False)
+    # Response metrics, set on write by app.annotation_metrics (NULL until backfilled on older rows)
+    word_count = Column(Integer, nullable=True)
+    field_count = Column(Integer, nullable=True)
+    char_length = Column(Integer, nullable=True)
+    active_seconds = Column(Float, nullable=True)  # claim -> submit time, set at submit (claimed_at is cleared then)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     task = relationship("Task", back_populates="annotations")
 
+    __table_args__ = (
+        # latest annotation per task (reject, export, efficiency)
+        Index("ix_annotations_task_created", "task_id", "created_at"),
+        # per-annotator report: sums word_count from the index alone
+        Index("ix_annotations_user_task_metrics", "user_id", "task_id", "word_count", "char_length"),
+    )
+
 
 class TaskClaimRequest(Base):
     """Annotator requests to claim a task assigned to someone else. Approved by assignee OR ops/admin."""
@@ -259,3 +328,105 @@ class TaskClaimRequest(Base):
     requested_by = relationship("User", foreign_keys=[requested_by_id])
     current_assignee = relationship("User", foreign_keys=[current_assignee_id])
     approved_by = relationship("User", foreign_keys=[approved_by_id])
+
+
+class ProjectTaskStat(Base):
+    """Materialized task counts per project and pipeline stage, kept in step with tasks by app.task_stats."""
+    __tablename__ = "project_task_stats"
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    pipeline_stage = Column(String(50), primary_key=True)
+    pending = Column(Integer, nullable=False, default=0)
+    in_progress = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    other = Column(Integer, nullable=False, default=0)  # any status outside the four above
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class TaskEvent(Base):
+    """Append-only log of review transitions (approve / reject) that leave no row of their own; read by app.rollups."""
+    __tablename__ = "task_events"
+    __table_args__ = (
+        Index("ix_task_events_task_id", "task_id", "id"),  # latest review event per task (export tombstones)
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    event = Column(String(50), nullable=False)  # approve | reject
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # who acted (reviewer)
+    annotator_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # whose work it was
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ThroughputHourly(Base):
+    """Hourly throughput per project, user and role (annotator | reviewer), filled by app.rollups."""
+    __tablename__ = "throughput_hourly"
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    role = Column(String(20), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    submits = Column(Integer, nullable=False, default=0)
+    approvals = Column(Integer, nullable=False, default=0)
+    rejects = Column(Integer, nullable=False, default=0)
+    rework = Column(Integer, nullable=False, default=0)  # annotator: own submissions sent back
+    active_seconds = Column(Float, nullable=False, default=0)
+
+
+class ThroughputDaily(Base):
+    """Daily throughput per project, user and role (annotator | reviewer), filled by app.rollups."""
+    __tablename__ = "throughput_daily"
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    role = Column(String(20), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    submits = Column(Integer, nullable=False, default=0)
+    approvals = Column(Integer, nullable=False, default=0)
+    rejects = Column(Integer, nullable=False, default=0)
+    rework = Column(Integer, nullable=False, default=0)
+    active_seconds = Column(Float, nullable=False, default=0)
+
+
+class RollupCheckpoint(Base):
+    """Last source row id folded into the throughput rollups, per source (annotations, task_events)."""
+    __tablename__ = "rollup_checkpoints"
+    source = Column(String(50), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ExportSnapshot(Base):
+    """One incremental export of a project: the high-water mark it covered, so the next export only emits changes."""
+    __tablename__ = "export_snapshots"
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    format = Column(String(20), nullable=False, default="jsonl")
+    since_snapshot_id = Column(Integer, ForeignKey("export_snapshots.id"), nullable=True)
+    cursor_updated_at = Column(DateTime, nullable=True)  # max Task.updated_at in the project when the export started; null = no tasks yet
+    cursor_annotation_id = Column(Integer, nullable=False, default=0)  # max Annotation.id when the export started
+    row_count = Column(Integer, default=0)
+    tombstone_count = Column(Integer, default=0)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ProjectForecast(Base):
+    """Latest completion forecast per project from throughput history and remaining backlog, written by app.forecast."""
+    __tablename__ = "project_forecasts"
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    annotation_backlog = Column(Float, nullable=False, default=0)  # expected L1 submissions left, rework included
+    review_backlog = Column(Float, nullable=False, default=0)  # expected reviews left
+    annotation_rate = Column(Float, nullable=True)  # team tasks per working day
+    review_rate = Column(Float, nullable=True)
+    rework_ratio = Column(Float, nullable=False, default=0)  # rejects / reviews in the window
+    annotation_eta_days = Column(Float, nullable=True)  # working days; null = no throughput to project from
+    review_eta_days = Column(Float, nullable=True)
+    completion_date = Column(Date, nullable=True)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SchemaMigration(Base):
+    """Applied schema migration versions (see app/migrations.py)."""
+    __tablename__ = "schema_migrations"
+    version = Column(Integer, primary_key=True)
+    description = Column(String(255), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,92 @@
+"""
+Password hashing (bcrypt via passlib) and the worker pool the login path uses for it.
+bcrypt is deliberately slow, so request handlers don't run it on the event loop or FastAPI's shared threadpool:
+verify_password_async / hash_password_async send it to a dedicated process pool (password_hash_workers) and admit at
+most password_hash_max_pending calls at once. Beyond that they raise PasswordPoolBusy, which the routers turn into
+429 + Retry-After, so a login storm queues at the clients instead of stalling every other endpoint.
+Kept free of app imports: spawned workers import only this module.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+PASSWORD_POOL_METRICS = {"in_flight": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+_pool = None
+_pool_lock = threading.Lock()
+_workers = 0
+_max_pending = 0
+
+
+class PasswordPoolBusy(Exception):
+    """Too many hash / verify calls in flight; retry after retry_after seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"password pool busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def verify_password(plain: str, hashed: str) -> bool:
+    return pwd_context.verify(plain, hashed)
+
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def configure(workers: int = 0, max_pending: int = 0):
+    """Pool size (0 = half the CPUs, at least 1) and admission limit (0 = 8 per worker). Call before first use."""
+    global _workers, _max_pending
+    _workers = workers or max(1, (os.cpu_count() or 2) // 2)
+    _max_pending = max_pending or _workers * 8
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if not _workers:
+                configure()
+            _pool = ProcessPoolExecutor(max_workers=_workers)
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def _run(fn, *args):
+    # Admission is counted on the event loop thread, so a plain counter is enough
+    if not _workers:
+        configure()
+    if PASSWORD_POOL_METRICS["in_flight"] >= _max_pending:
+        PASSWORD_POOL_METRICS["rejected"] += 1
+        # Roughly how long the queue ahead takes to drain (bcrypt ~0.25s per call per worker)
+        raise PasswordPoolBusy(max(1, round(_max_pending / _workers * 0.25)))
+    PASSWORD_POOL_METRICS["in_flight"] += 1
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(_executor(), fn, *args)
+    except BaseException:
+        PASSWORD_POOL_METRICS["failed"] += 1  # worker error, broken pool, or the request was cancelled
+        raise
+    finally:
+        PASSWORD_POOL_METRICS["in_flight"] -= 1
+    PASSWORD_POOL_METRICS["completed"] += 1
+    return result
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run(verify_password, plain, hashed)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(get_password_hash, password)
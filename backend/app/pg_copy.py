@@ -0,0 +1,156 @@
+"""
+Copy an existing database (typically the SQLite file) into a fresh PostgreSQL database.
+The target schema comes from create_all + migrations.upgrade, so it starts at head with JSONB columns and GIN indexes.
+Rows are streamed table by table in primary-key order, chunk_size rows per read and per INSERT batch, so memory stays
+flat however large tasks / annotations are. Foreign keys that can't be satisfied in insert order (the users <-> workspaces
+cycle, self references such as projects.parent_id) are written as NULL and filled in by a second streamed pass.
+Afterwards serial sequences are moved past the copied ids and project_task_stats is rebuilt from the copied tasks.
+The source is only read; columns it lacks (older schema version) get the model defaults.
+Run from backend/: `python -m app.pg_copy SOURCE_URL TARGET_URL [chunk_size]`, e.g.
+`python -m app.pg_copy sqlite:///./annotation_studio.db postgresql+psycopg://user:pw@localhost/annotation_studio`
+"""
+import sys
+import time
+from collections import defaultdict
+
+from sqlalchemy import JSON, MetaData, bindparam, create_engine, func, inspect, insert, or_, select, text, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import sort_tables_and_constraints
+
+from . import migrations, models, task_stats
+from .database import Base
+
+DEFAULT_CHUNK_SIZE = 5000
+# Not copied: the target is stamped by migrations.upgrade, counters are rebuilt from the copied tasks
+_SKIP_TABLES = {models.SchemaMigration.__tablename__, models.ProjectTaskStat.__tablename__}
+
+
+def _copy_plan() -> list[tuple]:
+    """[(table, deferred FK column names)] in insert order."""
+    ordered = sort_tables_and_constraints(Base.metadata.tables.values())
+    cyclic = ordered[-1][1] if ordered and ordered[-1][0] is None else []
+    deferred = defaultdict(set)
+    for fkc in cyclic:
+        deferred[fkc.table.name].update(fkc.column_keys)
+    for table, _ in ordered:
+        if table is None:
+            continue
+        for fkc in table.foreign_key_constraints:
+            if fkc.referred_table is table:
+                deferred[table.name].update(fkc.column_keys)
+    return [(t, deferred[t.name]) for t, _ in ordered if t is not None and t.name not in _SKIP_TABLES]
+
+
+def _writer_tables() -> MetaData:
+    """Copy of the metadata whose JSON columns write None as SQL NULL (the ORM default would store JSON 'null')."""
+    meta = MetaData()
+    for table in Base.metadata.tables.values():
+        table = table.to_metadata(meta)
+        for col in table.columns:
+            if isinstance(col.type, JSON):
+                col.type = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+    return meta
+
+
+def _copy_table(src: Engine, dst: Engine, table, target, deferred: set, chunk_size: int) -> int:
+    src_columns = {c["name"] for c in inspect(src).get_columns(table.name)}
+    names = [c.name for c in table.columns if c.name in src_columns]
+    stmt = select(*(table.c[n] for n in names)).order_by(*table.primary_key.columns)
+    copied = 0
+    with src.connect() as sconn, dst.begin() as dconn:
+        result = sconn.execution_options(yield_per=chunk_size).execute(stmt)
+        for rows in result.partitions():
+            batch = [row._asdict() for row in rows]
+            for values in batch:
+                for name in deferred:
+                    values[name] = None
+            dconn.execute(insert(target), batch)
+            copied += len(batch)
+    return copied
+
+
+def _fill_deferred(src: Engine, dst: Engine, table, target, deferred: set, chunk_size: int) -> int:
+    src_columns = {c["name"] for c in inspect(src).get_columns(table.name)}
+    names = sorted(n for n in deferred if n in src_columns)
+    if not names:
+        return 0
+    (pk,) = table.primary_key.columns
+    stmt = (
+        select(pk.label("_pk"), *(table.c[n] for n in names))
+        .where(or_(*(table.c[n].isnot(None) for n in names)))
+        .order_by(pk)
+    )
+    upd = update(target).where(target.c[pk.name] == bindparam("_pk"))
+    filled = 0
+    with src.connect() as sconn, dst.begin() as dconn:
+        result = sconn.execution_options(yield_per=chunk_size).execute(stmt)
+        for rows in result.partitions():
+            dconn.execute(upd, [row._asdict() for row in rows])
+            filled += len(rows)
+    return filled
+
+
+def _reset_sequences(conn, tables):
+    """PostgreSQL: move each serial sequence past the ids copied into its table."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        col = table.autoincrement_column
+        if col is None:
+            continue
+        conn.execute(
+            text(f"SELECT setval(pg_get_serial_sequence(:t, :c), COALESCE(MAX({col.name}), 1), MAX({col.name}) IS NOT NULL) FROM {table.name}"),
+            {"t": table.name, "c": col.name},
+        )
+
+
+def copy_database(source_url: str, target_url: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """Create the schema on target_url and stream every table across from source_url. Returns rows copied per table."""
+    src = create_engine(source_url)
+    dst = create_engine(target_url)
+    try:
+        Base.metadata.create_all(dst)
+        migrations.upgrade(dst)
+        plan = _copy_plan()
+        with dst.connect() as conn:
+            non_empty = [t.name for t, _ in plan if conn.execute(select(func.count()).select_from(t)).scalar()]
+        if non_empty:
+            raise RuntimeError(f"target already has rows in {', '.join(non_empty)}; copy into an empty database")
+        src_tables = set(inspect(src).get_table_names())
+        writer = _writer_tables()
+        copied = {}
+        for table, deferred in plan:
+            if table.name not in src_tables:
+                continue
+            started = time.monotonic()
+            copied[table.name] = _copy_table(src, dst, table, writer.tables[table.name], deferred, chunk_size)
+            print(f"{table.name}: {copied[table.name]} row(s) in {time.monotonic() - started:.1f}s")
+        for table, deferred in plan:
+            if deferred and table.name in src_tables:
+                _fill_deferred(src, dst, table, writer.tables[table.name], deferred, chunk_size)
+        with dst.begin() as conn:
+            _reset_sequences(conn, [t for t, _ in plan])
+            task_stats.rebuild(conn)
+        return copied
+    finally:
+        src.dispose()
+        dst.dispose()
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) not in (2, 3):
+        print("usage: python -m app.pg_copy SOURCE_URL TARGET_URL [chunk_size]")
+        return 2
+    chunk_size = int(argv[2]) if len(argv) > 2 else DEFAULT_CHUNK_SIZE
+    try:
+        copied = copy_database(argv[0], argv[1], chunk_size)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    print(f"copied {sum(copied.values())} row(s) across {len(copied)} table(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
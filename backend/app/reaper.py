@@ -0,0 +1,114 @@
+"""
+Lease reaper: background sweeper that releases abandoned annotator claims.
+A task claimed via /queue/next, /queue/lease or claim_task stays in_progress until submitted; if the annotator
+walks away it blocks the queue. Each sweep releases in_progress L1 claims older than the project's TTL
+(Project.claim_ttl_minutes, else settings.claim_ttl_minutes) with one bulk UPDATE per distinct TTL.
+Drafts (draft_response) stay on the task so the next annotator continues from them.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .claims import release_unused_leases
+from .config import settings
+from .database import SessionLocal
+from .task_stats import apply_batch_deltas, moved
+
+logger = logging.getLogger(__name__)
+
+# Exposed via GET /queue/reaper/metrics
+REAPER_METRICS = {
+    "sweeps": 0,
+    "rows_reclaimed_total": 0,
+    "leases_released_total": 0,
+    "last_rows_reclaimed": 0,
+    "last_leases_released": 0,
+    "last_sweep_seconds": None,
+    "last_sweep_at": None,
+    "last_error": None,
+}
+
+
+def _release_stale_claims(db: Session, cutoff: datetime, project_ids: list[int] | None, exclude_project_ids: list[int]) -> int:
+    """Bulk-release in_progress L1 claims made before cutoff, limited to the given projects (None = all but excluded)."""
+    batch_ids = select(models.Batch.id)
+    if project_ids is not None:
+        batch_ids = batch_ids.where(models.Batch.project_id.in_(project_ids))
+    elif exclude_project_ids:
+        batch_ids = batch_ids.where(models.Batch.project_id.notin_(exclude_project_ids))
+    result = db.execute(
+        update(models.Task)
+        .where(
+            models.Task.status == "in_progress",
+            models.Task.pipeline_stage == "L1",
+            models.Task.claimed_by_id.isnot(None),
+            models.Task.claimed_at < cutoff,
+            models.Task.batch_id.in_(batch_ids),
+        )
+        .values(claimed_by_id=None, claimed_at=None, status="pending", lease_expires_at=None, updated_at=datetime.utcnow(), version_id=models.Task.version_id + 1)
+        .returning(models.Task.batch_id),
+        execution_options={"synchronize_session": False},
+    )
+    rows = result.all()
+    apply_batch_deltas(db, moved(rows, ("L1", "in_progress"), ("L1", "pending")))
+    return len(rows)
+
+
+def reap_abandoned_claims(db: Session) -> dict:
+    """One sweep: expired untouched leases first, then TTL-expired claims. Caller commits."""
+    now = datetime.utcnow()
+    leases = release_unused_leases(db)
+    # Group per-project overrides by TTL so each distinct TTL costs one UPDATE
+    overrides = {}
+    for pid, ttl in db.query(models.Project.id, models.Project.claim_ttl_minutes).filter(models.Project.claim_ttl_minutes.isnot(None)).all():
+        overrides.setdefault(ttl, []).append(pid)
+    reclaimed = 0
+    overridden_ids = [pid for ids in overrides.values() for pid in ids]
+    if settings.claim_ttl_minutes > 0:
+        reclaimed += _release_stale_claims(db, now - timedelta(minutes=settings.claim_ttl_minutes), None, overridden_ids)
+    for ttl, pids in overrides.items():
+        if ttl <= 0:
+            continue
+        reclaimed += _release_stale_claims(db, now - timedelta(minutes=ttl), pids, [])
+    return {"rows_reclaimed": reclaimed, "leases_released": leases}
+
+
+def run_sweep() -> dict:
+    """Run one sweep in its own session and record metrics."""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        result = reap_abandoned_claims(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        REAPER_METRICS["last_error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        db.close()
+    REAPER_METRICS["sweeps"] += 1
+    REAPER_METRICS["last_rows_reclaimed"] = result["rows_reclaimed"]
+    REAPER_METRICS["last_leases_released"] = result["leases_released"]
+    REAPER_METRICS["rows_reclaimed_total"] += result["rows_reclaimed"]
+    REAPER_METRICS["leases_released_total"] += result["leases_released"]
+    REAPER_METRICS["last_sweep_seconds"] = round(time.perf_counter() - started, 4)
+    REAPER_METRICS["last_sweep_at"] = datetime.utcnow().isoformat()
+    REAPER_METRICS["last_error"] = None
+    return result
+
+
+async def run_forever():
+    """Sweep every reaper_interval_seconds until cancelled (started from main.lifespan)."""
+    while True:
+        try:
+            await asyncio.to_thread(run_sweep)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Lease reaper sweep failed")
+        await asyncio.sleep(settings.reaper_interval_seconds)
@@ -0,0 +1,190 @@
+"""
+Hourly and daily throughput rollups (throughput_hourly / throughput_daily) per project, user and role.
+A background aggregator folds new source rows into the rollups and records how far it got in rollup_checkpoints:
+- annotations: one submit for the annotator, plus the claim -> submit active time stored at submit;
+- task_events: approve / reject for the reviewer; a reject also counts as rework for the annotator.
+Each chunk and its checkpoint commit together, so a crash never double counts. Rows younger than
+rollup_settle_seconds wait for the next pass (ids committed out of order by concurrent writers are not skipped).
+Started from main.lifespan; one pass by hand: `python -m app.rollups` from backend/.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_CHUNK_SIZE = 5000
+METRICS = ("submits", "approvals", "rejects", "rework", "active_seconds")
+GRANULARITIES = {"hour": models.ThroughputHourly, "day": models.ThroughputDaily}
+
+# Exposed with the timeseries for freshness
+ROLLUP_METRICS = {"passes": 0, "rows_folded_total": 0, "last_pass_at": None, "last_pass_seconds": None, "last_error": None}
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if granularity == "day" else ts
+
+
+def _get_checkpoint(db: Session, source: str) -> int:
+    cp = db.query(models.RollupCheckpoint).filter(models.RollupCheckpoint.source == source).first()
+    return cp.last_id if cp else 0
+
+
+def _set_checkpoint(db: Session, source: str, last_id: int):
+    cp = db.query(models.RollupCheckpoint).filter(models.RollupCheckpoint.source == source).first()
+    if cp is None:
+        db.add(models.RollupCheckpoint(source=source, last_id=last_id, updated_at=datetime.utcnow()))
+    else:
+        cp.last_id = last_id
+        cp.updated_at = datetime.utcnow()
+
+
+def _settled(rows: list, settled_before: datetime) -> list:
+    """Rows up to (not including) the first one that is too recent: the checkpoint must never pass an unsettled id."""
+    for i, row in enumerate(rows):
+        if row.created_at is not None and row.created_at >= settled_before:
+            return rows[:i]
+    return rows
+
+
+def _add(acc: dict, ts: datetime, project_id: int, user_id: int, role: str, **metrics):
+    for granularity in GRANULARITIES:
+        row = acc[(granularity, project_id, role, bucket_start(ts, granularity), user_id)]
+        for name, value in metrics.items():
+            row[name] += value
+
+
+def _write(db: Session, acc: dict):
+    """Add the accumulated metrics to the rollup rows (insert or increment)."""
+    dialect = db.get_bind().dialect.name
+    for (granularity, project_id, role, start, user_id), metrics in sorted(acc.items(), key=lambda kv: kv[0]):
+        model = GRANULARITIES[granularity]
+        table = model.__table__
+        values = {"project_id": project_id, "role": role, "bucket_start": start, "user_id": user_id, **{m: metrics.get(m, 0) for m in METRICS}}
+        if dialect in ("sqlite", "postgresql"):
+            ins = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table).values(**values)
+            db.execute(ins.on_conflict_do_update(
+                index_elements=["project_id", "role", "bucket_start", "user_id"],
+                set_={m: table.c[m] + ins.excluded[m] for m in METRICS},
+            ))
+            continue
+        result = db.execute(
+            update(table)
+            .where(table.c.project_id == project_id, table.c.role == role, table.c.bucket_start == start, table.c.user_id == user_id)
+            .values(**{m: table.c[m] + values[m] for m in METRICS})
+        )
+        if not result.rowcount:
+            db.add(model(**values))
+
+
+def _fold_annotations(db: Session, settled_before: datetime, limit: int) -> int:
+    last_id = _get_checkpoint(db, "annotations")
+    rows = db.execute(
+        select(models.Annotation.id, models.Annotation.user_id, models.Annotation.created_at, models.Annotation.active_seconds, models.Batch.project_id)
+        .join(models.Task, models.Task.id == models.Annotation.task_id)
+        .join(models.Batch, models.Batch.id == models.Task.batch_id)
+        .where(models.Annotation.id > last_id)
+        .order_by(models.Annotation.id)
+        .limit(limit)
+    ).all()
+    rows = _settled(rows, settled_before)
+    if not rows:
+        return 0
+    acc = defaultdict(lambda: defaultdict(float))
+    for _, user_id, created_at, active_seconds, project_id in rows:
+        if created_at is None:
+            continue
+        _add(acc, created_at, project_id, user_id, "annotator", submits=1, active_seconds=active_seconds or 0)
+    _write(db, acc)
+    _set_checkpoint(db, "annotations", rows[-1].id)
+    return len(rows)
+
+
+def _fold_task_events(db: Session, settled_before: datetime, limit: int) -> int:
+    last_id = _get_checkpoint(db, "task_events")
+    rows = db.execute(
+        select(models.TaskEvent.id, models.TaskEvent.event, models.TaskEvent.user_id, models.TaskEvent.annotator_id,
+               models.TaskEvent.project_id, models.TaskEvent.created_at)
+        .where(models.TaskEvent.id > last_id)
+        .order_by(models.TaskEvent.id)
+        .limit(limit)
+    ).all()
+    rows = _settled(rows, settled_before)
+    if not rows:
+        return 0
+    acc = defaultdict(lambda: defaultdict(float))
+    for _, event, user_id, annotator_id, project_id, created_at in rows:
+        if created_at is None:
+            continue
+        if event == "approve":
+            _add(acc, created_at, project_id, user_id, "reviewer", approvals=1)
+        elif event == "reject":
+            _add(acc, created_at, project_id, user_id, "reviewer", rejects=1)
+            if annotator_id is not None:
+                _add(acc, created_at, project_id, annotator_id, "annotator", rework=1)
+    _write(db, acc)
+    _set_checkpoint(db, "task_events", rows[-1].id)
+    return len(rows)
+
+
+def aggregate(chunk_size: int = ROLLUP_CHUNK_SIZE) -> int:
+    """Fold every settled source row past the checkpoints into the rollups. Returns source rows folded."""
+    settled_before = datetime.utcnow() - timedelta(seconds=settings.rollup_settle_seconds)
+    folded = 0
+    db = SessionLocal()
+    try:
+        for fold in (_fold_annotations, _fold_task_events):
+            while True:
+                n = fold(db, settled_before, chunk_size)
+                db.commit()
+                folded += n
+                if n < chunk_size:  # caught up, or stopped at an unsettled row
+                    break
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return folded
+
+
+def run_pass() -> int:
+    started = time.perf_counter()
+    try:
+        folded = aggregate()
+    except Exception as e:
+        ROLLUP_METRICS["last_error"] = f"{type(e).__name__}: {e}"
+        raise
+    ROLLUP_METRICS["passes"] += 1
+    ROLLUP_METRICS["rows_folded_total"] += folded
+    ROLLUP_METRICS["last_pass_at"] = datetime.utcnow().isoformat()
+    ROLLUP_METRICS["last_pass_seconds"] = round(time.perf_counter() - started, 4)
+    ROLLUP_METRICS["last_error"] = None
+    return folded
+
+
+async def run_forever():
+    """Aggregate every rollup_interval_seconds until cancelled (started from main.lifespan)."""
+    while True:
+        try:
+            await asyncio.to_thread(run_pass)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Throughput rollup pass failed")
+        await asyncio.sleep(settings.rollup_interval_seconds)
+
+
+if __name__ == "__main__":
+    print(f"Folded {run_pass()} source row(s) into the rollups")
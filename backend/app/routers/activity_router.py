@@ -7,14 +7,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, joinedload
 from .. import models, schemas
 from ..database import get_db
-from ..auth import get_current_user, require_ops
+from ..auth import Principal, get_current_user, require_ops
 
 router = APIRouter(prefix="/activities", tags=["activities"])
 
 
 # ---------- Activity specs (reference) ----------
 @router.get("/specs", response_model=list[schemas.ActivitySpecResponse])
-def list_specs(db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+def list_specs(db: Session = Depends(get_db), user: Principal = Depends(get_current_user)):
     return db.query(models.ActivitySpec).order_by(models.ActivitySpec.id).all()
 
 
@@ -22,7 +22,7 @@ def list_specs(db: Session = Depends(get_db), user: models.User = Depends(get_cu
 def create_spec(
     body: schemas.ActivitySpecCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     spec = models.ActivitySpec(
         spec_id=body.spec_id,
@@ -43,7 +43,7 @@ def create_spec(
 def list_instances(
     project_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     rows = (
         db.query(models.ActivityInstance)
@@ -59,7 +59,7 @@ def list_instances(
 def create_instance(
     body: schemas.ActivityInstanceCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     spec = db.query(models.ActivitySpec).filter(models.ActivitySpec.id == body.spec_id).first()
     if not spec:
@@ -90,7 +90,7 @@ def trigger_node(
     instance_uid: str,
     body: schemas.NodeTriggerRequest,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     inst = db.query(models.ActivityInstance).filter(models.ActivityInstance.instance_uid == instance_uid).first()
     if not inst:
@@ -113,7 +113,7 @@ def complete_node(
     instance_uid: str,
     body: schemas.NodeTriggerRequest,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     inst = db.query(models.ActivityInstance).filter(models.ActivityInstance.instance_uid == instance_uid).first()
     if not inst:
@@ -132,7 +132,7 @@ def complete_node(
 def skip_node(
     instance_uid: str,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     inst = db.query(models.ActivityInstance).filter(models.ActivityInstance.instance_uid == instance_uid).first()
     if not inst:
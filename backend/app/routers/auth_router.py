@@ -1,23 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from .. import models, schemas
 from ..database import get_db
-from ..auth import get_current_user, get_password_hash, create_access_token, verify_password
+from ..auth import Principal, get_current_user, create_access_token, load_current_user
+from ..passwords import PasswordPoolBusy, verify_password_async
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def _find_login_user(db: Session, email: str) -> models.User | None:
+    user = db.query(models.User).filter(models.User.email == email).first()
+    db.close()  # give the pooled connection back before the slow bcrypt check (user stays loaded, detached)
+    return user
+
+
 @router.post("/login", response_model=schemas.Token)
-def login(body: schemas.LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == body.email).first()
+async def login(body: schemas.LoginRequest, db: Session = Depends(get_db)):
+    """bcrypt runs on the password worker pool (app.passwords); 429 + Retry-After when it is saturated."""
+    user = await run_in_threadpool(_find_login_user, db, body.email)
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="Invalid email or password")
-    if not verify_password(body.password, user.hashed_password):
+    try:
+        ok = await verify_password_async(body.password, user.hashed_password)
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=429, detail="Too many logins in progress, retry shortly", headers={"Retry-After": str(e.retry_after)})
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     token = create_access_token(data={"sub": str(user.id), "role": user.role})
     return schemas.Token(access_token=token, user=schemas.UserResponse.model_validate(user))
 
 
 @router.get("/me", response_model=schemas.UserResponse)
-def me(user: models.User = Depends(get_current_user)):
-    return user
+def me(db: Session = Depends(get_db), user: Principal = Depends(get_current_user)):
+    return load_current_user(db, user)
@@ -1,17 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy.orm import Session
 from .. import models, schemas
 from ..database import get_db
-from ..auth import get_current_user, require_ops
+from ..auth import Principal, get_current_user, require_ops
+from ..config import settings
+from ..ingest import insert_task_chunk, iter_csv_rows, iter_ndjson_rows
 
 router = APIRouter(prefix="/batches", tags=["batches"])
 
+# Progress of recent file uploads, polled via GET /batches/uploads/{upload_id}. Oldest dropped beyond the cap.
+_UPLOAD_PROGRESS: "OrderedDict[str, dict]" = OrderedDict()
+_UPLOAD_PROGRESS_MAX = 256
+
+
+def _upload_format(file: UploadFile, fmt: str | None) -> str:
+    fmt = (fmt or "").lower()
+    if not fmt:
+        name = (file.filename or "").lower()
+        if name.endswith(".csv") or (file.content_type or "") == "text/csv":
+            fmt = "csv"
+        elif name.endswith((".ndjson", ".jsonl")):
+            fmt = "ndjson"
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Upload format must be ndjson or csv (use ?format= or a .ndjson/.jsonl/.csv file)")
+    return fmt
+
 
 @router.get("", response_model=list[schemas.BatchResponse])
 def list_batches(
     project_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     return db.query(models.Batch).filter(models.Batch.project_id == project_id).order_by(models.Batch.created_at.desc()).all()
 
@@ -20,7 +44,7 @@ def list_batches(
 def create_batch(
     body: schemas.BatchCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     proj = db.query(models.Project).filter(models.Project.id == body.project_id).first()
     if not proj:
@@ -32,11 +56,96 @@ def create_batch(
     return batch
 
 
+@router.post("/{batch_id}/upload")
+def upload_batch_tasks(
+    batch_id: int,
+    file: UploadFile = File(...),
+    format: str | None = Query(None, description="ndjson or csv; inferred from the file name if omitted"),
+    upload_id: str | None = Query(None, description="Client-chosen id to poll progress at /batches/uploads/{upload_id}"),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(require_ops),
+):
+    """Create tasks from an NDJSON or CSV file, parsed row by row and written in bounded chunks (one commit per chunk).
+    Invalid rows are reported with their line number and skipped; the rest of the file still loads."""
+    batch = db.query(models.Batch).filter(models.Batch.id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    fmt = _upload_format(file, format)
+    upload_id = upload_id or uuid.uuid4().hex
+    progress = {
+        "upload_id": upload_id,
+        "batch_id": batch_id,
+        "format": fmt,
+        "file_name": file.filename,
+        "status": "running",
+        "rows_read": 0,
+        "inserted": 0,
+        "failed": 0,
+        "first_id": None,
+        "last_id": None,
+        "errors": [],
+        "errors_truncated": False,
+        "started_at": datetime.utcnow().isoformat(),
+        "finished_at": None,
+    }
+    _UPLOAD_PROGRESS[upload_id] = progress
+    while len(_UPLOAD_PROGRESS) > _UPLOAD_PROGRESS_MAX:
+        _UPLOAD_PROGRESS.popitem(last=False)
+
+    def write(chunk):
+        ids = insert_task_chunk(db, batch_id, chunk)
+        db.commit()
+        if ids:
+            progress["inserted"] += len(ids)
+            progress["first_id"] = min(ids) if progress["first_id"] is None else min(progress["first_id"], min(ids))
+            progress["last_id"] = max(ids) if progress["last_id"] is None else max(progress["last_id"], max(ids))
+        chunk.clear()
+
+    rows = iter_csv_rows(file.file) if fmt == "csv" else iter_ndjson_rows(file.file)
+    chunk = []
+    try:
+        for row_no, content, error in rows:
+            progress["rows_read"] += 1
+            if error:
+                progress["failed"] += 1
+                if len(progress["errors"]) < settings.upload_max_row_errors:
+                    progress["errors"].append({"row": row_no, "error": error})
+                else:
+                    progress["errors_truncated"] = True
+                continue
+            chunk.append(content)
+            if len(chunk) >= settings.ingest_chunk_size:
+                write(chunk)
+        if chunk:
+            write(chunk)
+        progress["status"] = "done"
+    except Exception as e:
+        db.rollback()
+        progress["status"] = "failed"
+        progress["errors"].append({"row": None, "error": f"Upload aborted: {e}"})
+        raise HTTPException(status_code=500, detail={k: progress[k] for k in ("upload_id", "inserted", "failed", "status")})
+    finally:
+        progress["finished_at"] = datetime.utcnow().isoformat()
+    return progress
+
+
+@router.get("/uploads/{upload_id}")
+def get_upload_progress(
+    upload_id: str,
+    user: Principal = Depends(require_ops),
+):
+    """Progress of a running or recent batch upload (rows read, inserted, failed, per-row errors)."""
+    progress = _UPLOAD_PROGRESS.get(upload_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return progress
+
+
 @router.get("/{batch_id}", response_model=schemas.BatchResponse)
 def get_batch(
     batch_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     batch = db.query(models.Batch).filter(models.Batch.id == batch_id).first()
     if not batch:
@@ -48,7 +157,7 @@ def get_batch(
 def delete_batch(
     batch_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     batch = db.query(models.Batch).filter(models.Batch.id == batch_id).first()
     if not batch:
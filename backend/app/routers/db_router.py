@@ -7,8 +7,8 @@ from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 
 from .. import models
-from ..database import get_db, engine, Base
-from ..auth import get_current_user, require_ops
+from ..database import get_db, engine, Base, pool_status
+from ..auth import Principal, get_current_user, require_ops
 
 router = APIRouter(prefix="/db", tags=["db"])
 
@@ -115,9 +115,15 @@ if "task_claim_requests" in ALLOWED_TABLES:
     RELATIONSHIP_MAP["task_claim_requests"] = [("tasks", "task_id"), ("users", "requested_by_id"), ("users", "current_assignee_id"), ("users", "approved_by_id")]
 
 
+@router.get("/pool")
+def get_pool_status(_: Principal = Depends(require_ops)):
+    """Connection pool use (checked out, overflow, saturation, peak) and SQLite journal mode."""
+    return pool_status()
+
+
 @router.get("/tables")
 def list_tables(
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     """List all allowed table names with schema and relationship info for each. Super Admin, Admin, and Ops Manager can access."""
     try:
@@ -155,7 +161,7 @@ def get_table_data(
     limit: int = Query(500, le=2000),
     offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     """Load rows for a whitelisted table. Returns list of dicts (serializable)."""
     if table_name not in ALLOWED_TABLES:
@@ -0,0 +1,431 @@
+"""
+Server-side project export, streamed.
+One query joins tasks, batches and each task's latest annotation; rows are fetched with yield_per and written
+straight into a StreamingResponse (JSONL, a ZIP holding tasks.jsonl + manifest.json, or columnar Parquet /
+Arrow IPC via app.columnar_export), so memory stays flat regardless of project size.
+Replaces the client-side /tasks + /tasks/{id}/annotations fan-out.
+Incremental exports: POST /export/projects/{id}/snapshots emits only tasks changed since the previous snapshot's
+high-water mark (Task.updated_at, Annotation.id) and records a new ExportSnapshot, so nightly exports are O(changes).
+updated_at is stamped before commit, so a delta re-reads export_cursor_settle_seconds behind the previous cursor;
+tasks in that overlap are emitted again, which is harmless because records are per-task upserts.
+Tombstones come from task_events: a task whose latest review event is a reject inside the window.
+include=all_annotations adds each task's full annotation history, read in one query per EXPORT_FETCH_SIZE tasks.
+"""
+import io
+import json
+import zipfile
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, false, func, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from .. import models
+from ..config import settings
+from ..columnar_export import iter_columnar, require_pyarrow
+from ..database import get_db, SessionLocal
+from ..auth import Principal, get_current_user, require_ops
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+EXPORT_FETCH_SIZE = 1000
+RECORD_COLUMNS = 16  # columns of _export_query before the delta-only tombstone flag
+ZIP_FLUSH_BYTES = 1 << 16
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, unseekable sink; zipfile writes into it and we drain it into the HTTP response."""
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self.size += len(b)
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _export_query(project_id: int, status: str | None, pipeline_stage: str | None, since: tuple | None = None, until: tuple | None = None):
+    """tasks JOIN batches LEFT JOIN latest annotation (highest id per task).
+    Ordered batch by batch in creation order, which the (batch_id, created_at, id) index serves without a sort.
+    since/until = (Task.updated_at, Annotation.id) high-water marks: only tasks changed in that window (delta export),
+    plus a trailing tombstone column."""
+    latest = aliased(models.Annotation)
+    latest_id = (
+        select(func.max(models.Annotation.id))
+        .where(models.Annotation.task_id == models.Task.id)
+        .correlate(models.Task)
+        .scalar_subquery()
+    )
+    q = (
+        select(
+            models.Task.id, models.Task.batch_id, models.Batch.name, models.Task.status, models.Task.pipeline_stage,
+            models.Task.content, models.Task.claimed_by_id, models.Task.assigned_reviewer_id, models.Task.rework_count,
+            models.Task.created_at, models.Task.updated_at,
+            latest.id, latest.user_id, latest.response, latest.pipeline_stage, latest.created_at,
+        )
+        .join(models.Batch, models.Task.batch_id == models.Batch.id)
+        .outerjoin(latest, latest.id == latest_id)
+        .where(models.Batch.project_id == project_id)
+        .order_by(models.Batch.id, models.Task.created_at, models.Task.id)
+    )
+    if status:
+        q = q.where(models.Task.status == status)
+    if pipeline_stage:
+        q = q.where(models.Task.pipeline_stage == pipeline_stage)
+    if since is not None:
+        since_updated, since_ann = since
+        until_updated, until_ann = until
+        # Overlap: a task stamped just before the previous cursor may have committed after it was read
+        settled = since_updated - timedelta(seconds=settings.export_cursor_settle_seconds) if since_updated else None
+        task_changed = models.Task.updated_at <= until_updated if until_updated else false()
+        if settled is not None:
+            task_changed = and_(models.Task.updated_at > settled, task_changed)
+        new_annotation = models.Task.id.in_(
+            select(models.Annotation.task_id).where(models.Annotation.id > (since_ann or 0), models.Annotation.id <= until_ann)
+        )
+        q = q.where(or_(task_changed, new_annotation))
+        # Tombstone: the task's latest review event is a reject inside the window (a later approve supersedes it)
+        event = aliased(models.TaskEvent)
+        latest_event_id = (
+            select(func.max(models.TaskEvent.id))
+            .where(models.TaskEvent.task_id == models.Task.id)
+            .correlate(models.Task)
+            .scalar_subquery()
+        )
+        rejected = event.event == "reject"
+        if settled is not None:
+            rejected = and_(rejected, event.created_at > settled)
+        q = q.outerjoin(event, event.id == latest_event_id).add_columns(rejected.label("tombstone"))
+    return q
+
+
+def _high_water_mark(db: Session, project_id: int) -> tuple:
+    """(latest Task.updated_at in the project or None if it has no tasks, latest Annotation.id) — the cursor a snapshot records."""
+    max_updated = (
+        db.query(func.max(models.Task.updated_at))
+        .join(models.Batch, models.Task.batch_id == models.Batch.id)
+        .filter(models.Batch.project_id == project_id)
+        .scalar()
+    )
+    max_annotation_id = db.query(func.max(models.Annotation.id)).scalar() or 0
+    return max_updated, max_annotation_id
+
+
+def _is_tombstone(row) -> bool:
+    """Task sent back to L1 by a reviewer inside the delta window: downstream copies of its approved label are stale."""
+    return len(row) > RECORD_COLUMNS and bool(row[RECORD_COLUMNS])
+
+
+def _row_to_record(row) -> dict:
+    (task_id, batch_id, batch_name, status, stage, content, claimed_by_id, reviewer_id, rework_count,
+     created_at, updated_at, ann_id, ann_user_id, ann_response, ann_stage, ann_created_at) = row[:RECORD_COLUMNS]
+    return {
+        "task_id": task_id,
+        "batch_id": batch_id,
+        "batch_name": batch_name,
+        "status": status,
+        "pipeline_stage": stage,
+        "content": content or {},
+        "claimed_by_id": claimed_by_id,
+        "assigned_reviewer_id": reviewer_id,
+        "rework_count": rework_count or 0,
+        "created_at": _iso(created_at),
+        "updated_at": _iso(updated_at),
+        "annotation": {
+            "id": ann_id,
+            "user_id": ann_user_id,
+            "response": ann_response,
+            "pipeline_stage": ann_stage,
+            "created_at": _iso(ann_created_at),
+        } if ann_id is not None else None,
+    }
+
+
+def _iter_rows(query):
+    """Rows from a server-side cursor, in a session owned by the response stream."""
+    db = SessionLocal()
+    try:
+        yield from db.execute(query.execution_options(yield_per=EXPORT_FETCH_SIZE))
+    finally:
+        db.close()
+
+
+def _annotation_history(db: Session, task_ids: list) -> dict:
+    """task_id -> every annotation of the task, oldest first (the /tasks/{id}/annotations shape)."""
+    history = {tid: [] for tid in task_ids}
+    rows = db.execute(
+        select(
+            models.Annotation.id, models.Annotation.task_id, models.Annotation.user_id, models.Annotation.response,
+            models.Annotation.pipeline_stage, models.Annotation.created_at, models.Annotation.updated_at,
+        )
+        .where(models.Annotation.task_id.in_(task_ids))
+        .order_by(models.Annotation.task_id, models.Annotation.id)
+    )
+    for ann_id, task_id, user_id, response, stage, created_at, updated_at in rows:
+        history[task_id].append({
+            "id": ann_id,
+            "task_id": task_id,
+            "user_id": user_id,
+            "response": response,
+            "pipeline_stage": stage,
+            "created_at": _iso(created_at),
+            "updated_at": _iso(updated_at),
+        })
+    return history
+
+
+def _iter_with_history(query):
+    """(row, annotations) pairs; the history is loaded per EXPORT_FETCH_SIZE rows so memory stays bounded."""
+    db = SessionLocal()
+    try:
+        chunk = []
+        for row in _iter_rows(query):
+            chunk.append(row)
+            if len(chunk) >= EXPORT_FETCH_SIZE:
+                history = _annotation_history(db, [r[0] for r in chunk])
+                yield from ((r, history[r[0]]) for r in chunk)
+                chunk = []
+        if chunk:
+            history = _annotation_history(db, [r[0] for r in chunk])
+            yield from ((r, history[r[0]]) for r in chunk)
+    finally:
+        db.close()
+
+
+def _iter_jsonl(query, stats: dict, delta: bool = False, all_annotations: bool = False):
+    """Yield one encoded JSON line per task. Delta exports tag each line with op: upsert | tombstone.
+    all_annotations adds an annotations list (every annotation of the task, oldest first) to each record."""
+    rows = _iter_with_history(query) if all_annotations else ((row, None) for row in _iter_rows(query))
+    for row, history in rows:
+        stats["tasks"] += 1
+        if row[11] is not None:
+            stats["annotated"] += 1
+        if delta and _is_tombstone(row):
+            stats["tombstones"] += 1
+            record = {
+                "op": "tombstone",
+                "reason": "rejected_to_l1",
+                "task_id": row[0],
+                "batch_id": row[1],
+                "status": row[3],
+                "pipeline_stage": row[4],
+                "rework_count": row[8] or 0,
+                "updated_at": _iso(row[10]),
+            }
+        elif delta:
+            record = {"op": "upsert", **_row_to_record(row)}
+        else:
+            record = _row_to_record(row)
+        if history is not None and record.get("op") != "tombstone":
+            record["annotations"] = history
+        yield (json.dumps(record, default=str) + "\n").encode()
+
+
+def _iter_columnar(query, response_schema: dict, fmt: str):
+    buf = _StreamBuffer()
+    for _ in iter_columnar(_iter_rows(query), response_schema, fmt, buf):
+        if buf.size:
+            yield buf.drain()
+
+
+def _iter_zip(query, manifest: dict, stats: dict, delta: bool = False, all_annotations: bool = False):
+    buf = _StreamBuffer()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        with zf.open("tasks.jsonl", "w", force_zip64=True) as entry:
+            for line in _iter_jsonl(query, stats, delta, all_annotations):
+                entry.write(line)
+                if buf.size >= ZIP_FLUSH_BYTES:
+                    yield buf.drain()
+        # Written last: counts are only known once the rows have streamed
+        manifest.update({"task_count": stats["tasks"], "annotated_count": stats["annotated"], "tombstone_count": stats["tombstones"], "files": ["tasks.jsonl"]})
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+    yield buf.drain()
+
+
+def _then(chunks, on_complete):
+    """Run on_complete only after the last chunk was handed to the client (not on disconnect)."""
+    yield from chunks
+    on_complete()
+
+
+def _stream_rows(
+    project: models.Project, fmt: str, query, filters: dict, delta_info: dict | None = None, on_complete=None,
+    all_annotations: bool = False,
+):
+    """StreamingResponse for one export; on_complete(stats) runs once the whole body has been sent."""
+    stats = {"tasks": 0, "annotated": 0, "tombstones": 0}
+    stamp = datetime.utcnow()
+    base_name = f"project-{project.id}-{stamp.strftime('%Y%m%d-%H%M%S')}"
+    delta = delta_info is not None
+    if fmt in ("parquet", "arrow"):
+        chunks = _iter_columnar(query, project.response_schema or {}, fmt)
+        media_type = "application/vnd.apache.parquet" if fmt == "parquet" else "application/vnd.apache.arrow.file"
+    elif fmt == "jsonl":
+        chunks = _iter_jsonl(query, stats, delta, all_annotations)
+        media_type = "application/x-ndjson"
+    else:
+        manifest = {
+            "project_id": project.id,
+            "project_name": project.name,
+            "external_id": project.external_id,
+            "response_schema": project.response_schema or {},
+            "exported_at": stamp.isoformat(),
+            "filters": filters,
+            "record_format": "one JSON object per task; annotation = latest annotation or null",
+        }
+        if all_annotations:
+            manifest["record_format"] += "; annotations = every annotation of the task, oldest first"
+        if delta:
+            manifest["delta"] = delta_info
+            manifest["record_format"] += "; op = upsert | tombstone (task rejected back to L1)"
+        chunks = _iter_zip(query, manifest, stats, delta, all_annotations)
+        media_type = "application/zip"
+    if on_complete:
+        chunks = _then(chunks, lambda: on_complete(stats))
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{base_name}.{fmt}"'})
+
+
+def _get_project(db: Session, project_id: int) -> models.Project:
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+
+def _check_format(fmt: str, delta: bool = False, include: str | None = None):
+    allowed = ("jsonl", "zip") if delta or include else ("jsonl", "zip", "parquet", "arrow")
+    if include not in (None, "all_annotations"):
+        raise HTTPException(status_code=400, detail="include must be all_annotations")
+    if fmt not in allowed:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(allowed)}")
+    if fmt in ("parquet", "arrow") and require_pyarrow() is None:
+        raise HTTPException(status_code=501, detail="Parquet/Arrow export needs the pyarrow package on the server")
+
+
+def _snapshot_to_dict(snap: models.ExportSnapshot) -> dict:
+    return {
+        "id": snap.id,
+        "project_id": snap.project_id,
+        "format": snap.format,
+        "since_snapshot_id": snap.since_snapshot_id,
+        "cursor_updated_at": _iso(snap.cursor_updated_at),
+        "cursor_annotation_id": snap.cursor_annotation_id,
+        "row_count": snap.row_count,
+        "tombstone_count": snap.tombstone_count,
+        "created_by_id": snap.created_by_id,
+        "created_at": _iso(snap.created_at),
+    }
+
+
+@router.get("/projects/{project_id}")
+def export_project(
+    project_id: int,
+    format: str = Query("jsonl", description="jsonl, zip (tasks.jsonl + manifest.json), parquet or arrow"),
+    status: str | None = Query(None),
+    pipeline_stage: str | None = Query(None),
+    since_snapshot: int | None = Query(None, description="Only tasks changed since this snapshot (jsonl/zip; no new snapshot recorded)"),
+    include: str | None = Query(None, description="all_annotations: also every annotation of each task, oldest first (jsonl/zip)"),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user),
+):
+    """Stream every task of the project with its batch and latest annotation.
+    parquet/arrow flatten the latest response into one typed column per response_schema key."""
+    project = _get_project(db, project_id)
+    _check_format(format, delta=since_snapshot is not None, include=include)
+    filters = {"status": status, "pipeline_stage": pipeline_stage}
+    all_annotations = include == "all_annotations"
+    if since_snapshot is None:
+        return _stream_rows(project, format, _export_query(project_id, status, pipeline_stage), filters, all_annotations=all_annotations)
+    snap = db.query(models.ExportSnapshot).filter(models.ExportSnapshot.id == since_snapshot, models.ExportSnapshot.project_id == project_id).first()
+    if not snap:
+        raise HTTPException(status_code=404, detail="Snapshot not found for this project")
+    since = (snap.cursor_updated_at, snap.cursor_annotation_id)
+    until = _high_water_mark(db, project_id)
+    delta_info = {"since_snapshot_id": snap.id, "since": [_iso(since[0]), since[1]], "until": [_iso(until[0]), until[1]]}
+    return _stream_rows(
+        project, format, _export_query(project_id, status, pipeline_stage, since, until), filters, delta_info,
+        all_annotations=all_annotations,
+    )
+
+
+@router.post("/projects/{project_id}/snapshots")
+def create_export_snapshot(
+    project_id: int,
+    format: str = Query("jsonl", description="jsonl or zip"),
+    full: bool = Query(False, description="Export everything instead of changes since the latest snapshot"),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(require_ops),
+):
+    """Incremental export: stream tasks changed since the project's latest snapshot (tombstones for tasks
+    rejected back to L1), then record a new snapshot with the high-water mark. The first call exports everything."""
+    project = _get_project(db, project_id)
+    _check_format(format, delta=True)
+    previous = None
+    if not full:
+        previous = (
+            db.query(models.ExportSnapshot)
+            .filter(models.ExportSnapshot.project_id == project_id)
+            .order_by(models.ExportSnapshot.id.desc())
+            .first()
+        )
+    # Cursor taken before reading rows: anything changing during the stream is picked up again next time
+    until = _high_water_mark(db, project_id)
+    if previous:
+        since = (previous.cursor_updated_at, previous.cursor_annotation_id)
+        query = _export_query(project_id, None, None, since, until)
+        delta_info = {"since_snapshot_id": previous.id, "since": [_iso(since[0]), since[1]], "until": [_iso(until[0]), until[1]]}
+    else:
+        query = _export_query(project_id, None, None)
+        delta_info = {"since_snapshot_id": None, "since": None, "until": [_iso(until[0]), until[1]]}
+    user_id = user.id
+
+    def record(stats):
+        session = SessionLocal()
+        try:
+            session.add(models.ExportSnapshot(
+                project_id=project_id,
+                format=format,
+                since_snapshot_id=previous.id if previous else None,
+                cursor_updated_at=until[0],
+                cursor_annotation_id=until[1],
+                row_count=stats["tasks"],
+                tombstone_count=stats["tombstones"],
+                created_by_id=user_id,
+            ))
+            session.commit()
+        finally:
+            session.close()
+
+    return _stream_rows(project, format, query, {"status": None, "pipeline_stage": None}, delta_info, on_complete=record)
+
+
+@router.get("/projects/{project_id}/snapshots")
+def list_export_snapshots(
+    project_id: int,
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user),
+):
+    """Export snapshots of the project, newest first."""
+    _get_project(db, project_id)
+    snaps = (
+        db.query(models.ExportSnapshot)
+        .filter(models.ExportSnapshot.project_id == project_id)
+        .order_by(models.ExportSnapshot.id.desc())
+        .all()
+    )
+    return [_snapshot_to_dict(s) for s in snaps]
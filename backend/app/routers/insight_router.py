@@ -1,51 +1,70 @@
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func
+import asyncio
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import case, func, or_, select
 from sqlalchemy.orm import Session
 from .. import models
-from ..database import get_db
-from ..auth import get_current_user
+from ..config import settings
+from ..database import SessionLocal, get_db
+from ..agreement import project_agreement
+from ..annotation_metrics import word_count
+from ..auth import Principal, get_current_user
+from ..cache import etag_matches, get_or_compute
+from ..claims import draft_is_empty
+from ..events import EVENT_METRICS, format_sse, get_broker
+from ..forecast import FORECAST_METRICS
+from ..rollups import GRANULARITIES, METRICS, ROLLUP_METRICS, bucket_start
+from ..task_stats import STAT_COLUMNS
 
 router = APIRouter(prefix="/insight", tags=["insight"])
 
 
-def _word_count_from_json(obj):
-    """Recursively sum word count from JSON (strings only)."""
-    if obj is None:
-        return 0
-    if isinstance(obj, str):
-        return len(obj.split())
-    if isinstance(obj, dict):
-        return sum(_word_count_from_json(v) for v in obj.values())
-    if isinstance(obj, list):
-        return sum(_word_count_from_json(v) for v in obj)
-    return 0
+def _cached(request: Request, key: tuple, compute, project_id: int | None = None):
+    """Serve compute() through app.cache with an ETag; 304 when the client already has this version.
+    project_id scopes the entry to that project's counter moves (see app.cache)."""
+    value, etag = get_or_compute(key, compute, project_id)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(value, headers=headers)
+
+
+def _seconds_between(db: Session, later, earlier):
+    """SQL expression for (later - earlier) in seconds."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", later - earlier)
+    return (func.julianday(later) - func.julianday(earlier)) * 86400.0
 
 
 @router.get("/stats")
 def get_insight_stats(
+    request: Request,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """Return workspace, project, task, and user counts for the Insight tab."""
+    return _cached(request, ("stats",), lambda: _insight_stats(db))
+
+
+def _insight_stats(db: Session) -> dict:
     workspace_total = db.query(models.Workspace).count()
     project_counts = (
         db.query(models.Project.status, func.count(models.Project.id))
         .group_by(models.Project.status)
         .all()
     )
-    task_counts = (
-        db.query(models.Task.status, func.count(models.Task.id))
-        .group_by(models.Task.status)
-        .all()
-    )
+    # Materialized counters (app.task_stats) instead of a GROUP BY over every task
+    stats = models.ProjectTaskStat
+    task_totals = db.query(*[func.coalesce(func.sum(getattr(stats, c)), 0) for c in STAT_COLUMNS]).one()
     user_counts = (
         db.query(models.User.role, func.count(models.User.id))
         .group_by(models.User.role)
         .all()
     )
     projects_by_status = {str(s): c for s, c in project_counts}
-    tasks_by_status = {str(s): c for s, c in task_counts}
+    tasks_by_status = {c: int(n) for c, n in zip(STAT_COLUMNS, task_totals) if n or c != "other"}
     users_by_role = {str(r): c for r, c in user_counts}
     return {
         "workspaces": {"total": workspace_total},
@@ -66,11 +85,16 @@ def get_insight_stats(
 
 @router.get("/project/{project_id}/annotator-report")
 def get_project_annotator_report(
+    request: Request,
     project_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """Per-project annotator statistics: assigned, accepted, unlabeled, skipped, draft, word count, avg annotation time."""
+    return _cached(request, ("annotator-report", project_id), lambda: _annotator_report(db, project_id), project_id)
+
+
+def _annotator_report(db: Session, project_id: int) -> dict:
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -87,38 +111,72 @@ def get_project_annotator_report(
     if not annotator_ids:
         return {"project_id": project_id, "project_name": project.name, "annotators": []}
 
-    # Tasks in this project (via batch)
-    batch_ids = [b.id for b in db.query(models.Batch.id).filter(models.Batch.project_id == project_id).all()]
-    if not batch_ids:
-        return {"project_id": project_id, "project_name": project.name, "annotators": []}
+    in_project = select(models.Batch.id).where(models.Batch.project_id == project_id)
 
-    tasks_in_project = (
-        db.query(models.Task)
-        .filter(models.Task.batch_id.in_(batch_ids))
+    # Tasks each annotator currently holds: unlabeled / skipped / draft counts
+    claim_rows = (
+        db.query(
+            models.Task.claimed_by_id,
+            func.count(models.Task.id),
+            func.sum(case((models.Task.status.in_(("pending", "in_progress")), 1), else_=0)),
+            func.sum(case((models.Task.status == "skipped", 1), else_=0)),
+            func.sum(case((~draft_is_empty(), 1), else_=0)),
+        )
+        .filter(models.Task.batch_id.in_(in_project), models.Task.claimed_by_id.in_(annotator_ids))
+        .group_by(models.Task.claimed_by_id)
         .all()
     )
-    task_ids = [t.id for t in tasks_in_project]
-    tasks_by_id = {t.id: t for t in tasks_in_project}
-
-    # Annotations in these tasks
-    anns = (
-        db.query(models.Annotation)
-        .filter(models.Annotation.task_id.in_(task_ids))
-        .order_by(models.Annotation.task_id, models.Annotation.created_at)
+    claims = {uid: (held, int(unlabeled or 0), int(skipped or 0), int(draft or 0)) for uid, held, unlabeled, skipped, draft in claim_rows}
+
+    # (annotator, task) pairs with the annotator's first annotation on the task
+    pairs = (
+        select(
+            models.Annotation.user_id.label("user_id"),
+            models.Annotation.task_id.label("task_id"),
+            func.min(models.Annotation.created_at).label("first_at"),
+        )
+        .join(models.Task, models.Task.id == models.Annotation.task_id)
+        .where(models.Task.batch_id.in_(in_project), models.Annotation.user_id.in_(annotator_ids))
+        .group_by(models.Annotation.user_id, models.Annotation.task_id)
+        .subquery()
+    )
+    seconds = _seconds_between(db, pairs.c.first_at, models.Task.claimed_at)
+    annotated_rows = (
+        db.query(
+            pairs.c.user_id,
+            func.sum(case((models.Task.status == "completed", 1), else_=0)),
+            # annotated but not currently held: added to the held count for "assigned"
+            func.sum(case((or_(models.Task.claimed_by_id.is_(None), models.Task.claimed_by_id != pairs.c.user_id), 1), else_=0)),
+            func.avg(case((seconds >= 0, seconds), else_=None)),
+        )
+        .join(models.Task, models.Task.id == pairs.c.task_id)
+        .group_by(pairs.c.user_id)
         .all()
     )
-    # First and last annotation per (task_id, user_id) for time calc
-    first_ann_by_task_user = {}
-    for a in anns:
-        key = (a.task_id, a.user_id)
-        if key not in first_ann_by_task_user:
-            first_ann_by_task_user[key] = a
-
-    task_ids_by_annotator = {}  # uid -> set of task_ids they have annotated
-    for a in anns:
-        if a.user_id not in task_ids_by_annotator:
-            task_ids_by_annotator[a.user_id] = set()
-        task_ids_by_annotator[a.user_id].add(a.task_id)
+    annotated = {uid: (int(accepted or 0), int(not_held or 0), avg) for uid, accepted, not_held, avg in annotated_rows}
+
+    # Word counts: stored per annotation at submit (app.annotation_metrics)
+    word_rows = (
+        db.query(models.Annotation.user_id, func.sum(models.Annotation.word_count))
+        .join(models.Task, models.Task.id == models.Annotation.task_id)
+        .filter(models.Task.batch_id.in_(in_project), models.Annotation.user_id.in_(annotator_ids))
+        .group_by(models.Annotation.user_id)
+        .all()
+    )
+    word_counts = {uid: int(n or 0) for uid, n in word_rows}
+    # Rows the background backfill has not reached yet are counted from the JSON
+    pending = (
+        db.query(models.Annotation.user_id, models.Annotation.response)
+        .join(models.Task, models.Task.id == models.Annotation.task_id)
+        .filter(
+            models.Task.batch_id.in_(in_project),
+            models.Annotation.user_id.in_(annotator_ids),
+            models.Annotation.word_count.is_(None),
+        )
+        .yield_per(1000)
+    )
+    for uid, response in pending:
+        word_counts[uid] = word_counts.get(uid, 0) + word_count(response)
 
     users = {u.id: u for u in db.query(models.User).filter(models.User.id.in_(annotator_ids)).all()}
     report = []
@@ -126,27 +184,10 @@ def get_project_annotator_report(
         u = users.get(uid)
         if not u:
             continue
-        annotated_task_ids = task_ids_by_annotator.get(uid) or set()
-        assigned_ids = {t.id for t in tasks_in_project if t.claimed_by_id == uid or t.id in annotated_task_ids}
-        assigned = len(assigned_ids)
-        accepted = sum(1 for t in tasks_in_project if t.status == "completed" and t.id in annotated_task_ids)
-        unlabeled = sum(1 for t in tasks_in_project if t.claimed_by_id == uid and t.status in ("pending", "in_progress"))
-        skipped = sum(1 for t in tasks_in_project if t.status == "skipped" and t.claimed_by_id == uid)
-        draft = sum(1 for t in tasks_in_project if t.claimed_by_id == uid and getattr(t, "draft_response", None) is not None)
-        word_count = 0
-        times_seconds = []
-        for a in anns:
-            if a.user_id != uid:
-                continue
-            word_count += _word_count_from_json(a.response)
-            task = tasks_by_id.get(a.task_id)
-            if task and getattr(task, "claimed_at", None):
-                first_ann = first_ann_by_task_user.get((a.task_id, uid))
-                if first_ann and first_ann.id == a.id:
-                    delta = (a.created_at - task.claimed_at).total_seconds()
-                    if delta >= 0:
-                        times_seconds.append(delta)
-        avg_time = round(sum(times_seconds) / len(times_seconds), 2) if times_seconds else None
+        held, unlabeled, skipped, draft = claims.get(uid, (0, 0, 0, 0))
+        accepted, not_held, avg = annotated.get(uid, (0, 0, None))
+        assigned = held + not_held
+        avg_time = round(float(avg), 2) if avg is not None else None
         report.append({
             "user_id": u.id,
             "annotator": getattr(u, "full_name", None) or " ".join(filter(None, [getattr(u, "first_name", ""), getattr(u, "last_name", "")])).strip() or u.email,
@@ -156,7 +197,7 @@ def get_project_annotator_report(
             "unlabeled_tasks": unlabeled,
             "skipped_tasks": skipped,
             "draft_tasks": draft,
-            "word_count": word_count,
+            "word_count": word_counts.get(uid, 0),
             "average_annotation_time_seconds": avg_time,
         })
     return {
@@ -166,30 +207,226 @@ def get_project_annotator_report(
     }
 
 
+@router.get("/project/{project_id}/agreement")
+def get_project_agreement(
+    project_id: int,
+    pipeline_stage: str | None = Query("L1", description="Annotation stage to compare; empty for all stages"),
+    max_pairs: int = Query(300, ge=0, le=5000, description="Cap on annotator pairs for Cohen's kappa (most active first)"),
+    min_overlap: int = Query(2, ge=1, description="Minimum shared tasks for a pair to be reported"),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user),
+):
+    """Inter-annotator agreement per response_schema field: percent agreement, Fleiss' kappa, Krippendorff's alpha,
+    and Cohen's kappa per annotator pair. Cached per project until a new annotation arrives (app.agreement)."""
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project_agreement(db, project, pipeline_stage or None, max_pairs, min_overlap)
+
+
 @router.get("/project-progress")
 def get_project_progress(
+    request: Request,
+    workspace_id: int | None = Query(None),
+    status: str | None = Query(None, description="Project status, e.g. active or ready_for_export"),
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
-    """List all projects with task counts (total and completed) for progress bars."""
-    projects = db.query(models.Project).order_by(models.Project.updated_at.desc()).all()
+    """List all projects with task counts (total, completed and per status) for progress bars.
+    One grouped query over projects LEFT JOIN project_task_stats, however many projects and tasks there are."""
+    return _cached(request, ("project-progress", workspace_id, status), lambda: _project_progress(db, workspace_id, status))
+
+
+def _project_progress(db: Session, workspace_id: int | None, status: str | None) -> dict:
+    stats = models.ProjectTaskStat
+    project_status = func.coalesce(models.Project.status, "active")
+    q = (
+        db.query(
+            models.Project.id,
+            models.Project.name,
+            project_status,
+            *[func.coalesce(func.sum(getattr(stats, c)), 0) for c in STAT_COLUMNS],
+        )
+        .outerjoin(stats, stats.project_id == models.Project.id)
+        .group_by(models.Project.id, models.Project.name, project_status, models.Project.updated_at)
+        .order_by(models.Project.updated_at.desc())
+    )
+    if workspace_id is not None:
+        q = q.filter(models.Project.workspace_id == workspace_id)
+    if status:
+        q = q.filter(project_status == status)
     out = []
-    for p in projects:
-        batch_ids = [b.id for b in db.query(models.Batch.id).filter(models.Batch.project_id == p.id).all()]
-        total = 0
-        completed = 0
-        if batch_ids:
-            total = db.query(models.Task).filter(models.Task.batch_id.in_(batch_ids)).count()
-            completed = (
-                db.query(models.Task)
-                .filter(models.Task.batch_id.in_(batch_ids), models.Task.status == "completed")
-                .count()
-            )
+    for project_id, name, p_status, *counts in q.all():
+        by_status = {c: int(n) for c, n in zip(STAT_COLUMNS, counts) if n or c != "other"}
         out.append({
-            "project_id": p.id,
-            "project_name": p.name,
-            "status": getattr(p, "status", None) or "active",
-            "total_tasks": total,
-            "completed_tasks": completed,
+            "project_id": project_id,
+            "project_name": name,
+            "status": p_status,
+            "total_tasks": sum(by_status.values()),
+            "completed_tasks": by_status["completed"],
+            "tasks_by_status": by_status,
         })
     return {"projects": out}
+
+
+@router.get("/forecast")
+def get_forecast(
+    request: Request,
+    project_id: int | None = Query(None),
+    workspace_id: int | None = Query(None),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user),
+):
+    """Projected completion per project (app.forecast): backlog, team rates, rework ratio, ETAs in working days,
+    completion date, and per-assignee ETAs in annotator_ids / reviewer_ids order."""
+    return _cached(request, ("forecast", project_id, workspace_id), lambda: _forecast(db, project_id, workspace_id), project_id)
+
+
+def _forecast(db: Session, project_id: int | None, workspace_id: int | None) -> dict:
+    f = models.ProjectForecast
+    q = (
+        db.query(f, models.Project.name, models.Project.annotator_ids, models.Project.reviewer_ids,
+                 models.Project.annotator_eta_days, models.Project.reviewer_eta_days)
+        .join(models.Project, models.Project.id == f.project_id)
+        .order_by(f.project_id)
+    )
+    if project_id is not None:
+        q = q.filter(f.project_id == project_id)
+    if workspace_id is not None:
+        q = q.filter(models.Project.workspace_id == workspace_id)
+    out = []
+    for row, name, a_ids, r_ids, a_eta, r_eta in q.all():
+        out.append({
+            "project_id": row.project_id,
+            "project_name": name,
+            "annotation_backlog": row.annotation_backlog,
+            "review_backlog": row.review_backlog,
+            "annotation_rate_per_day": row.annotation_rate,
+            "review_rate_per_day": row.review_rate,
+            "rework_ratio": row.rework_ratio,
+            "annotation_eta_days": row.annotation_eta_days,
+            "review_eta_days": row.review_eta_days,
+            "completion_date": row.completion_date.isoformat() if row.completion_date else None,
+            "annotators": [{"user_id": u, "eta_days": e} for u, e in zip(a_ids or [], a_eta or [])],
+            "reviewers": [{"user_id": u, "eta_days": e} for u, e in zip(r_ids or [], r_eta or [])],
+            "computed_at": row.computed_at.isoformat() if row.computed_at else None,
+        })
+    return {"projects": out, "forecaster": FORECAST_METRICS}
+
+
+@router.get("/stream")
+async def stream_insight(
+    project_id: int | None = Query(None, description="Only push changes for this project"),
+    user: Principal = Depends(get_current_user),
+):
+    """Server-Sent Events: a `snapshot` (same shape as /project-progress) followed by `task_counts` deltas
+    {project_id, pipeline_stage, deltas: {status: n}} as tasks move. A fresh snapshot follows any recount or backlog overflow."""
+    return StreamingResponse(
+        _insight_events(project_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _progress_snapshot(project_id: int | None) -> dict:
+    # Not from the cache: /project-progress may lag counter moves by the TTL, and deltas are applied on top of this
+    db = SessionLocal()
+    try:
+        value = _project_progress(db, None, None)
+    finally:
+        db.close()
+    if project_id is not None:
+        value = {"projects": [p for p in value["projects"] if p["project_id"] == project_id]}
+    return value
+
+
+async def _insight_events(project_id: int | None):
+    sub = get_broker().subscribe()  # before the snapshot, so no commit falls in between
+
+    async def snapshot() -> str:
+        # Changes already queued were committed before the snapshot is read, so it includes them
+        already_counted = sub.queue.qsize()
+        value = await run_in_threadpool(_progress_snapshot, project_id)
+        stale = [sub.queue.get_nowait() for _ in range(min(already_counted, sub.queue.qsize()))]
+        if any(m["type"] == "resync" for m in stale):  # overflowed meanwhile
+            sub.put({"type": "resync"})
+        return format_sse("snapshot", value)
+
+    try:
+        yield await snapshot()
+        while True:
+            try:
+                message = await asyncio.wait_for(sub.get(), timeout=settings.insight_stream_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message["type"] == "resync" or any(c.get("resync") for c in message["changes"]):
+                yield await snapshot()
+                continue
+            changes = message["changes"]
+            if project_id is not None:
+                changes = [c for c in changes if c["project_id"] == project_id]
+            if changes:
+                yield format_sse(message["type"], {"changes": changes})
+    finally:
+        sub.close()
+
+
+@router.get("/stream/metrics")
+def get_stream_metrics(user: Principal = Depends(get_current_user)):
+    """Publish / fan-out counters for the live stream."""
+    return EVENT_METRICS
+
+
+@router.get("/timeseries")
+def get_timeseries(
+    request: Request,
+    granularity: str = Query("day", description="hour or day"),
+    project_id: int | None = Query(None),
+    user_id: int | None = Query(None),
+    role: str | None = Query(None, description="annotator or reviewer"),
+    date_from: datetime | None = Query(None),
+    date_to: datetime | None = Query(None),
+    by_user: bool = Query(False, description="One series per user instead of summing users"),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user),
+):
+    """Throughput over time from the hourly/daily rollups (app.rollups): submits, approvals, rejects, rework, active time.
+    Defaults to the last 90 days (day) or 7 days (hour)."""
+    return _cached(request, ("timeseries", granularity, project_id, user_id, role, date_from, date_to, by_user), lambda: _timeseries(db, granularity, project_id, user_id, role, date_from, date_to, by_user))
+
+
+def _timeseries(db: Session, granularity: str, project_id: int | None, user_id: int | None, role: str | None, date_from: datetime | None, date_to: datetime | None, by_user: bool) -> dict:
+    model = GRANULARITIES.get(granularity)
+    if model is None:
+        raise HTTPException(status_code=400, detail="granularity must be hour or day")
+    date_to = date_to or datetime.utcnow()
+    date_from = date_from or date_to - timedelta(days=90 if granularity == "day" else 7)
+    group_cols = [model.bucket_start] + ([model.user_id] if by_user else [])
+    q = (
+        db.query(*group_cols, *[func.sum(getattr(model, m)) for m in METRICS])
+        .filter(model.bucket_start >= bucket_start(date_from, granularity), model.bucket_start <= date_to)
+        .group_by(*group_cols)
+        .order_by(*group_cols)
+    )
+    if project_id is not None:
+        q = q.filter(model.project_id == project_id)
+    if user_id is not None:
+        q = q.filter(model.user_id == user_id)
+    if role:
+        q = q.filter(model.role == role)
+    points = []
+    for row in q.all():
+        point = {"bucket_start": row[0].isoformat()}
+        if by_user:
+            point["user_id"] = row[1]
+        sums = row[len(group_cols):]
+        point.update({m: (round(float(v or 0), 1) if m == "active_seconds" else int(v or 0)) for m, v in zip(METRICS, sums)})
+        points.append(point)
+    return {
+        "granularity": granularity,
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "points": points,
+        "aggregator": ROLLUP_METRICS,
+    }
@@ -1,9 +1,11 @@
 import re
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import or_, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Session
 from .. import models, schemas
 from ..database import get_db
-from ..auth import get_current_user, require_ops
+from ..auth import Principal, get_current_user, require_ops
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -26,11 +28,18 @@ def generate_next_project_id(db: Session) -> str:
 @router.get("/my-assignments", response_model=list[schemas.MyAssignmentResponse])
 def my_assignments(
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
-    """Projects where current user is assigned as annotator or reviewer, with % and ETA."""
+    """Projects where current user is assigned as annotator or reviewer, with % and ETA (precomputed by app.forecast)."""
     out = []
-    projects = db.query(models.Project).filter(models.Project.status.in_(["active", "draft"])).order_by(models.Project.updated_at.desc()).all()
+    q = db.query(models.Project).filter(models.Project.status.in_(["active", "draft"]))
+    if db.get_bind().dialect.name == "postgresql":
+        # jsonb containment, served by the GIN indexes on annotator_ids / reviewer_ids
+        q = q.filter(or_(
+            type_coerce(models.Project.annotator_ids, JSONB).contains([user.id]),
+            type_coerce(models.Project.reviewer_ids, JSONB).contains([user.id]),
+        ))
+    projects = q.order_by(models.Project.updated_at.desc()).all()
     for p in projects:
         a_ids = p.annotator_ids if isinstance(getattr(p, "annotator_ids", None), list) else []
         r_ids = p.reviewer_ids if isinstance(getattr(p, "reviewer_ids", None), list) else []
@@ -85,7 +94,7 @@ def list_projects(
     status: str | None = Query(None),
     name_contains: str | None = Query(None, description="Filter by project name (case-insensitive substring)"),
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     q = db.query(models.Project)
     if workspace_id is not None:
@@ -105,7 +114,7 @@ def list_projects(
 def create_project(
     body: schemas.ProjectCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     external_id = body.external_id if (body.external_id and body.external_id.strip()) else generate_next_project_id(db)
     proj = models.Project(
@@ -119,6 +128,7 @@ def create_project(
         pipeline_stages=body.pipeline_stages or ["L1", "Review", "Done"],
         response_schema=body.response_schema or {},
         status=body.status or "draft",
+        claim_ttl_minutes=body.claim_ttl_minutes,
         created_by_id=user.id,
     )
     db.add(proj)
@@ -131,7 +141,7 @@ def create_project(
 def get_project(
     project_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     proj = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not proj:
@@ -144,7 +154,7 @@ def update_project(
     project_id: int,
     body: schemas.ProjectBase,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     proj = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not proj:
@@ -160,7 +170,7 @@ def update_project(
 def list_children(
     project_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     return db.query(models.Project).filter(models.Project.parent_id == project_id).order_by(models.Project.created_at).all()
 
@@ -169,7 +179,7 @@ def list_children(
 def delete_project(
     project_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     proj = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not proj:
@@ -183,7 +193,7 @@ def delete_project(
 def create_default_workflow(
     project_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     """Create default orchestration flow: Start → Configure/Dataset → Assign Annotator → Annotate (manual) → Review → End."""
     proj = db.query(models.Project).filter(models.Project.id == project_id).first()
@@ -1,15 +1,74 @@
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+"""
+Annotator / reviewer queue. The hot path, so endpoints are async def on an AsyncSession (database.get_async_db):
+a request waiting on the database doesn't hold a threadpool slot. Sync helpers shared with the reaper and other
+routers (claims, task_stats, cache) run on the same session through db.run_sync.
+"""
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 from .. import models, schemas
-from ..database import get_db
-from ..auth import get_current_user, require_ops, require_annotator, require_reviewer, ROLES_OPS, ROLES_ANNOTATOR
+from ..database import get_async_db
+from ..auth import Principal, get_current_user, require_ops, require_annotator, require_reviewer, ROLES_OPS, ROLES_ANNOTATOR
+from ..cache import get_or_compute, peek
+from ..claims import claim_next_tasks, claim_specific_task, release_unused_leases
+from ..annotation_metrics import response_metrics
+from ..config import settings
+from ..reaper import REAPER_METRICS
+from ..task_stats import project_counts
 from ..routers.tasks_router import _task_to_response
 
 router = APIRouter(prefix="/queue", tags=["queue"])
 
 
-def _user_can_claim_annotator(project: models.Project, user: models.User) -> bool:
+# Hot-path queries, built here so tests/test_query_plans.py can EXPLAIN exactly what the endpoints run
+
+def _leased_query(batch_id: int, user_id: int):
+    """The annotator's leased, in-progress tasks in the batch."""
+    return select(models.Task).where(
+        models.Task.batch_id == batch_id,
+        models.Task.claimed_by_id == user_id,
+        models.Task.status == "in_progress",
+        models.Task.lease_expires_at.isnot(None),
+    )
+
+
+def _my_tasks_query(user_id: int):
+    return select(models.Task).where(models.Task.claimed_by_id == user_id, models.Task.status == "in_progress").order_by(models.Task.claimed_at)
+
+
+def _batch_tasks_query(batch_id: int, user_id: int):
+    """Claimed by user_id or unclaimed L1 tasks of the batch; non-skipped first, then by created_at."""
+    return (
+        select(models.Task)
+        .where(
+            models.Task.batch_id == batch_id,
+            models.Task.pipeline_stage == "L1",
+            (models.Task.claimed_by_id == user_id) | (models.Task.claimed_by_id.is_(None)),
+            models.Task.status.in_(["pending", "in_progress", "skipped"]),
+        )
+        .order_by(case((models.Task.status == "skipped", 1), else_=0), models.Task.created_at)
+    )
+
+
+def _review_queue_query(user_id: int, project_id: int | None):
+    q = (
+        select(models.Task)
+        .join(models.Batch)
+        .where(models.Task.pipeline_stage == "Review", models.Task.status == "pending")
+    )
+    if project_id is not None:
+        q = q.where(models.Batch.project_id == project_id)
+    q = q.where((models.Task.assigned_reviewer_id == user_id) | (models.Task.assigned_reviewer_id.is_(None)))
+    return q.order_by(models.Task.updated_at)
+
+
+def _last_annotator_query(task_id: int):
+    return select(models.Annotation.user_id).where(models.Annotation.task_id == task_id).order_by(models.Annotation.created_at.desc()).limit(1)
+
+
+def _user_can_claim_annotator(project: models.Project, user: Principal) -> bool:
     if user.role in ROLES_OPS:
         return True
     ids = getattr(project, "annotator_ids", None) or []
@@ -17,293 +76,364 @@ def _user_can_claim_annotator(project: models.Project, user: models.User) -> boo
 
 
 @router.get("/next", response_model=schemas.TaskResponse | None)
-def get_next_task(
+async def get_next_task(
     batch_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_annotator),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_annotator),
 ):
-    batch = db.query(models.Batch).filter(models.Batch.id == batch_id).first()
+    batch = await db.get(models.Batch, batch_id)
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
-    project = db.query(models.Project).filter(models.Project.id == batch.project_id).first()
+    project = await db.get(models.Project, batch.project_id)
     if not project or not _user_can_claim_annotator(project, user):
         raise HTTPException(status_code=403, detail="Not assigned to this project as annotator")
-    task = (
-        db.query(models.Task)
-        .filter(models.Task.batch_id == batch_id, models.Task.status == "pending", models.Task.claimed_by_id.is_(None), models.Task.pipeline_stage == "L1")
-        .order_by(models.Task.created_at)
-        .first()
-    )
-    if not task:
+    # Pick + claim in one statement so concurrent annotators never share a task
+    claimed_ids = await db.run_sync(claim_next_tasks, batch_id, user.id)
+    await db.commit()
+    if not claimed_ids:
         return None
-    task.claimed_by_id = user.id
-    task.claimed_at = datetime.utcnow()
-    task.status = "in_progress"
-    db.commit()
-    db.refresh(task)
+    task = await db.get(models.Task, claimed_ids[0])
     return _task_to_response(task)
 
 
+@router.post("/lease", response_model=list[schemas.TaskResponse])
+async def lease_tasks(
+    batch_id: int,
+    size: int | None = Query(None, ge=1, description="Tasks to hold; defaults to queue_lease_size"),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_annotator),
+):
+    """Hand the annotator a block of L1 tasks in one transaction. Tops up to `size` leased tasks already held in this batch.
+    Leased tasks not worked on (no draft) go back to the pool on release, on submit once expired, or when the lease runs out."""
+    batch = await db.get(models.Batch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    project = await db.get(models.Project, batch.project_id)
+    if not project or not _user_can_claim_annotator(project, user):
+        raise HTTPException(status_code=403, detail="Not assigned to this project as annotator")
+    size = min(size or settings.queue_lease_size, settings.queue_lease_max_size)
+    now = datetime.utcnow()
+    # Expired, untouched leases in this batch rejoin the pool before we pick
+    await db.run_sync(release_unused_leases, batch_id=batch_id)
+    held = _leased_query(batch_id, user.id)
+    missing = size - await db.scalar(held.with_only_columns(func.count()))
+    if missing > 0:
+        await db.run_sync(claim_next_tasks, batch_id, user.id, limit=missing, lease_expires_at=now + timedelta(minutes=settings.queue_lease_minutes))
+    await db.commit()
+    tasks = await db.scalars(held.order_by(models.Task.created_at, models.Task.id))
+    return [_task_to_response(t) for t in tasks]
+
+
+@router.post("/lease/release")
+async def release_lease(
+    batch_id: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_annotator),
+):
+    """Hand back leased tasks the annotator has not started (no draft). Optional batch_id limits the release."""
+    released = await db.run_sync(release_unused_leases, user_id=user.id, batch_id=batch_id, expired_only=False)
+    await db.commit()
+    return {"ok": True, "released": released}
+
+
+@router.get("/reaper/metrics")
+async def reaper_metrics(user: Principal = Depends(require_ops)):
+    """Abandoned-claim reaper counters: sweeps, rows reclaimed, leases released, last sweep duration."""
+    return {**REAPER_METRICS, "interval_seconds": settings.reaper_interval_seconds, "default_ttl_minutes": settings.claim_ttl_minutes}
+
+
 @router.get("/my-tasks", response_model=list[schemas.TaskResponse])
-def my_tasks(
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_annotator),
+async def my_tasks(
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_annotator),
 ):
-    tasks = db.query(models.Task).filter(models.Task.claimed_by_id == user.id, models.Task.status == "in_progress").order_by(models.Task.claimed_at).all()
+    tasks = await db.scalars(_my_tasks_query(user.id))
     return [_task_to_response(t) for t in tasks]
 
 
 @router.get("/batch/{batch_id}/tasks", response_model=list[schemas.TaskResponse])
-def batch_tasks_for_annotator(
+async def batch_tasks_for_annotator(
     batch_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_annotator),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_annotator),
 ):
     """Tasks in batch that annotator can work on: claimed by me or unclaimed. Non-skipped first, then by created_at. Skipped at end."""
-    batch = db.query(models.Batch).filter(models.Batch.id == batch_id).first()
+    batch = await db.get(models.Batch, batch_id)
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
-    project = db.query(models.Project).filter(models.Project.id == batch.project_id).first()
+    project = await db.get(models.Project, batch.project_id)
     if not project or not _user_can_claim_annotator(project, user):
         raise HTTPException(status_code=403, detail="Not assigned to this project")
-    from sqlalchemy import case
-    tasks = (
-        db.query(models.Task)
-        .filter(
-            models.Task.batch_id == batch_id,
-            models.Task.pipeline_stage == "L1",
-            (models.Task.claimed_by_id == user.id) | (models.Task.claimed_by_id.is_(None)),
-            models.Task.status.in_(["pending", "in_progress", "skipped"]),
-        )
-        .order_by(case((models.Task.status == "skipped", 1), else_=0), models.Task.created_at)
-        .all()
-    )
+    tasks = await db.scalars(_batch_tasks_query(batch_id, user.id))
     return [_task_to_response(t) for t in tasks]
 
 
 @router.post("/tasks/{task_id}/claim")
-def claim_task(
+async def claim_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_user),
 ):
     """Claim an unassigned task (or, if Ops/Admin, claim any task including reassigning)."""
     if user.role not in ROLES_ANNOTATOR:
         raise HTTPException(status_code=403, detail="Annotator or Ops access required")
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    batch = db.query(models.Batch).filter(models.Batch.id == task.batch_id).first()
+    batch = await db.get(models.Batch, task.batch_id)
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
-    project = db.query(models.Project).filter(models.Project.id == batch.project_id).first()
+    project = await db.get(models.Project, batch.project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    force = False
     if task.claimed_by_id is not None and task.claimed_by_id != user.id:
         if user.role not in ROLES_OPS:
             raise HTTPException(status_code=403, detail="Task already claimed by someone else")
         # Ops can reassign to self
+        force = True
     elif task.claimed_by_id == user.id:
-        db.commit()
+        await db.commit()
         return _task_to_response(task)
     else:
         if not _user_can_claim_annotator(project, user):
             raise HTTPException(status_code=403, detail="Not assigned to this project")
-    task.claimed_by_id = user.id
-    task.claimed_at = datetime.utcnow()
-    task.status = "in_progress"
-    db.commit()
-    db.refresh(task)
+    # Conditional UPDATE: loses cleanly if another annotator claimed it since we read the row
+    if not await db.run_sync(claim_specific_task, task_id, user.id, force=force):
+        await db.rollback()
+        raise HTTPException(status_code=403, detail="Task already claimed by someone else")
+    await db.commit()
+    await db.refresh(task)
     return _task_to_response(task)
 
 
 @router.post("/tasks/{task_id}/save-draft")
-def save_draft(
+async def save_draft(
     task_id: int,
     body: schemas.AnnotationBase,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_annotator),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_annotator),
 ):
     """Auto-save partial annotation without submitting for review."""
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     if task.claimed_by_id != user.id:
         raise HTTPException(status_code=403, detail="Not your task")
     task.draft_response = body.response
-    db.commit()
+    await db.commit()
     return {"ok": True, "task_id": task_id}
 
 
 @router.post("/tasks/{task_id}/skip")
-def skip_task(
+async def skip_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_annotator),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_annotator),
 ):
     """Mark task as skipped; annotator can revisit skipped items later."""
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     if task.claimed_by_id != user.id:
         raise HTTPException(status_code=403, detail="Not your task")
     task.status = "skipped"
-    db.commit()
+    await db.commit()
     return {"ok": True, "task_id": task_id}
 
 
 @router.post("/tasks/{task_id}/unskip")
-def unskip_task(
+async def unskip_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_annotator),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_annotator),
 ):
     """Clear skipped so task appears again in queue."""
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     if task.claimed_by_id != user.id:
         raise HTTPException(status_code=403, detail="Not your task")
     task.status = "in_progress"
-    db.commit()
+    await db.commit()
     return {"ok": True, "task_id": task_id}
 
 
 @router.post("/tasks/{task_id}/submit")
-def submit_for_review(
+async def submit_for_review(
     task_id: int,
     body: schemas.AnnotationBase,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_annotator),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_annotator),
 ):
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     if task.claimed_by_id != user.id:
         raise HTTPException(status_code=403, detail="Not your task")
-    ann = models.Annotation(task_id=task_id, user_id=user.id, response=body.response, pipeline_stage=body.pipeline_stage)
+    now = datetime.utcnow()
+    ann = models.Annotation(
+        task_id=task_id, user_id=user.id, response=body.response, pipeline_stage=body.pipeline_stage,
+        active_seconds=(now - task.claimed_at).total_seconds() if task.claimed_at else None,
+        created_at=now,
+        **response_metrics(body.response),
+    )
     db.add(ann)
     task.draft_response = None
     task.pipeline_stage = "Review"
     task.status = "pending"
     task.claimed_by_id = None
     task.claimed_at = None
-    db.commit()
+    task.lease_expires_at = None
+    # Write this task first so the bulk lease release below sees it as submitted
+    await db.flush()
+    # Any of this annotator's leases that ran out untouched go back to the pool
+    await db.run_sync(release_unused_leases, user_id=user.id)
+    await db.commit()
     return {"ok": True, "task_id": task_id}
 
 
 @router.get("/review", response_model=list[schemas.TaskResponse])
-def review_queue(
+async def review_queue(
     project_id: int | None = None,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_reviewer),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_reviewer),
 ):
-    q = (
-        db.query(models.Task)
-        .join(models.Batch)
-        .filter(models.Task.pipeline_stage == "Review", models.Task.status == "pending")
-    )
-    if project_id is not None:
-        q = q.filter(models.Batch.project_id == project_id)
-    q = q.filter((models.Task.assigned_reviewer_id == user.id) | (models.Task.assigned_reviewer_id.is_(None)))
-    tasks = q.order_by(models.Task.updated_at).all()
+    tasks = await db.scalars(_review_queue_query(user.id, project_id))
     return [_task_to_response(t) for t in tasks]
 
 
-def _check_project_ready_for_export(db: Session, project_id: int) -> bool:
-    """Return True if every task in the project is completed (so project is ready for export)."""
-    from sqlalchemy import func
-    total = db.query(models.Task).join(models.Batch).filter(models.Batch.project_id == project_id).count()
-    if total == 0:
-        return False
-    completed = (
-        db.query(models.Task)
-        .join(models.Batch)
-        .filter(models.Batch.project_id == project_id, models.Task.status == "completed")
-        .count()
-    )
-    return total == completed
+async def _last_annotator_id(db: AsyncSession, task_id: int) -> int | None:
+    return await db.scalar(_last_annotator_query(task_id))
+
+
+async def _check_project_ready_for_export(db: AsyncSession, project_id: int) -> bool:
+    """Return True if every task in the project is completed (so project is ready for export).
+    Reads the project's project_task_stats rows instead of counting its tasks."""
+    counts = await db.run_sync(project_counts, project_id)
+    return counts["total"] > 0 and counts["total"] == counts["completed"]
 
 
 @router.post("/review/{task_id}/approve")
-def approve_task(
+async def approve_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_reviewer),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_reviewer),
 ):
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     task.pipeline_stage = "Done"
     task.status = "completed"
-    db.commit()
+    batch = await db.get(models.Batch, task.batch_id)
+    if batch:
+        db.add(models.TaskEvent(task_id=task_id, project_id=batch.project_id, event="approve", user_id=user.id, annotator_id=await _last_annotator_id(db, task_id)))
+    await db.commit()
     # If all tasks in this project are now completed, mark project as ready for export
-    batch = db.query(models.Batch).filter(models.Batch.id == task.batch_id).first()
-    if batch and _check_project_ready_for_export(db, batch.project_id):
-        project = db.query(models.Project).filter(models.Project.id == batch.project_id).first()
+    if batch and await _check_project_ready_for_export(db, batch.project_id):
+        project = await db.get(models.Project, batch.project_id)
         if project:
             project.status = "ready_for_export"
-            db.commit()
+            await db.commit()
     return {"ok": True, "task_id": task_id}
 
 
 @router.post("/review/{task_id}/reject")
-def reject_task(
+async def reject_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_reviewer),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_reviewer),
 ):
     """Send back for re-labelling: same annotator must redo; rework_count incremented."""
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    last_ann = db.query(models.Annotation).filter(models.Annotation.task_id == task_id).order_by(models.Annotation.created_at.desc()).first()
-    annotator_id = last_ann.user_id if last_ann else None
+    annotator_id = await _last_annotator_id(db, task_id)
     task.pipeline_stage = "L1"
     task.status = "in_progress" if annotator_id else "pending"
     task.claimed_by_id = annotator_id
     task.claimed_at = datetime.utcnow() if annotator_id else None
     task.rework_count = (getattr(task, "rework_count", 0) or 0) + 1
     task.draft_response = None
-    db.commit()
+    batch = await db.get(models.Batch, task.batch_id)
+    if batch:
+        db.add(models.TaskEvent(task_id=task_id, project_id=batch.project_id, event="reject", user_id=user.id, annotator_id=annotator_id))
+    await db.commit()
     return {"ok": True, "task_id": task_id}
 
 
-@router.get("/stats/efficiency")
-def annotator_efficiency(
-    project_id: int | None = None,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_annotator),
-):
-    """Efficiency for current annotator: (total completed - sent back) / total. Optional project_id filter."""
-    q = db.query(models.Task).filter(models.Task.status == "completed")
-    if project_id is not None:
-        q = q.join(models.Batch).filter(models.Batch.project_id == project_id)
-    completed_tasks = q.all()
-    if not completed_tasks:
-        return {"total_completed": 0, "sent_back_count": 0, "efficiency_percent": 100.0}
-    task_ids = [t.id for t in completed_tasks]
-    anns = (
-        db.query(models.Annotation)
-        .filter(models.Annotation.task_id.in_(task_ids))
-        .order_by(models.Annotation.task_id, models.Annotation.created_at.desc())
-        .all()
-    )
-    last_annotator_by_task = {}
-    for a in anns:
-        if a.task_id not in last_annotator_by_task:
-            last_annotator_by_task[a.task_id] = a.user_id
-    my_task_ids = [tid for tid, uid in last_annotator_by_task.items() if uid == user.id]
-    total = len(my_task_ids)
+def _efficiency(total: int, sent_back: int) -> dict:
     if total == 0:
         return {"total_completed": 0, "sent_back_count": 0, "efficiency_percent": 100.0}
-    task_id_set = set(my_task_ids)
-    sent_back = sum(
-        1 for t in completed_tasks if t.id in task_id_set and (getattr(t, "rework_count", 0) or 0) > 0
-    )
-    efficiency = round((total - sent_back) / total * 100.0, 1)
     return {
         "total_completed": total,
         "sent_back_count": sent_back,
-        "efficiency_percent": efficiency,
+        "efficiency_percent": round((total - sent_back) / total * 100.0, 1),
     }
+
+
+def _latest_annotation_id():
+    """Correlated subquery: the task's latest annotation (served by ix_annotations_task_created)."""
+    return (
+        select(models.Annotation.id)
+        .where(models.Annotation.task_id == models.Task.id)
+        .order_by(models.Annotation.created_at.desc(), models.Annotation.id.desc())
+        .limit(1)
+        .correlate(models.Task)
+        .scalar_subquery()
+    )
+
+
+def _completed_with_latest(q, latest, project_id: int | None):
+    """Restrict q to completed tasks joined to their latest annotation (aliased as `latest`)."""
+    q = q.select_from(models.Task).join(latest, latest.id == _latest_annotation_id()).filter(models.Task.status == "completed")
+    if project_id is not None:
+        q = q.join(models.Batch, models.Batch.id == models.Task.batch_id).filter(models.Batch.project_id == project_id)
+    return q
+
+
+def _efficiency_by_annotator_query(project_id: int | None):
+    latest = aliased(models.Annotation)
+    q = select(latest.user_id, func.count(models.Task.id), func.sum(case((models.Task.rework_count > 0, 1), else_=0)))
+    return _completed_with_latest(q, latest, project_id).group_by(latest.user_id)
+
+
+def _annotator_efficiency_query(user_id: int, project_id: int | None):
+    """One annotator's completed tasks (latest annotation theirs) and how many were sent back; reads only their annotated tasks."""
+    latest = aliased(models.Annotation)
+    mine = select(models.Annotation.task_id).where(models.Annotation.user_id == user_id)
+    q = select(func.count(models.Task.id), func.sum(case((models.Task.rework_count > 0, 1), else_=0)))
+    return _completed_with_latest(q, latest, project_id).where(models.Task.id.in_(mine), latest.user_id == user_id)
+
+
+def _efficiency_by_annotator(db: Session, project_id: int | None) -> dict:
+    """{user_id: efficiency} for every annotator in one grouped query."""
+    rows = db.execute(_efficiency_by_annotator_query(project_id)).all()
+    return {str(uid): _efficiency(total, int(sent_back or 0)) for uid, total, sent_back in rows}
+
+
+@router.get("/stats/efficiency")
+async def annotator_efficiency(
+    project_id: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_annotator),
+):
+    """Efficiency for current annotator: (total completed - sent back) / total. Optional project_id filter.
+    A task counts for whoever made its latest annotation. Served from the cached all-annotator figures when warm,
+    otherwise only this user's annotated tasks are read."""
+    cached = peek(("efficiency", project_id))
+    if cached is not None:
+        return cached.get(str(user.id)) or _efficiency(0, 0)
+    total, sent_back = (await db.execute(_annotator_efficiency_query(user.id, project_id))).one()
+    return _efficiency(total or 0, int(sent_back or 0))
+
+
+@router.get("/stats/efficiency/annotators")
+async def annotators_efficiency(
+    project_id: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_reviewer),
+):
+    """Efficiency of every annotator (keyed by user id) in one grouped query; cached per project."""
+    by_user, _ = await db.run_sync(lambda s: get_or_compute(("efficiency", project_id), lambda: _efficiency_by_annotator(s, project_id)))
+    return {"project_id": project_id, "annotators": by_user}
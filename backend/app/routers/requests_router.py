@@ -9,7 +9,7 @@ from sqlalchemy.orm import Session
 
 from .. import models
 from ..database import get_db
-from ..auth import get_current_user, require_ops, ROLES_OPS
+from ..auth import Principal, get_current_user, require_ops, ROLES_OPS
 
 router = APIRouter(prefix="/requests", tags=["requests"])
 
@@ -35,7 +35,7 @@ class RequestResponse(BaseModel):
         from_attributes = True
 
 
-def _can_approve(user: models.User, req: models.TaskClaimRequest) -> bool:
+def _can_approve(user: Principal, req: models.TaskClaimRequest) -> bool:
     if user.role in ROLES_OPS:
         return True
     if req.current_assignee_id and user.id == req.current_assignee_id:
@@ -47,7 +47,7 @@ def _can_approve(user: models.User, req: models.TaskClaimRequest) -> bool:
 def create_claim_request(
     body: RequestCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """Annotator (or same-project user) requests to claim a task. Creates pending request."""
     task = db.query(models.Task).filter(models.Task.id == body.task_id).first()
@@ -95,7 +95,7 @@ def list_requests(
     task_id: int | None = Query(None),
     project_id: int | None = Query(None),
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """List claim requests. Ops see all; annotators see their own + where they are assignee."""
     q = db.query(models.TaskClaimRequest)
@@ -138,7 +138,7 @@ def list_requests(
 def approve_claim_request(
     request_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """Approve: assignee OR ops. Transfers task to requester."""
     req = db.query(models.TaskClaimRequest).filter(models.TaskClaimRequest.id == request_id).first()
@@ -163,7 +163,7 @@ def approve_claim_request(
 def reject_claim_request(
     request_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """Reject: assignee OR ops."""
     req = db.query(models.TaskClaimRequest).filter(models.TaskClaimRequest.id == request_id).first()
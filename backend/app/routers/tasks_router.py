@@ -1,10 +1,17 @@
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from .. import models, schemas
-from ..database import get_db
-from ..auth import get_current_user, require_ops
+from ..database import get_async_db, get_db
+from ..auth import Principal, get_current_user, require_ops
+from ..config import settings
+from ..ingest import ingest_tasks, insert_task_chunk, task_content
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
@@ -23,6 +30,7 @@ def _task_to_response(task: models.Task) -> schemas.TaskResponse:
         content=task.content or {},
         claimed_by_id=task.claimed_by_id,
         claimed_at=task.claimed_at,
+        lease_expires_at=getattr(task, "lease_expires_at", None),
         assigned_reviewer_id=task.assigned_reviewer_id,
         due_at=due,
         rework_count=getattr(task, "rework_count", None) or 0,
@@ -34,8 +42,41 @@ def _task_to_response(task: models.Task) -> schemas.TaskResponse:
     )
 
 
+# Cached totals per filter set: key -> (expires_at monotonic, count). Bounded; oldest entries evicted first.
+_TOTAL_CACHE: dict[tuple, tuple[float, int]] = {}
+_TOTAL_CACHE_MAX_ENTRIES = 1024
+
+
+def _encode_cursor(task: models.Task) -> str:
+    raw = json.dumps([task.created_at.isoformat(), task.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, task_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(task_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def _cached_total(db: AsyncSession, key: tuple, q) -> int:
+    """COUNT(*) for a filter set, reused for tasks_count_cache_seconds so paging does not recount."""
+    now = time.monotonic()
+    hit = _TOTAL_CACHE.get(key)
+    if hit and hit[0] > now:
+        return hit[1]
+    total = await db.scalar(select(func.count()).select_from(q.order_by(None).subquery()))
+    if len(_TOTAL_CACHE) >= _TOTAL_CACHE_MAX_ENTRIES:
+        _TOTAL_CACHE.pop(next(iter(_TOTAL_CACHE)))
+    _TOTAL_CACHE[key] = (now + settings.tasks_count_cache_seconds, total)
+    return total
+
+
 @router.get("", response_model=list[schemas.TaskResponse])
-def list_tasks(
+async def list_tasks(
+    response: Response,
     batch_id: int | None = Query(None),
     project_id: int | None = Query(None),
     workspace_id: int | None = Query(None),
@@ -45,49 +86,67 @@ def list_tasks(
     assigned_reviewer_id: int | None = Query(None, description="Filter by reviewer (assigned reviewer id)"),
     date_from: str | None = Query(None, description="Filter tasks updated on or after (YYYY-MM-DD)"),
     date_to: str | None = Query(None, description="Filter tasks updated on or before (YYYY-MM-DD)"),
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    limit: int | None = Query(None, ge=1, le=settings.tasks_page_size_max, description="Page size; enables keyset pagination (next page cursor in X-Next-Cursor)"),
+    cursor: str | None = Query(None, description="Opaque cursor from X-Next-Cursor of the previous page"),
+    include_total: bool = Query(False, description="Add X-Total-Count (cached per filter set, may lag slightly)"),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_user),
 ):
-    q = db.query(models.Task)
+    """Tasks newest first. Without limit/cursor the full list is returned (legacy);
+    with them, pages are keyset-paginated on (created_at, id) so deep pages cost the same as the first."""
+    q = select(models.Task)
     if batch_id is not None:
-        q = q.filter(models.Task.batch_id == batch_id)
+        q = q.where(models.Task.batch_id == batch_id)
     if project_id is not None or workspace_id is not None:
         q = q.join(models.Batch)
     if project_id is not None:
-        q = q.filter(models.Batch.project_id == project_id)
+        q = q.where(models.Batch.project_id == project_id)
     if workspace_id is not None:
-        q = q.join(models.Project, models.Batch.project_id == models.Project.id).filter(models.Project.workspace_id == workspace_id)
+        q = q.join(models.Project, models.Batch.project_id == models.Project.id).where(models.Project.workspace_id == workspace_id)
     if status:
-        q = q.filter(models.Task.status == status)
+        q = q.where(models.Task.status == status)
     if pipeline_stage:
-        q = q.filter(models.Task.pipeline_stage == pipeline_stage)
+        q = q.where(models.Task.pipeline_stage == pipeline_stage)
     if claimed_by_id is not None:
-        q = q.filter(models.Task.claimed_by_id == claimed_by_id)
+        q = q.where(models.Task.claimed_by_id == claimed_by_id)
     if assigned_reviewer_id is not None:
-        q = q.filter(models.Task.assigned_reviewer_id == assigned_reviewer_id)
+        q = q.where(models.Task.assigned_reviewer_id == assigned_reviewer_id)
     if date_from:
         try:
-            from datetime import datetime as dt
-            q = q.filter(models.Task.updated_at >= dt.strptime(date_from, "%Y-%m-%d"))
+            q = q.where(models.Task.updated_at >= datetime.strptime(date_from, "%Y-%m-%d"))
         except ValueError:
             pass
     if date_to:
         try:
-            from datetime import datetime as dt
-            q = q.filter(models.Task.updated_at < dt.strptime(date_to, "%Y-%m-%d") + dt.timedelta(days=1))
+            q = q.where(models.Task.updated_at < datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1))
         except ValueError:
             pass
-    tasks = q.order_by(models.Task.created_at.desc()).all()
+    if include_total:
+        key = (batch_id, project_id, workspace_id, status, pipeline_stage, claimed_by_id, assigned_reviewer_id, date_from, date_to)
+        response.headers["X-Total-Count"] = str(await _cached_total(db, key, q))
+    q = q.order_by(models.Task.created_at.desc(), models.Task.id.desc())
+    if limit is None and cursor is None:
+        return [_task_to_response(t) for t in await db.scalars(q)]
+    limit = limit or settings.tasks_page_size
+    if cursor:
+        after_created, after_id = _decode_cursor(cursor)
+        # Row-value comparison lets SQLite/PostgreSQL seek straight into the (created_at, id) index
+        q = q.where(tuple_(models.Task.created_at, models.Task.id) < tuple_(after_created, after_id))
+    # Fetch one extra row to know whether another page exists
+    tasks = (await db.scalars(q.limit(limit + 1))).all()
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(tasks[-1])
     return [_task_to_response(t) for t in tasks]
 
 
 @router.post("", response_model=schemas.TaskResponse)
-def create_task(
+async def create_task(
     body: schemas.TaskCreate,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(require_ops),
 ):
-    batch = db.query(models.Batch).filter(models.Batch.id == body.batch_id).first()
+    batch = await db.get(models.Batch, body.batch_id)
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
     task = models.Task(
@@ -97,69 +156,92 @@ def create_task(
         status="pending",
     )
     db.add(task)
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    await db.refresh(task)
     return _task_to_response(task)
 
 
+# /bulk and /bulk-ingest stay sync: serialising thousands of rows is CPU work that would stall the event loop,
+# and COPY on PostgreSQL needs the sync psycopg connection.
 @router.post("/bulk", response_model=list[schemas.TaskResponse])
 def bulk_create_tasks(
     body: schemas.TaskBulkCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     batch = db.query(models.Batch).filter(models.Batch.id == body.batch_id).first()
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
-    created = []
-    for item in body.items:
-        task = models.Task(batch_id=body.batch_id, content=item if isinstance(item, dict) else {"text": str(item)}, status="pending", pipeline_stage="L1")
-        db.add(task)
-        db.flush()
-        created.append(task)
+    ids = []
+    for start in range(0, len(body.items), settings.ingest_chunk_size):
+        chunk = body.items[start:start + settings.ingest_chunk_size]
+        ids.extend(insert_task_chunk(db, body.batch_id, [task_content(item) for item in chunk]))
     db.commit()
-    for t in created:
-        db.refresh(t)
-    return [_task_to_response(t) for t in created]
+    if not ids:
+        return []
+    # A range rather than IN (ids): one bound pair however many items (SQLite caps bound parameters per statement)
+    new_ids = set(ids)
+    created = (
+        db.query(models.Task)
+        .filter(models.Task.batch_id == body.batch_id, models.Task.id.between(min(ids), max(ids)))
+        .order_by(models.Task.id)
+        .all()
+    )
+    return [_task_to_response(t) for t in created if t.id in new_ids]
+
+
+@router.post("/bulk-ingest", response_model=schemas.TaskBulkIngestResponse)
+def bulk_ingest_tasks(
+    body: schemas.TaskBulkCreate,
+    db: Session = Depends(get_db),
+    user: Principal = Depends(require_ops),
+):
+    """High-volume variant of /bulk: chunked INSERT (COPY on PostgreSQL), returns only the id range and count."""
+    batch = db.query(models.Batch).filter(models.Batch.id == body.batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    result = ingest_tasks(db, body.batch_id, body.items)
+    return schemas.TaskBulkIngestResponse(batch_id=body.batch_id, **result)
 
 
 @router.get("/{task_id}", response_model=schemas.TaskResponse)
-def get_task(
+async def get_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_user),
 ):
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return _task_to_response(task)
 
 
 @router.get("/{task_id}/annotations", response_model=list[schemas.AnnotationResponse])
-def get_task_annotations(
+async def get_task_annotations(
     task_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_user),
 ):
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return list(task.annotations)
+    # Explicit query: a lazy-loaded relationship can't be awaited
+    return (await db.scalars(select(models.Annotation).where(models.Annotation.task_id == task_id).order_by(models.Annotation.id))).all()
 
 
 @router.patch("/{task_id}", response_model=schemas.TaskResponse)
-def update_task(
+async def update_task(
     task_id: int,
     body: schemas.TaskUpdate,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_user),
 ):
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     data = body.model_dump(exclude_unset=True)
     for k, v in data.items():
         setattr(task, k, v)
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    await db.refresh(task)
     return _task_to_response(task)
@@ -1,10 +1,12 @@
 import re
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from .. import models, schemas
 from ..database import get_db
-from ..auth import get_current_user, require_ops
-from ..auth import get_password_hash
+from ..auth import Principal, get_current_user, require_ops
+from ..auth import invalidate_principal, load_current_user
+from ..passwords import PasswordPoolBusy, hash_password_async
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -32,6 +34,14 @@ def _full_name(first: str, middle: str, last: str) -> str:
     return " ".join(x for x in (first or "", middle or "", last or "") if x).strip()
 
 
+async def _hash_password(password: str) -> str:
+    """bcrypt on the password worker pool (app.passwords); 429 + Retry-After when it is saturated."""
+    try:
+        return await hash_password_async(password)
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=429, detail="Too many password operations in progress, retry shortly", headers={"Retry-After": str(e.retry_after)})
+
+
 def _ensure_workspace_ids(val):
     if val is None:
         return []
@@ -45,7 +55,7 @@ def list_users(
     role: str | None = Query(None, description="Filter by role"),
     workspace_id: int | None = Query(None, description="Filter by workspace access"),
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     """List users. Only Super Admin, Admin, Ops Manager. Filters: role, workspace_id (user has access)."""
     q = db.query(models.User)
@@ -65,16 +75,16 @@ def list_users(
 
 
 @router.get("/me", response_model=schemas.UserResponse)
-def get_me(user: models.User = Depends(get_current_user)):
+def get_me(db: Session = Depends(get_db), user: Principal = Depends(get_current_user)):
     """Current logged-in user."""
-    return user
+    return load_current_user(db, user)
 
 
 @router.get("/by-role", response_model=list[schemas.UserResponse])
 def list_users_by_role(
     role: str = Query(..., description="annotator or reviewer"),
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """List users by role (e.g. for dropdowns)."""
     if role not in ("annotator", "reviewer", "ops_manager", "admin", "super_admin", "guest", "support_person"):
@@ -86,7 +96,7 @@ def list_users_by_role(
 
 
 @router.get("/roles", response_model=list[dict])
-def list_roles(_: models.User = Depends(require_ops)):
+def list_roles(_: Principal = Depends(require_ops)):
     """Return role options for User Management."""
     return [
         {"id": "super_admin", "label": "Super Admin"},
@@ -139,20 +149,22 @@ def _assign_userids(db: Session):
     db.commit()
 
 
-@router.post("/seed-dummy", response_model=dict)
-def seed_dummy_users(
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_ops),
-):
-    """Create 20+ dummy users (all roles) if they don't exist. Safe to call multiple times."""
+def _missing_seed_users(db: Session) -> list[tuple]:
+    existing = {
+        e for (e,) in db.query(models.User.email).filter(models.User.email.in_([u[0] for u in DUMMY_SEED_USERS]))
+    }
+    return [u for u in DUMMY_SEED_USERS if u[0] not in existing]
+
+
+def _insert_seed_users(db: Session, users: list[tuple]) -> int:
     created = 0
-    for email, password, full_name, role in DUMMY_SEED_USERS:
+    for email, hashed, full_name, role in users:
         if db.query(models.User).filter(models.User.email == email).first():
             continue
         new_userid = generate_next_user_id(db)
         u = models.User(
             email=email,
-            hashed_password=get_password_hash(password),
+            hashed_password=hashed,
             first_name=full_name or "",
             last_name="",
             full_name=full_name or "",
@@ -166,6 +178,19 @@ def seed_dummy_users(
         created += 1
     db.commit()
     _assign_userids(db)
+    return created
+
+
+@router.post("/seed-dummy", response_model=dict)
+async def seed_dummy_users(
+    db: Session = Depends(get_db),
+    _: Principal = Depends(require_ops),
+):
+    """Create 20+ dummy users (all roles) if they don't exist. Safe to call multiple times."""
+    missing = await run_in_threadpool(_missing_seed_users, db)
+    # One at a time: a burst of hashes would trip the pool's own admission limit
+    hashed = [(email, await _hash_password(password), full_name, role) for email, password, full_name, role in missing]
+    created = await run_in_threadpool(_insert_seed_users, db, hashed)
     return {"created": created, "message": f"Created {created} dummy user(s). All users have userids assigned."}
 
 
@@ -173,7 +198,7 @@ def seed_dummy_users(
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current: models.User = Depends(get_current_user),
+    current: Principal = Depends(get_current_user),
 ):
     """Get user by id. Ops can get any; others only self."""
     u = db.query(models.User).filter(models.User.id == user_id).first()
@@ -184,15 +209,7 @@ def get_user(
     return u
 
 
-@router.post("", response_model=schemas.UserResponse)
-def create_user(
-    body: schemas.UserCreate,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
-):
-    """Create user. Only Super Admin, Admin, Ops Manager. User ID is auto-generated."""
-    if body.role not in schemas.USER_ROLES:
-        raise HTTPException(status_code=400, detail=f"Invalid role. Allowed: {schemas.USER_ROLES}")
+def _create_user(db: Session, body: schemas.UserCreate, hashed_password: str) -> models.User:
     existing = db.query(models.User).filter(models.User.email == body.email).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -201,7 +218,7 @@ def create_user(
     workspace_ids = _ensure_workspace_ids(body.workspace_ids)
     u = models.User(
         email=body.email,
-        hashed_password=get_password_hash(body.password),
+        hashed_password=hashed_password,
         first_name=body.first_name or "",
         middle_name=body.middle_name or "",
         last_name=body.last_name or "",
@@ -221,22 +238,28 @@ def create_user(
     return u
 
 
-@router.patch("/{user_id}", response_model=schemas.UserResponse)
-def update_user(
-    user_id: int,
-    body: schemas.UserUpdate,
+@router.post("", response_model=schemas.UserResponse)
+async def create_user(
+    body: schemas.UserCreate,
     db: Session = Depends(get_db),
-    current: models.User = Depends(get_current_user),
+    user: Principal = Depends(require_ops),
 ):
-    """Update user. Ops: any field (except external_id). Others: only self, only name/company."""
+    """Create user. Only Super Admin, Admin, Ops Manager. User ID is auto-generated."""
+    if body.role not in schemas.USER_ROLES:
+        raise HTTPException(status_code=400, detail=f"Invalid role. Allowed: {schemas.USER_ROLES}")
+    hashed_password = await _hash_password(body.password)
+    return await run_in_threadpool(_create_user, db, body, hashed_password)
+
+
+def _update_user(db: Session, user_id: int, body: schemas.UserUpdate, current: Principal, hashed_password: str | None) -> models.User:
     u = db.query(models.User).filter(models.User.id == user_id).first()
     if not u:
         raise HTTPException(status_code=404, detail="User not found")
     if current.role in OPS_ROLES:
         for k, v in body.model_dump(exclude_unset=True).items():
             if k == "password":
-                if v and v.strip():
-                    u.hashed_password = get_password_hash(v)
+                if hashed_password:
+                    u.hashed_password = hashed_password
             elif k == "first_name" or k == "middle_name" or k == "last_name":
                 setattr(u, k, v or "")
             elif k == "workspace_ids":
@@ -264,5 +287,20 @@ def update_user(
             u.company_id = body.company_id
         u.full_name = _full_name(u.first_name or "", u.middle_name or "", u.last_name or "")
     db.commit()
+    invalidate_principal(u.id)  # role / is_active / workspace_ids take effect on the next request
     db.refresh(u)
     return u
+
+
+@router.patch("/{user_id}", response_model=schemas.UserResponse)
+async def update_user(
+    user_id: int,
+    body: schemas.UserUpdate,
+    db: Session = Depends(get_db),
+    current: Principal = Depends(get_current_user),
+):
+    """Update user. Ops: any field (except external_id). Others: only self, only name/company."""
+    hashed_password = None
+    if current.role in OPS_ROLES and body.password and body.password.strip():
+        hashed_password = await _hash_password(body.password)
+    return await run_in_threadpool(_update_user, db, user_id, body, current, hashed_password)
@@ -2,13 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from .. import models, schemas
 from ..database import get_db
-from ..auth import get_current_user, require_ops
+from ..auth import Principal, get_current_user, require_ops
 
 router = APIRouter(prefix="/workspaces", tags=["workspaces"])
 
 
 @router.get("", response_model=list[schemas.WorkspaceResponse])
-def list_workspaces(db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+def list_workspaces(db: Session = Depends(get_db), user: Principal = Depends(get_current_user)):
     return db.query(models.Workspace).all()
 
 
@@ -16,7 +16,7 @@ def list_workspaces(db: Session = Depends(get_db), user: models.User = Depends(g
 def create_workspace(
     body: schemas.WorkspaceCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     ws = models.Workspace(
         name=body.name,
@@ -36,7 +36,7 @@ def create_workspace(
 def get_workspace(
     workspace_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     ws = db.query(models.Workspace).filter(models.Workspace.id == workspace_id).first()
     if not ws:
@@ -49,7 +49,7 @@ def update_workspace(
     workspace_id: int,
     body: schemas.WorkspaceBase,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     ws = db.query(models.Workspace).filter(models.Workspace.id == workspace_id).first()
     if not ws:
@@ -65,7 +65,7 @@ def update_workspace(
 def delete_workspace(
     workspace_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_ops),
+    user: Principal = Depends(require_ops),
 ):
     ws = db.query(models.Workspace).filter(models.Workspace.id == workspace_id).first()
     if not ws:
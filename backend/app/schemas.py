@@ -148,10 +148,11 @@ class ProjectBase(BaseModel):
     reviewer_ids: Optional[List[int]] = None
     annotator_pct: Optional[List[float]] = None
     reviewer_pct: Optional[List[float]] = None
-    annotator_eta_days: Optional[List[Optional[float]]] = None  # working days or null per assignee
+    annotator_eta_days: Optional[List[Optional[float]]] = None  # working days or null per assignee; recomputed by app.forecast
     reviewer_eta_days: Optional[List[Optional[float]]] = None
     num_annotators: Optional[int] = None
     num_reviewers: Optional[int] = None
+    claim_ttl_minutes: Optional[int] = None  # release abandoned in_progress claims after this; null = server default
 
 
 class ProjectCreate(ProjectBase):
@@ -293,6 +294,7 @@ class TaskResponse(BaseModel):
     content: dict
     claimed_by_id: Optional[int] = None
     claimed_at: Optional[datetime] = None
+    lease_expires_at: Optional[datetime] = None
     assigned_reviewer_id: Optional[int] = None
     due_at: Optional[datetime] = None
     rework_count: Optional[int] = None
@@ -343,3 +345,11 @@ class NodeTriggerRequest(BaseModel):
 class TaskBulkCreate(BaseModel):
     batch_id: int
     items: List[dict]
+
+
+class TaskBulkIngestResponse(BaseModel):
+    """Result of high-volume ingestion: id range and count only (no per-task payload)."""
+    batch_id: int
+    count: int
+    first_id: Optional[int] = None
+    last_id: Optional[int] = None
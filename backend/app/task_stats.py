@@ -0,0 +1,288 @@
+"""
+Materialized per-project task counters: project_task_stats holds one row per (project, pipeline stage) with a count
+column per task status. Progress bars, the readiness check after each approval and the insight stats read these rows
+instead of counting tasks.
+Counters move in the same transaction as the task rows:
+- ORM writes (queue transitions, tasks_router create/patch, claim requests, seeding) through an after_flush hook on
+  SessionLocal that diffs Task.status / pipeline_stage / batch_id. The diff is against the row as loaded, so Task maps
+  version_id as its version_id_col: the UPDATE matches only if no one moved the row since, otherwise the flush raises
+  StaleDataError (409 from the API) and nothing is counted;
+- Core bulk writes (claims, lease release, reaper, ingestion) call apply_batch_deltas with the rows they changed, and
+  UPDATEs bump Task.version_id.
+Committed counter moves are handed to on_commit listeners (cache invalidation, live updates).
+Run from backend/: `python -m app.task_stats check [project_id]` compares the counters with a recount,
+`python -m app.task_stats rebuild [project_id]` recomputes them.
+"""
+import logging
+import sys
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, insert, inspect, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal, engine
+
+STAT_COLUMNS = ("pending", "in_progress", "completed", "skipped", "other")
+
+logger = logging.getLogger(__name__)
+_PENDING_KEY = "task_stats_pending"
+_COMMIT_LISTENERS = []
+
+
+def status_column(status: str | None) -> str:
+    """Counter column for a task status; unknown statuses land in `other`."""
+    status = status or "pending"
+    return status if status in STAT_COLUMNS[:-1] else "other"
+
+
+def _connection(db):
+    """Functions here take a Session or a Connection; either way work on the transaction's connection."""
+    return db.connection() if isinstance(db, Session) else db
+
+
+_UPSERTS = {}
+
+
+def _upsert_statement(dialect: str, columns: tuple):
+    """INSERT ... ON CONFLICT DO UPDATE adding the excluded counts; built once per (dialect, columns) since
+    constructing `excluded` is costly and this runs on every claim."""
+    key = (dialect, columns)
+    if key not in _UPSERTS:
+        table = models.ProjectTaskStat.__table__
+        ins = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table)
+        _UPSERTS[key] = ins.on_conflict_do_update(
+            index_elements=["project_id", "pipeline_stage"],
+            set_={**{c: table.c[c] + ins.excluded[c] for c in columns}, "updated_at": ins.excluded.updated_at},
+        )
+    return _UPSERTS[key]
+
+
+def _upsert(conn, project_id: int, stage: str, counts: dict, now: datetime):
+    """counts[column] += n for one (project, stage) row, creating the row on first use."""
+    table = models.ProjectTaskStat.__table__
+    row = {"project_id": project_id, "pipeline_stage": stage, "updated_at": now, **{c: counts.get(c, 0) for c in STAT_COLUMNS}}
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        conn.execute(_upsert_statement(dialect, tuple(sorted(counts))), row)
+        return
+    result = conn.execute(
+        update(table)
+        .where(table.c.project_id == project_id, table.c.pipeline_stage == stage)
+        .values(updated_at=now, **{c: table.c[c] + n for c, n in counts.items()})
+    )
+    if not result.rowcount:
+        conn.execute(insert(table), row)
+
+
+def on_commit(listener):
+    """Register listener(changes) to run after a SessionLocal commit that moved counters.
+    changes = {(project_id, pipeline_stage): Counter(column -> delta)}; stage None means the project was recounted."""
+    _COMMIT_LISTENERS.append(listener)
+    return listener
+
+
+def _record(db, changes: dict):
+    """Remember counter moves on the session until it commits (Connection callers have no session to report to)."""
+    if isinstance(db, Session):
+        pending = db.info.setdefault(_PENDING_KEY, {})
+        for key, counts in changes.items():
+            pending.setdefault(key, Counter()).update(counts)
+
+
+def apply_deltas(db, deltas: dict):
+    """Apply {(project_id, pipeline_stage, status): n}. db is a Session or Connection inside the writing transaction."""
+    conn = _connection(db)
+    grouped = {}
+    for (project_id, stage, status), n in deltas.items():
+        if n and project_id is not None:
+            counts = grouped.setdefault((project_id, stage or "L1"), Counter())
+            counts[status_column(status)] += n
+    now = datetime.utcnow()
+    # Fixed key order so concurrent writers lock counter rows in the same order
+    for (project_id, stage), counts in sorted(grouped.items()):
+        counts = {c: n for c, n in counts.items() if n}
+        if counts:
+            _upsert(conn, project_id, stage, counts, now)
+    _record(db, grouped)
+
+
+def apply_batch_deltas(db, deltas: dict):
+    """Same as apply_deltas but keyed by batch: {(batch_id, pipeline_stage, status): n}."""
+    batch_ids = {b for (b, _, _), n in deltas.items() if n and b is not None}
+    if not batch_ids:
+        return
+    project_of = dict(_connection(db).execute(select(models.Batch.id, models.Batch.project_id).where(models.Batch.id.in_(batch_ids))).all())
+    by_project = Counter()
+    for (batch_id, stage, status), n in deltas.items():
+        by_project[(project_of.get(batch_id), stage, status)] += n
+    apply_deltas(db, by_project)
+
+
+def moved(rows, from_state: tuple, to_state: tuple) -> Counter:
+    """Deltas for Core UPDATE ... RETURNING batch_id rows that all moved from (stage, status) to (stage, status)."""
+    deltas = Counter()
+    for row in rows:
+        deltas[(row.batch_id, *from_state)] -= 1
+        deltas[(row.batch_id, *to_state)] += 1
+    return deltas
+
+
+def project_counts(conn, project_id: int) -> dict:
+    """Counts per status summed over the project's stages, plus total."""
+    table = models.ProjectTaskStat.__table__
+    row = conn.execute(select(*[func.coalesce(func.sum(table.c[c]), 0) for c in STAT_COLUMNS]).where(table.c.project_id == project_id)).one()
+    counts = dict(zip(STAT_COLUMNS, (int(n) for n in row)))
+    counts["total"] = sum(counts.values())
+    return counts
+
+
+def _recount_query(project_id: int | None = None):
+    q = (
+        select(models.Batch.project_id, models.Task.pipeline_stage, models.Task.status, func.count(models.Task.id))
+        .join(models.Batch, models.Task.batch_id == models.Batch.id)
+        .group_by(models.Batch.project_id, models.Task.pipeline_stage, models.Task.status)
+    )
+    if project_id is not None:
+        q = q.where(models.Batch.project_id == project_id)
+    return q
+
+
+def _recount(conn, project_id: int | None = None) -> dict:
+    """{(project_id, stage): {column: n}} counted from tasks."""
+    out = {}
+    for pid, stage, status, n in conn.execute(_recount_query(project_id)):
+        counts = out.setdefault((pid, stage), dict.fromkeys(STAT_COLUMNS, 0))
+        counts[status_column(status)] += n
+    return out
+
+
+def rebuild(conn, project_id: int | None = None) -> int:
+    """Recompute counters from tasks (all projects, or one). Returns rows written. Caller commits."""
+    table = models.ProjectTaskStat.__table__
+    conn = _connection(conn)
+    if conn.dialect.name == "postgresql":
+        # Writers block on the counters until we commit, so no delta lands between the recount and the swap
+        conn.execute(text("LOCK TABLE project_task_stats IN EXCLUSIVE MODE"))
+    stmt = delete(table)
+    if project_id is not None:
+        stmt = stmt.where(table.c.project_id == project_id)
+    conn.execute(stmt)
+    now = datetime.utcnow()
+    rows = [
+        {"project_id": pid, "pipeline_stage": stage, "updated_at": now, **counts}
+        for (pid, stage), counts in _recount(conn, project_id).items()
+    ]
+    if rows:
+        conn.execute(insert(table), rows)
+    return len(rows)
+
+
+def check(conn, project_id: int | None = None) -> list[dict]:
+    """Compare counters with a recount; returns one entry per mismatching (project, stage)."""
+    table = models.ProjectTaskStat.__table__
+    q = select(table.c.project_id, table.c.pipeline_stage, *[table.c[c] for c in STAT_COLUMNS])
+    if project_id is not None:
+        q = q.where(table.c.project_id == project_id)
+    stored = {(r[0], r[1]): dict(zip(STAT_COLUMNS, r[2:])) for r in conn.execute(q)}
+    actual = _recount(conn, project_id)
+    zero = dict.fromkeys(STAT_COLUMNS, 0)
+    mismatches = []
+    for key in sorted(set(stored) | set(actual), key=lambda k: (k[0], k[1] or "")):
+        have, want = stored.get(key, zero), actual.get(key, zero)
+        if have != want:
+            mismatches.append({"project_id": key[0], "pipeline_stage": key[1], "stored": have, "actual": want})
+    return mismatches
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_task_changes(session, flush_context):
+    """Turn flushed Task inserts/updates/deletes into counter deltas, written in the same transaction."""
+    deltas = Counter()
+    rebuild_batches = set()
+    for obj in session.new:
+        if isinstance(obj, models.Task):
+            deltas[(obj.batch_id, obj.pipeline_stage, obj.status)] += 1
+    for obj in session.dirty:
+        if not isinstance(obj, models.Task):
+            continue
+        attrs = inspect(obj).attrs
+        histories = [attrs.batch_id.history, attrs.pipeline_stage.history, attrs.status.history]
+        if not any(h.has_changes() for h in histories):
+            continue
+        old = []
+        for h, current in zip(histories, (obj.batch_id, obj.pipeline_stage, obj.status)):
+            if h.deleted:
+                old.append(h.deleted[0])
+            elif h.unchanged or not h.has_changes():
+                old.append(current)
+            else:
+                old.append(None)  # previous value was never loaded
+        if None in old:
+            rebuild_batches.add(obj.batch_id)
+            continue
+        deltas[tuple(old)] -= 1
+        deltas[(obj.batch_id, obj.pipeline_stage, obj.status)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, models.Task):
+            attrs = inspect(obj).attrs
+            old = [
+                h.deleted[0] if h.deleted else current
+                for h, current in zip(
+                    (attrs.batch_id.history, attrs.pipeline_stage.history, attrs.status.history),
+                    (obj.batch_id, obj.pipeline_stage, obj.status),
+                )
+            ]
+            deltas[tuple(old)] -= 1
+    deleted_projects = [obj.id for obj in session.deleted if isinstance(obj, models.Project)]
+    if not deltas and not rebuild_batches and not deleted_projects:
+        return
+    apply_batch_deltas(session, deltas)
+    conn = session.connection()
+    if rebuild_batches:
+        for (pid,) in conn.execute(select(models.Batch.project_id).where(models.Batch.id.in_(rebuild_batches)).distinct()):
+            rebuild(conn, pid)
+            _record(session, {(pid, None): Counter()})
+    if deleted_projects:
+        table = models.ProjectTaskStat.__table__
+        conn.execute(delete(table).where(table.c.project_id.in_(deleted_projects)))
+        _record(session, {(pid, None): Counter() for pid in deleted_projects})
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _dispatch_committed(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if not changes:
+        return
+    for listener in _COMMIT_LISTENERS:
+        try:
+            listener(changes)
+        except Exception:
+            logger.exception("task_stats commit listener failed")
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def main(argv: list[str]) -> int:
+    if not argv or argv[0] not in ("check", "rebuild"):
+        print("usage: python -m app.task_stats check|rebuild [project_id]")
+        return 2
+    project_id = int(argv[1]) if len(argv) > 1 else None
+    with engine.begin() as conn:
+        if argv[0] == "rebuild":
+            print(f"rebuilt {rebuild(conn, project_id)} counter row(s)")
+            return 0
+        mismatches = check(conn, project_id)
+    for m in mismatches:
+        print(f"project {m['project_id']} stage {m['pipeline_stage']}: stored {m['stored']} actual {m['actual']}")
+    print("ok" if not mismatches else f"{len(mismatches)} mismatching row(s); run `python -m app.task_stats rebuild`")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
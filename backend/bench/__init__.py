@@ -0,0 +1,70 @@
+"""
+Benchmarks for the bulk / hot paths. Each module runs on its own from backend/: `python -m bench.<name> [args]`
+and prints a small table; the module docstrings record the numbers measured when the change landed.
+app.database builds its engines at import, so DATABASE_URL is pointed at a throwaway SQLite file before any app
+module is imported (set DATABASE_URL yourself to measure another database). These are not part of the pytest suite.
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='annotation-studio-bench-')}/bench.db")
+
+from sqlalchemy import event  # noqa: E402
+
+from app import migrations, models  # noqa: E402
+from app.database import Base, SessionLocal, async_engine, engine  # noqa: E402
+
+
+def setup_schema():
+    Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
+
+
+def make_batch(name: str = "bench") -> tuple[int, int]:
+    """A fresh workspace / project / batch; returns (project_id, batch_id)."""
+    db = SessionLocal()
+    try:
+        ws = models.Workspace(name=f"{name} workspace")
+        db.add(ws)
+        db.flush()
+        project = models.Project(workspace_id=ws.id, name=f"{name} project")
+        db.add(project)
+        db.flush()
+        batch = models.Batch(project_id=project.id, name=f"{name} batch")
+        db.add(batch)
+        db.commit()
+        return project.id, batch.id
+    finally:
+        db.close()
+
+
+@contextmanager
+def count_queries(*targets):
+    """Yields a one-item list holding the number of statements executed inside the block,
+    on both the sync and the async engine unless targets are given."""
+    targets = targets or (engine, async_engine.sync_engine)
+    counter = [0]
+
+    def _count(*_):
+        counter[0] += 1
+
+    for target in targets:
+        event.listen(target, "before_cursor_execute", _count)
+    try:
+        yield counter
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", _count)
+
+
+@contextmanager
+def timed():
+    """Yields a one-item list holding the elapsed seconds once the block exits."""
+    elapsed = [0.0]
+    started = time.perf_counter()
+    try:
+        yield elapsed
+    finally:
+        elapsed[0] = time.perf_counter() - started
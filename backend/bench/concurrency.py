@@ -0,0 +1,188 @@
+"""
+Concurrent requests one uvicorn worker sustains when every SQL statement waits on the database, as on a networked
+server: BENCH_SLOW_MS (default 200) of latency is added per statement in the driver's thread. N keep-alive clients
+loop on GET /queue/my-tasks and GET /tasks/{id}; per level it prints req/s, p50 / p99 and the requests in flight.
+Run from backend/: `python -m bench.concurrency [levels] [backend_dir]`, e.g. `python -m bench.concurrency 40,80,160,320`.
+backend_dir (default this tree) is the server side, so the sync-router version can be measured from a checkout of
+the commit before the async port: `git worktree add /tmp/pre-async <commit>^` then pass /tmp/pre-async/backend.
+The pool is sized to 500 so the connection pool is never the limit. This module is also the server
+(`python bench/concurrency.py serve PORT`); it takes no imports from the tree under test.
+
+Measured when the async port landed (file SQLite, 1 CPU, 10s per level):
+                 sync routers (before)              async routers (after)
+    clients   req/s     p50      p99          req/s     p50      p99
+         40     172    231ms    297ms           153    252ms    398ms
+         80     177    442ms    654ms           233    315ms    617ms
+        160     165    891ms   1443ms           287    551ms    836ms
+        320     156   1936ms   2894ms           284   1094ms   1404ms
+Before, throughput stops at the 40-thread threadpool (40 requests waiting on the database at a time, the rest queue);
+after, it rises until the CPU is busy.
+"""
+import asyncio
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+LEVEL_SECONDS = float(os.environ.get("BENCH_LEVEL_SECONDS", "10"))
+
+
+def _serve(port: int):
+    """uvicorn app.main:app with the added per-statement latency, once the driver creates BENCH_SLOW_FLAG
+    (startup and seeding stay fast)."""
+    delay = float(os.environ.get("BENCH_SLOW_MS", "200")) / 1000
+    flag = os.environ["BENCH_SLOW_FLAG"]
+
+    def wait():
+        if os.path.exists(flag):
+            time.sleep(delay)
+
+    class SlowCursor(sqlite3.Cursor):
+        def execute(self, *args, **kwargs):
+            wait()
+            return super().execute(*args, **kwargs)
+
+        def executemany(self, *args, **kwargs):
+            wait()
+            return super().executemany(*args, **kwargs)
+
+    class SlowConnection(sqlite3.Connection):
+        def cursor(self, factory=SlowCursor):
+            return super().cursor(factory)
+
+    connect = sqlite3.connect
+
+    def slow_connect(*args, **kwargs):
+        kwargs.setdefault("factory", SlowConnection)
+        return connect(*args, **kwargs)
+
+    sqlite3.connect = sqlite3.dbapi2.connect = slow_connect
+    sys.path.insert(0, os.getcwd())
+    import uvicorn
+
+    uvicorn.run("app.main:app", port=port, log_level="warning")
+
+
+class _Conn:
+    """Minimal keep-alive HTTP/1.1 GET client; an httpx pool costs more CPU per request than the server at 100+ connections."""
+
+    def __init__(self, port: int, headers: dict):
+        self.port = port
+        self.extra = "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        self.reader = self.writer = None
+
+    async def get(self, path: str) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n{self.extra}\r\n".encode())
+        status_line = await self.reader.readline()
+        if not status_line:
+            self.writer = None
+            raise ConnectionError("server closed the connection")
+        length, close = 0, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+            elif name.lower() == "connection" and "close" in value.lower():
+                close = True
+        await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return int(status_line.split()[1])
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+
+async def _level(port: int, headers: dict, clients: int, seconds: float) -> dict:
+    codes, latencies = Counter(), []
+    stop = time.monotonic() + seconds
+    started = time.monotonic()
+
+    async def loop(i: int):
+        conn = _Conn(port, headers)
+        while time.monotonic() < stop:
+            t = time.perf_counter()
+            try:
+                codes[await conn.get("/queue/my-tasks" if i % 2 else "/tasks/1")] += 1
+            except (ConnectionError, OSError, asyncio.IncompleteReadError) as e:
+                codes[type(e).__name__] += 1
+                conn = _Conn(port, headers)
+            latencies.append(time.perf_counter() - t)
+        conn.close()
+
+    await asyncio.gather(*(loop(i) for i in range(clients)))
+    wall = time.monotonic() - started
+    latencies.sort()
+
+    def pct(f):
+        return latencies[min(len(latencies) - 1, int(f * len(latencies)))] * 1000
+
+    return {"rps": len(latencies) / wall, "p50": pct(0.5), "p99": pct(0.99), "in_flight": sum(latencies) / wall, "codes": dict(codes)}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main(argv: list[str]) -> int:
+    if argv and argv[0] == "serve":
+        _serve(int(argv[1]))
+        return 0
+    import httpx
+
+    levels = [int(n) for n in (argv[0] if argv else "40,80,160,320").split(",")]
+    backend = os.path.abspath(argv[1]) if len(argv) > 1 else os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    workdir = tempfile.mkdtemp(prefix="annotation-studio-concurrency-")
+    flag = f"{workdir}/slow_on"
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{workdir}/bench.db",
+        REAPER_ENABLED="false",
+        ROLLUPS_ENABLED="false",
+        FORECAST_ENABLED="false",
+        DB_POOL_SIZE="500",
+        DB_MAX_OVERFLOW="0",
+        DB_POOL_TIMEOUT_SECONDS="120",
+        BENCH_SLOW_FLAG=flag,
+    )
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve", str(port)], cwd=backend, env=env)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        for _ in range(1200):
+            try:
+                httpx.get(base + "/docs")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        r = httpx.post(base + "/auth/login", json={"email": "annotator1@annotationstudio.com", "password": "demo123"}, timeout=120)
+        r.raise_for_status()
+        headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+        httpx.get(base + "/queue/my-tasks", headers=headers, timeout=120)
+        open(flag, "w").close()
+        asyncio.run(_level(port, headers, max(levels), 8))  # open the pooled connections first
+        print(f"{'clients':>7}  {'req/s':>6}  {'p50':>8}  {'p99':>8}  {'in flight':>9}  codes")
+        for clients in levels:
+            r = asyncio.run(_level(port, headers, clients, LEVEL_SECONDS))
+            print(f"{clients:>7}  {r['rps']:>6.0f}  {r['p50']:>6.0f}ms  {r['p99']:>6.0f}ms  {r['in_flight']:>9.0f}  {r['codes']}", flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,83 @@
+"""
+Project export: the streamed GET /export/projects/{id} against the client-side flow Export.jsx used before it
+(GET /tasks?project_id=, then GET /tasks/{id}/annotations once per task). Both go through the ASGI app in process,
+so the numbers leave out network round trips, which only widen the gap.
+Run from backend/: `python -m bench.export [sizes]`, e.g. `python -m bench.export 10000,100000`.
+Half the tasks get an annotation. The per-task fan-out is timed on the first BENCH_FANOUT_SAMPLE tasks
+(default 2000) and scaled to the full count; set it to 0 to run every request.
+
+Measured when the export endpoint landed (SQLite WAL, 1 CPU):
+       tasks      client N+1  export (jsonl)   speedup
+      10,000      67.4s est.           1.83s       37x
+     100,000     703.0s est.          16.85s       42x
+(fan-out sampled on 2000 tasks: ~6.7 ms per /tasks/{id}/annotations call before any network latency)
+"""
+import os
+import sys
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+from bench import make_batch, setup_schema, timed
+from app import auth, models
+from app.database import SessionLocal, engine
+from app.ingest import ingest_tasks
+from app.main import app
+
+FANOUT_SAMPLE = int(os.environ.get("BENCH_FANOUT_SAMPLE", "2000"))
+
+
+def _seed(n: int) -> int:
+    project_id, batch_id = make_batch("export")
+    db = SessionLocal()
+    try:
+        ingest_tasks(db, batch_id, ({"text": f"row {i}"} for i in range(n)))
+        user = models.User(email=f"export-bench-{project_id}@bench.local", hashed_password="-", role="admin")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    finally:
+        db.close()
+    with engine.begin() as conn:
+        task_ids = conn.scalars(select(models.Task.id).where(models.Task.batch_id == batch_id).order_by(models.Task.id)).all()
+        rows = [
+            {"task_id": tid, "user_id": user_id, "response": {"label": f"label {tid}"}, "pipeline_stage": "L1", "created_at": datetime.utcnow()}
+            for tid in task_ids[::2]
+        ]
+        for i in range(0, len(rows), 5000):
+            conn.execute(insert(models.Annotation), rows[i:i + 5000])
+    return project_id, user_id
+
+
+def _client_flow(client: TestClient, headers: dict, project_id: int) -> tuple[float, bool]:
+    """Seconds for the list + per-task fan-out (scaled from the sample when sampling); True if scaled."""
+    with timed() as listed:
+        tasks = client.get(f"/tasks?project_id={project_id}", headers=headers).json()
+    sample = tasks[:FANOUT_SAMPLE] if FANOUT_SAMPLE else tasks
+    with timed() as fanned:
+        for t in sample:
+            client.get(f"/tasks/{t['id']}/annotations", headers=headers).raise_for_status()
+    return listed[0] + fanned[0] * len(tasks) / max(len(sample), 1), len(sample) < len(tasks)
+
+
+def main(argv: list[str]) -> int:
+    sizes = [int(s) for s in (argv[0] if argv else "10000,100000").split(",")]
+    setup_schema()
+    client = TestClient(app)  # no lifespan: background loops stay off
+    print(f"{'tasks':>8}  {'client N+1':>14}  {'export (jsonl)':>14}  {'speedup':>8}")
+    for n in sizes:
+        project_id, user_id = _seed(n)
+        headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': str(user_id), 'role': 'admin'})}"}
+        fanout, scaled = _client_flow(client, headers, project_id)
+        with timed() as exported:
+            r = client.get(f"/export/projects/{project_id}", headers=headers)
+        r.raise_for_status()
+        assert r.text.count("\n") == n, r.text[:200]
+        label = f"{fanout:,.1f}s{' est.' if scaled else ''}"
+        print(f"{n:>8,}  {label:>14}  {f'{exported[0]:,.2f}s':>14}  {f'{fanout / exported[0]:,.0f}x':>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
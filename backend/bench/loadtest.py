@@ -0,0 +1,184 @@
+"""
+Queue load test: p50 / p95 / p99 latency of mixed queue traffic against one uvicorn worker, with the engine settings
+from before the WAL / pool tuning (baseline: rollback journal, synchronous=FULL, no mmap, the driver's 5s lock
+wait, SQLAlchemy's default 5 + 10 pool) and with the current defaults (tuned).
+Run from backend/: `python -m bench.loadtest [baseline,tuned] [seconds]` (default both, 20s each). Each run starts
+a server on a fresh SQLite file seeded with the demo users and 20k pending tasks, then runs 10 annotator
+claim / submit loops, 2 reviewer list / approve loops and 4 readers (/tasks, /insight/project-progress,
+/queue/stats/efficiency) for the given time.
+
+Measured when the tuning landed (1 CPU, 20s per run, two runs each):
+      profile  requests   req/s       p50       p95       p99   5xx  peak conns  journal
+     baseline     2,067     103      42ms     373ms    3435ms    14          16   delete
+     baseline     1,888      94      47ms     468ms    3528ms     8          17   delete
+        tuned     3,202     160      26ms     183ms    2487ms     0          20      wal
+        tuned     2,901     145      29ms     226ms    2385ms     0          20      wal
+(baseline 5xx are "database is locked"; the tuned profile showed a few too at a 5s busy_timeout, hence 30s)
+"""
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+PROFILES = {
+    "baseline": {
+        "SQLITE_JOURNAL_MODE": "delete", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_MMAP_SIZE": "0", "SQLITE_BUSY_TIMEOUT_MS": "5000",
+        "DB_POOL_SIZE": "5", "DB_MAX_OVERFLOW": "10",
+    },
+    "tuned": {},
+}
+ANNOTATOR_LOOPS = 10
+REVIEWER_LOOPS = 2
+READERS = 4
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(profile: str) -> tuple[subprocess.Popen, str, str]:
+    db_file = f"{tempfile.mkdtemp(prefix='annotation-studio-load-')}/load.db"
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_file}",
+        REAPER_ENABLED="false",
+        ROLLUPS_ENABLED="false",
+        FORECAST_ENABLED="false",
+        **PROFILES[profile],
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            httpx.get(base + "/docs")
+            break
+        except httpx.TransportError:
+            time.sleep(0.1)
+    return server, base, db_file
+
+
+def _login(base: str, email: str, password: str) -> dict:
+    r = httpx.post(base + "/auth/login", json={"email": email, "password": password}, timeout=60)
+    r.raise_for_status()
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+def _seed_tasks(base: str, db_file: str, admin: dict) -> int:
+    project = next(p for p in httpx.get(base + "/projects", headers=admin).json() if p["external_id"] == "PRJ-ANIMALS-PROTO")
+    batch_id = httpx.get(f"{base}/batches?project_id={project['id']}", headers=admin).json()[0]["id"]
+    conn = sqlite3.connect(db_file, timeout=30)
+    now = "2026-01-01 00:00:00"
+    conn.executemany(
+        "INSERT INTO tasks (batch_id, status, pipeline_stage, content, rework_count, created_at, updated_at) VALUES (?, 'pending', 'L1', ?, 0, ?, ?)",
+        [(batch_id, json.dumps({"text": f"t{i}"}), now, now) for i in range(20000)],
+    )
+    annotator_ids = [r[0] for r in conn.execute("SELECT id FROM users WHERE email LIKE 'annotator%'")]
+    conn.execute("UPDATE projects SET annotator_ids = ? WHERE id = ?", (json.dumps(annotator_ids), project["id"]))
+    conn.commit()
+    conn.close()
+    return batch_id
+
+
+def _run(profile: str, seconds: float) -> dict:
+    server, base, db_file = _start_server(profile)
+    try:
+        admin = _login(base, "abhi@annotationstudio.com", "admin123")
+        annotators = [_login(base, f"annotator{i}@annotationstudio.com", "demo123") for i in range(1, 6)]
+        reviewers = [_login(base, f"reviewer{i}@annotationstudio.com", "demo123") for i in range(1, 3)]
+        batch_id = _seed_tasks(base, db_file, admin)
+        latencies, codes, lock = [], {}, threading.Lock()
+        stop = time.monotonic() + seconds
+
+        def call(c, method, path, **kwargs):
+            """The response, or None when the connection failed (counted as an error)."""
+            started = time.perf_counter()
+            try:
+                r = c.request(method, path, **kwargs)
+            except httpx.TransportError:
+                r = None
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                code = r.status_code if r is not None else 599
+                codes[code] = codes.get(code, 0) + 1
+            return r
+
+        def annotate(headers):
+            with httpx.Client(base_url=base, headers=headers, timeout=60) as c:
+                while time.monotonic() < stop:
+                    r = call(c, "GET", f"/queue/next?batch_id={batch_id}")
+                    if r is not None and r.status_code == 200 and r.json():
+                        call(c, "POST", f"/queue/tasks/{r.json()['id']}/submit", json={"response": {"animal_name": "x"}, "pipeline_stage": "L1"})
+
+        def review(headers):
+            with httpx.Client(base_url=base, headers=headers, timeout=60) as c:
+                while time.monotonic() < stop:
+                    r = call(c, "GET", "/queue/review")
+                    if r is not None and r.status_code == 200 and r.json():
+                        call(c, "POST", f"/queue/review/{random.choice(r.json())['id']}/approve")
+
+        def read(headers):
+            with httpx.Client(base_url=base, headers=headers, timeout=60) as c:
+                while time.monotonic() < stop:
+                    for path in ("/tasks?limit=50", "/insight/project-progress", "/queue/stats/efficiency"):
+                        call(c, "GET", path)
+
+        threads = (
+            [threading.Thread(target=annotate, args=(annotators[i % len(annotators)],)) for i in range(ANNOTATOR_LOOPS)]
+            + [threading.Thread(target=review, args=(reviewers[i % len(reviewers)],)) for i in range(REVIEWER_LOOPS)]
+            + [threading.Thread(target=read, args=(admin,)) for _ in range(READERS)]
+        )
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        latencies.sort()
+        pool = httpx.get(base + "/db/pool", headers=admin).json()
+    finally:
+        server.terminate()
+        server.wait()
+
+    def pct(f):
+        return latencies[min(len(latencies) - 1, int(f * len(latencies)))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / seconds,
+        "p50": pct(0.5),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "errors": sum(n for code, n in codes.items() if code >= 500),  # 599: connection dropped
+        "peak_checked_out": pool.get("peak_checked_out"),
+        "journal_mode": pool.get("sqlite_journal_mode"),
+    }
+
+
+def main(argv: list[str]) -> int:
+    profiles = (argv[0] if argv else "baseline,tuned").split(",")
+    seconds = float(argv[1]) if len(argv) > 1 else 20.0
+    print(f"{'profile':>9}  {'requests':>8}  {'req/s':>6}  {'p50':>8}  {'p95':>8}  {'p99':>8}  {'5xx':>4}  {'peak conns':>10}  {'journal':>7}")
+    for profile in profiles:
+        r = _run(profile, seconds)
+        print(
+            f"{profile:>9}  {r['requests']:>8,}  {r['rps']:>6.0f}  {r['p50']:>6.0f}ms  {r['p95']:>6.0f}ms  {r['p99']:>6.0f}ms"
+            f"  {r['errors']:>4}  {str(r['peak_checked_out']):>10}  {str(r['journal_mode']):>7}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,95 @@
+"""
+Principal cache: statements per request on the queue endpoints with auth.get_current_user served from the cache
+against principal_cache_ttl_seconds=0 (every request loads the user row, as before the cache).
+Run from backend/: `python -m bench.principal_cache [rounds]` (default 50). Each round, every annotator asks for
+/queue/next, /queue/my-tasks and /queue/stats/efficiency and the reviewer lists /queue/review.
+
+Measured when the cache landed (SQLite WAL, 1 CPU, 4 annotators, 1 reviewer, 50 rounds):
+     principal cache  requests  queries/req  users reads/req   ms/req
+         off (ttl=0)       650         3.54             1.00     12.2
+         on (ttl=30)       650         2.55             0.01      9.7
+(the remaining users reads with the cache on are the first request of each of the 5 users)
+"""
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from bench import count_queries, make_batch, setup_schema, timed
+from app import auth, models
+from app.config import settings
+from app.database import SessionLocal, async_engine, engine
+from app.ingest import ingest_tasks
+from app.main import app
+
+ANNOTATORS = 4
+
+
+def _headers(user: models.User) -> dict:
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': str(user.id), 'role': user.role})}"}
+
+
+def _seed() -> tuple[int, list[dict], dict]:
+    project_id, batch_id = make_batch("principal")
+    db = SessionLocal()
+    try:
+        ingest_tasks(db, batch_id, ({"i": i} for i in range(2000)))
+        annotators = [models.User(email=f"annotator{i}@principal.bench", hashed_password="-", role="annotator") for i in range(ANNOTATORS)]
+        reviewer = models.User(email="reviewer@principal.bench", hashed_password="-", role="reviewer")
+        db.add_all([*annotators, reviewer])
+        db.flush()
+        db.get(models.Project, project_id).annotator_ids = [u.id for u in annotators]
+        db.commit()
+        return batch_id, [_headers(u) for u in annotators], _headers(reviewer)
+    finally:
+        db.close()
+
+
+def _run(client: TestClient, batch_id: int, annotators: list[dict], reviewer: dict, rounds: int) -> tuple[int, int, int, float]:
+    """(requests, statements, statements reading users, seconds)"""
+    user_reads = [0]
+
+    def _count_users(conn, cursor, statement, *_):
+        if "FROM users" in statement:
+            user_reads[0] += 1
+
+    targets = (engine, async_engine.sync_engine)
+    for target in targets:
+        event.listen(target, "before_cursor_execute", _count_users)
+    requests = 0
+    try:
+        with count_queries() as statements, timed() as elapsed:
+            for _ in range(rounds):
+                for headers in annotators:
+                    for path in (f"/queue/next?batch_id={batch_id}", "/queue/my-tasks", "/queue/stats/efficiency"):
+                        client.get(path, headers=headers).raise_for_status()
+                        requests += 1
+                client.get("/queue/review", headers=reviewer).raise_for_status()
+                requests += 1
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", _count_users)
+    return requests, statements[0], user_reads[0], elapsed[0]
+
+
+def main(argv: list[str]) -> int:
+    rounds = int(argv[0]) if argv else 50
+    setup_schema()
+    batch_id, annotators, reviewer = _seed()
+    client = TestClient(app)  # no lifespan: background loops stay off
+    ttl = settings.principal_cache_ttl_seconds
+    print(f"{'principal cache':>16}  {'requests':>8}  {'queries/req':>11}  {'users reads/req':>15}  {'ms/req':>7}")
+    for label, cache_ttl in (("off (ttl=0)", 0), (f"on (ttl={ttl})", ttl)):
+        settings.principal_cache_ttl_seconds = cache_ttl
+        auth.invalidate_principal()
+        requests, statements, user_reads, elapsed = _run(client, batch_id, annotators, reviewer, rounds)
+        print(
+            f"{label:>16}  {requests:>8,}  {statements / requests:>11.2f}  {user_reads / requests:>15.2f}"
+            f"  {elapsed * 1000 / requests:>7.1f}"
+        )
+    settings.principal_cache_ttl_seconds = ttl
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,99 @@
+"""
+GET /insight/project-progress: statements per request and latency as the number of projects grows, against the old
+per-project loop (a batch-id query plus two COUNTs for every project).
+Run from backend/: `python -m bench.project_progress [project counts]`, e.g. `python -m bench.project_progress 10,100,1000,2000`.
+Counts are cumulative (each step adds projects to the previous ones); every project has one batch of 5 tasks.
+The insight cache is turned off so every request reaches the database.
+
+Measured when the grouped aggregate landed (SQLite WAL, 1 CPU):
+    projects  old: queries   old: time  new: queries   new: time
+          10            31        28ms             1        10ms
+         100           301       181ms             1        10ms
+       1,000         3,001     1,396ms             1        23ms
+       2,000         6,001     3,260ms             1        43ms
+(new: the aggregate only; the principal lookup is served from the auth cache after the first request)
+"""
+import os
+import sys
+
+os.environ.setdefault("INSIGHT_CACHE_TTL_SECONDS", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from bench import count_queries, make_batch, setup_schema, timed  # noqa: E402
+from app import auth, models  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.ingest import ingest_tasks  # noqa: E402
+from app.main import app  # noqa: E402
+
+TASKS_PER_PROJECT = 5
+
+
+def _old_project_progress(db) -> dict:
+    """The endpoint body before the grouped aggregate."""
+    projects = db.query(models.Project).order_by(models.Project.updated_at.desc()).all()
+    out = []
+    for p in projects:
+        batch_ids = [b.id for b in db.query(models.Batch.id).filter(models.Batch.project_id == p.id).all()]
+        total = 0
+        completed = 0
+        if batch_ids:
+            total = db.query(models.Task).filter(models.Task.batch_id.in_(batch_ids)).count()
+            completed = (
+                db.query(models.Task)
+                .filter(models.Task.batch_id.in_(batch_ids), models.Task.status == "completed")
+                .count()
+            )
+        out.append({"project_id": p.id, "total_tasks": total, "completed_tasks": completed})
+    return {"projects": out}
+
+
+def _add_projects(n: int):
+    for _ in range(n):
+        _, batch_id = make_batch("progress")
+        db = SessionLocal()
+        try:
+            ingest_tasks(db, batch_id, ({"i": i} for i in range(TASKS_PER_PROJECT)))
+        finally:
+            db.close()
+
+
+def main(argv: list[str]) -> int:
+    sizes = [int(s) for s in (argv[0] if argv else "10,100,1000,2000").split(",")]
+    setup_schema()
+    db = SessionLocal()
+    try:
+        admin = models.User(email="progress-bench@bench.local", hashed_password="-", role="admin")
+        db.add(admin)
+        db.commit()
+        headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': str(admin.id), 'role': 'admin'})}"}
+    finally:
+        db.close()
+    client = TestClient(app)  # no lifespan: background loops stay off
+    client.get("/insight/project-progress", headers=headers).raise_for_status()  # warm the principal cache
+    print(f"{'projects':>8}  {'old: queries':>12}  {'old: time':>10}  {'new: queries':>12}  {'new: time':>10}")
+    existing = 0
+    for n in sizes:
+        _add_projects(n - existing)
+        existing = n
+        db = SessionLocal()
+        try:
+            with count_queries() as old_queries, timed() as old_time:
+                old = _old_project_progress(db)
+        finally:
+            db.close()
+        with count_queries() as new_queries, timed() as new_time:
+            r = client.get("/insight/project-progress", headers=headers)
+        r.raise_for_status()
+        new = r.json()["projects"]
+        assert len(new) == len(old["projects"]) == n, (len(new), len(old["projects"]))
+        assert sum(p["total_tasks"] for p in new) == sum(p["total_tasks"] for p in old["projects"])
+        print(
+            f"{n:>8,}  {old_queries[0]:>12,}  {f'{old_time[0] * 1000:,.0f}ms':>10}"
+            f"  {new_queries[0]:>12,}  {f'{new_time[0] * 1000:,.0f}ms':>10}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
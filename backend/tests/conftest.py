@@ -0,0 +1,54 @@
+"""
+Shared fixtures. Run from backend/: `python -m pytest -q`.
+app.database builds its engines at import, so DATABASE_URL is pointed at a throwaway SQLite file before any app
+module is imported; set DATABASE_URL yourself to run the suite against another database.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='annotation-studio-tests-')}/test.db")
+
+import pytest  # noqa: E402
+
+from app import migrations, models  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.ingest import ingest_tasks  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
+    return engine
+
+
+@pytest.fixture
+def make_batch(db_engine):
+    """make_batch(n_tasks, n_users=1) -> (project_id, batch_id, [user ids]): a fresh project with one batch of
+    pending L1 tasks (inserted through app.ingest, so the counters are maintained) and n_users annotators."""
+
+    def make(n_tasks: int, n_users: int = 1):
+        db = SessionLocal()
+        try:
+            ws = models.Workspace(name="test workspace")
+            db.add(ws)
+            db.flush()
+            project = models.Project(workspace_id=ws.id, name="test project")
+            db.add(project)
+            db.flush()
+            batch = models.Batch(project_id=project.id, name="test batch")
+            db.add(batch)
+            users = [
+                models.User(email=f"annotator{i}@ws{ws.id}.test", hashed_password="-", role="annotator")
+                for i in range(n_users)
+            ]
+            db.add_all(users)
+            db.flush()
+            ids = (project.id, batch.id, [u.id for u in users])
+            ingest_tasks(db, batch.id, ({"i": i} for i in range(n_tasks)))
+            db.commit()
+            return ids
+        finally:
+            db.close()
+
+    return make
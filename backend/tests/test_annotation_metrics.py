@@ -0,0 +1,45 @@
+"""Response-metrics backfill: resumable, and stoppable between chunks (main.lifespan sets stop at shutdown)."""
+import threading
+
+from sqlalchemy import func, insert, select
+
+from app import models
+from app.annotation_metrics import backfill
+from app.database import engine
+
+
+class _StopAfter(threading.Event):
+    """Event that becomes set after `checks` is_set() calls, i.e. after that many chunks."""
+
+    def __init__(self, checks: int):
+        super().__init__()
+        self._left = checks
+
+    def is_set(self) -> bool:
+        self._left -= 1
+        return self._left < 0 or super().is_set()
+
+
+def _unfilled() -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).where(models.Annotation.word_count.is_(None))).scalar()
+
+
+def test_backfill_stops_between_chunks_and_resumes(make_batch):
+    _, batch_id, (user_id,) = make_batch(1)
+    with engine.begin() as conn:
+        task_id = conn.execute(select(models.Task.id).where(models.Task.batch_id == batch_id)).scalar()
+        conn.execute(insert(models.Annotation), [
+            {"task_id": task_id, "user_id": user_id, "response": {"label": f"two words {i}"}, "pipeline_stage": "L1"}
+            for i in range(25)
+        ])
+    pending = _unfilled()
+    assert pending >= 25
+
+    assert backfill(chunk_size=10, stop=_StopAfter(2)) == 20
+    assert _unfilled() == pending - 20
+    stopped = threading.Event()
+    stopped.set()
+    assert backfill(chunk_size=10, stop=stopped) == 0
+    assert backfill(chunk_size=10) == pending - 20
+    assert _unfilled() == 0
@@ -0,0 +1,61 @@
+"""Principal cache: deleted users stop authenticating, however they were deleted."""
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from app import auth, models
+from app.database import SessionLocal, engine
+from app.main import app
+
+client = TestClient(app)  # no lifespan: the conftest database is used as is
+
+
+def _user(email: str) -> tuple[int, dict]:
+    db = SessionLocal()
+    try:
+        u = models.User(email=email, hashed_password="-", role="annotator", full_name="Auth Test")
+        db.add(u)
+        db.commit()
+        token = auth.create_access_token({"sub": str(u.id), "role": u.role})
+        return u.id, {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+
+
+def _cached(user_id: int) -> bool:
+    return user_id in auth._principals
+
+
+def test_me_is_401_when_the_row_is_gone_but_the_principal_is_cached(db_engine):
+    user_id, headers = _user("auth-outside@test.local")
+    assert client.get("/auth/me", headers=headers).json()["id"] == user_id
+    assert _cached(user_id)
+    with engine.begin() as conn:  # outside SessionLocal: no hook sees it
+        conn.execute(delete(models.User).where(models.User.id == user_id))
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    assert not _cached(user_id)
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+
+def test_orm_delete_invalidates_the_principal(db_engine):
+    user_id, headers = _user("auth-orm@test.local")
+    client.get("/auth/me", headers=headers)
+    db = SessionLocal()
+    try:
+        db.delete(db.get(models.User, user_id))
+        db.commit()
+    finally:
+        db.close()
+    assert not _cached(user_id)
+    assert client.get("/queue/my-tasks", headers=headers).status_code == 401
+
+
+def test_bulk_delete_through_a_session_invalidates_principals(db_engine):
+    user_id, headers = _user("auth-bulk@test.local")
+    client.get("/auth/me", headers=headers)
+    db = SessionLocal()
+    try:
+        db.execute(delete(models.User).where(models.User.id == user_id))
+        db.commit()
+    finally:
+        db.close()
+    assert not _cached(user_id)
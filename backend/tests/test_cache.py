@@ -0,0 +1,91 @@
+"""Insight cache invalidation: task-level writes (Core or ORM) only drop entries scoped to the project they touched."""
+from itertools import count
+
+from app import cache, models
+from app.claims import claim_next_tasks
+from app.database import SessionLocal
+
+
+def _cached(key, project_id=None):
+    """Value for key; a fresh number each time compute actually runs."""
+    return cache.get_or_compute(key, lambda: next(_computes), project_id)[0]
+
+
+_computes = count()
+
+
+def test_core_claim_only_invalidates_its_own_project(make_batch):
+    project_id, batch_id, (annotator,) = make_batch(5)
+    other_project, _, _ = make_batch(5)
+    before = {
+        "own": _cached(("report", project_id), project_id),
+        "other": _cached(("report", other_project), other_project),
+        "aggregate": _cached(("stats",)),
+    }
+    db = SessionLocal()
+    try:
+        claim_next_tasks(db, batch_id, annotator)
+        db.commit()
+    finally:
+        db.close()
+    assert _cached(("report", project_id), project_id) != before["own"]
+    assert _cached(("report", other_project), other_project) == before["other"]
+    assert _cached(("stats",)) == before["aggregate"]  # rides the TTL
+
+
+def _snapshot(project_id, other_project):
+    return {
+        "own": _cached(("report", project_id), project_id),
+        "other": _cached(("report", other_project), other_project),
+        "aggregate": _cached(("stats",)),
+    }
+
+
+def test_orm_task_writes_only_invalidate_their_own_project(make_batch):
+    project_id, batch_id, (annotator,) = make_batch(2)
+    other_project, _, _ = make_batch(1)
+    db = SessionLocal()
+    try:
+        task = db.query(models.Task).filter(models.Task.batch_id == batch_id).first()
+        for write in (
+            lambda: setattr(task, "draft_response", {"label": "draft"}),
+            lambda: db.add(models.Annotation(task_id=task.id, user_id=annotator, response={"label": "x"}, pipeline_stage="L1")),
+            lambda: db.add(models.TaskEvent(task_id=task.id, project_id=project_id, event="approve", user_id=annotator)),
+        ):
+            before = _snapshot(project_id, other_project)
+            write()
+            db.commit()
+            after = _snapshot(project_id, other_project)
+            assert after["own"] != before["own"]
+            assert after["other"] == before["other"]
+            assert after["aggregate"] == before["aggregate"]  # rides the TTL
+    finally:
+        db.close()
+
+
+def test_structural_orm_commit_invalidates_everything(make_batch):
+    project_id, _, _ = make_batch(1)
+    other_project, _, _ = make_batch(1)
+    before = _snapshot(project_id, other_project)
+    db = SessionLocal()
+    try:
+        db.get(models.Project, project_id).name = "renamed"
+        db.commit()
+    finally:
+        db.close()
+    after = _snapshot(project_id, other_project)
+    assert all(after[k] != before[k] for k in before)
+
+
+def test_rollback_discards_pending_bumps(make_batch):
+    project_id, batch_id, _ = make_batch(1)
+    other_project, _, _ = make_batch(1)
+    before = _snapshot(project_id, other_project)
+    db = SessionLocal()
+    try:
+        db.query(models.Task).filter(models.Task.batch_id == batch_id).first().draft_response = {"label": "draft"}
+        db.flush()
+        db.rollback()
+    finally:
+        db.close()
+    assert _snapshot(project_id, other_project) == before
@@ -0,0 +1,82 @@
+"""Concurrent claimers against one batch: every task is handed out exactly once and the counters stay exact.
+Sizes default to a CI-friendly run; CLAIM_TEST_THREADS / CLAIM_TEST_TASKS scale it up (e.g. 32 / 3000)."""
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models, task_stats
+from app.claims import claim_next_tasks, release_unused_leases
+from app.database import SessionLocal, engine
+
+THREADS = int(os.environ.get("CLAIM_TEST_THREADS", 16))
+TASKS = int(os.environ.get("CLAIM_TEST_TASKS", 600))
+
+
+def _claim_until_empty(batch_id: int, user_id: int, limit: int, claimed: list, errors: list, start: threading.Barrier):
+    db = SessionLocal()
+    try:
+        start.wait()
+        while True:
+            ids = claim_next_tasks(db, batch_id, user_id, limit=limit)
+            db.commit()
+            if not ids:
+                return
+            claimed.extend((task_id, user_id) for task_id in ids)
+    except Exception as e:  # surfaced by the test; a dead thread would otherwise just claim less
+        errors.append(e)
+    finally:
+        db.close()
+
+
+def _run_claimers(batch_id: int, user_ids: list[int], limit: int) -> list[tuple]:
+    claimed, errors = [], []
+    start = threading.Barrier(len(user_ids))
+    threads = [
+        threading.Thread(target=_claim_until_empty, args=(batch_id, uid, limit, claimed, errors, start))
+        for uid in user_ids
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    return claimed
+
+
+@pytest.mark.parametrize("limit", [1, 10])
+def test_concurrent_claims_hand_out_each_task_once(make_batch, limit):
+    project_id, batch_id, user_ids = make_batch(TASKS, THREADS)
+    claimed = _run_claimers(batch_id, user_ids, limit)
+
+    task_ids = [task_id for task_id, _ in claimed]
+    assert len(task_ids) == len(set(task_ids)), "a task was claimed twice"
+    assert len(task_ids) == TASKS
+    db = SessionLocal()
+    try:
+        owners = dict(db.query(models.Task.id, models.Task.claimed_by_id).filter(models.Task.batch_id == batch_id))
+    finally:
+        db.close()
+    assert owners == dict(claimed)
+    with engine.connect() as conn:
+        assert task_stats.check(conn, project_id) == []
+        assert task_stats.project_counts(conn, project_id)["in_progress"] == TASKS
+
+
+def test_released_leases_are_claimable_again(make_batch):
+    project_id, batch_id, user_ids = make_batch(50, 2)
+    first, second = user_ids
+    db = SessionLocal()
+    try:
+        leased = claim_next_tasks(db, batch_id, first, limit=20, lease_expires_at=datetime.utcnow() + timedelta(minutes=30))
+        db.commit()
+        assert release_unused_leases(db, user_id=first, batch_id=batch_id, expired_only=False) == 20
+        db.commit()
+        again = claim_next_tasks(db, batch_id, second, limit=50)
+        db.commit()
+    finally:
+        db.close()
+    assert set(leased) <= set(again) and len(again) == 50
+    with engine.connect() as conn:
+        assert task_stats.check(conn, project_id) == []
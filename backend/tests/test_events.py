@@ -0,0 +1,85 @@
+"""Live-stream pub/sub: RedisBroker.publish must not wait on the network (it runs in after_commit hooks)."""
+import asyncio
+import queue
+import time
+
+from app import events
+
+
+class _SlowRedis:
+    """Just enough of redis.Redis: publish takes `delay` seconds and loops back to pubsub listeners."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.fail_next = False
+        self._listeners = []
+
+    def publish(self, channel, data):
+        time.sleep(self.delay)
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionError("redis went away")
+        for q in self._listeners:
+            q.put({"type": "message", "data": data})
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        redis = self
+
+        class _PubSub:
+            def subscribe(self, channel):
+                self._q = queue.Queue()
+                redis._listeners.append(self._q)
+
+            def listen(self):
+                while True:
+                    yield self._q.get()
+
+        return _PubSub()
+
+
+async def _receive(sub, n: int) -> list:
+    return [await asyncio.wait_for(sub.get(), timeout=5) for _ in range(n)]
+
+
+def test_redis_publish_returns_without_waiting_for_redis():
+    async def scenario():
+        broker = events.RedisBroker(_SlowRedis(delay=0.2))
+        sub = broker.subscribe()
+        started = time.perf_counter()
+        for i in range(3):
+            broker.publish({"type": "task_counts", "changes": [{"n": i}]})
+        elapsed = time.perf_counter() - started
+        received = await _receive(sub, 3)
+        sub.close()
+        return elapsed, received
+
+    elapsed, received = asyncio.run(scenario())
+    assert elapsed < 0.05
+    assert [m["changes"][0]["n"] for m in received] == [0, 1, 2]
+
+
+def test_failed_publish_is_followed_by_a_resync():
+    async def scenario():
+        redis = _SlowRedis(delay=0)
+        broker = events.RedisBroker(redis)
+        sub = broker.subscribe()
+        redis.fail_next = True
+        broker.publish({"type": "task_counts", "changes": [{"n": 1}]})  # lost
+        broker.publish({"type": "task_counts", "changes": [{"n": 2}]})
+        received = await _receive(sub, 2)
+        sub.close()
+        return received
+
+    first, second = asyncio.run(scenario())
+    assert first == {"type": "resync"}
+    assert second["changes"] == [{"n": 2}]
+
+
+def test_subscription_put_collapses_overflow_into_resync():
+    async def scenario():
+        sub = events.InProcessBroker().subscribe(maxsize=2)
+        for i in range(3):
+            sub.put({"type": "task_counts", "changes": [{"n": i}]})
+        return sub.queue.qsize(), await sub.get()
+
+    assert asyncio.run(scenario()) == (1, {"type": "resync"})
@@ -0,0 +1,42 @@
+"""Project export: include=all_annotations carries each task's full annotation history."""
+import json
+
+from fastapi.testclient import TestClient
+
+from app import auth, models
+from app.database import SessionLocal
+from app.main import app
+
+client = TestClient(app)  # no lifespan: the conftest database is used as is
+
+
+def _lines(r) -> list[dict]:
+    return [json.loads(line) for line in r.text.splitlines() if line]
+
+
+def test_all_annotations_keeps_the_history(make_batch):
+    project_id, batch_id, (annotator,) = make_batch(3)
+    db = SessionLocal()
+    try:
+        task_id = db.query(models.Task.id).filter(models.Task.batch_id == batch_id).order_by(models.Task.id).first()[0]
+        for label in ("first", "second"):
+            db.add(models.Annotation(task_id=task_id, user_id=annotator, response={"label": label}, pipeline_stage="L1"))
+            db.flush()
+        admin = models.User(email=f"export-admin-{project_id}@test.local", hashed_password="-", role="admin")
+        db.add(admin)
+        db.commit()
+        headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': str(admin.id), 'role': admin.role})}"}
+    finally:
+        db.close()
+
+    latest = {r["task_id"]: r for r in _lines(client.get(f"/export/projects/{project_id}", headers=headers))}
+    assert latest[task_id]["annotation"]["response"] == {"label": "second"}
+    assert "annotations" not in latest[task_id]
+
+    full = {r["task_id"]: r for r in _lines(client.get(f"/export/projects/{project_id}?include=all_annotations", headers=headers))}
+    assert len(full) == 3
+    assert [a["response"]["label"] for a in full[task_id]["annotations"]] == ["first", "second"]
+    assert all(r["annotations"] == [] for tid, r in full.items() if tid != task_id)
+
+    assert client.get(f"/export/projects/{project_id}?include=all_annotations&format=parquet", headers=headers).status_code == 400
+    assert client.get(f"/export/projects/{project_id}?include=everything", headers=headers).status_code == 400
@@ -0,0 +1,90 @@
+"""
+Query-plan regression suite for the queue, review and efficiency hot paths: EXPLAIN every query the endpoints run
+against a populated, ANALYZEd tasks table and fail on a full scan of tasks or annotations ("SCAN tasks" on SQLite,
+"Seq Scan on tasks" on PostgreSQL). QUERY_PLAN_TEST_TASKS sets the fixture size; the default keeps CI fast, the
+1M-task run is QUERY_PLAN_TEST_TASKS=1000000 (PostgreSQL plans are only meaningful at realistic sizes).
+"""
+import os
+import random
+import re
+
+import pytest
+from sqlalchemy import insert, select
+
+from app import models, task_stats
+from app.claims import _claim_candidates
+from app.database import engine
+from app.routers import queue_router
+
+TASKS = int(os.environ.get("QUERY_PLAN_TEST_TASKS", 20000))
+PROJECTS = 20
+BATCHES_PER_PROJECT = 5
+ANNOTATORS = 50
+
+# A SQLite SCAN walks every row even through an index (USING [COVERING] INDEX only avoids the table lookups)
+_FULL_SCAN = re.compile(r"\bSCAN (tasks|annotations)(_\d+)?\b|Seq Scan on (tasks|annotations)\b")
+
+# name -> builder(ids) for every hot query; ids carries a project, batch, user and task of the fixture
+HOT_QUERIES = {
+    "queue pick": lambda ids: _claim_candidates(ids["batch"], 10),
+    "leased tasks": lambda ids: queue_router._leased_query(ids["batch"], ids["user"]),
+    "my tasks": lambda ids: queue_router._my_tasks_query(ids["user"]),
+    "batch tasks": lambda ids: queue_router._batch_tasks_query(ids["batch"], ids["user"]),
+    "review queue (project)": lambda ids: queue_router._review_queue_query(ids["user"], ids["project"]),
+    "review queue (all)": lambda ids: queue_router._review_queue_query(ids["user"], None),
+    "last annotator": lambda ids: queue_router._last_annotator_query(ids["task"]),
+    "efficiency (mine, project)": lambda ids: queue_router._annotator_efficiency_query(ids["user"], ids["project"]),
+    "efficiency (mine)": lambda ids: queue_router._annotator_efficiency_query(ids["user"], None),
+    "efficiency by annotator (project)": lambda ids: queue_router._efficiency_by_annotator_query(ids["project"]),
+    "efficiency by annotator (all)": lambda ids: queue_router._efficiency_by_annotator_query(None),
+}
+
+
+@pytest.fixture(scope="module")
+def plan_ids(db_engine):
+    """TASKS tasks spread over PROJECTS x BATCHES_PER_PROJECT batches in every queue state, half of them annotated."""
+    rnd = random.Random(4)
+    states = [("L1", "pending"), ("L1", "in_progress"), ("L1", "skipped"), ("Review", "pending"), ("Done", "completed")]
+    with engine.begin() as conn:
+        (ws_id,) = conn.execute(insert(models.Workspace).returning(models.Workspace.id), [{"name": "plans"}]).one()
+        users = conn.execute(insert(models.User).returning(models.User.id, sort_by_parameter_order=True), [
+            {"email": f"plans-annotator{i}@test.local", "hashed_password": "-", "role": "annotator"} for i in range(ANNOTATORS)
+        ]).scalars().all()
+        projects = conn.execute(insert(models.Project).returning(models.Project.id, sort_by_parameter_order=True), [
+            {"workspace_id": ws_id, "name": f"plans {i}"} for i in range(PROJECTS)
+        ]).scalars().all()
+        batches = conn.execute(insert(models.Batch).returning(models.Batch.id, sort_by_parameter_order=True), [
+            {"project_id": p, "name": f"batch {i}"} for p in projects for i in range(BATCHES_PER_PROJECT)
+        ]).scalars().all()
+        for start in range(0, TASKS, 50000):
+            rows = []
+            for _ in range(start, min(start + 50000, TASKS)):
+                stage, status = rnd.choice(states)
+                rows.append({
+                    "batch_id": rnd.choice(batches), "pipeline_stage": stage, "status": status, "content": {},
+                    "claimed_by_id": rnd.choice(users) if status == "in_progress" else None,
+                    "rework_count": 1 if rnd.random() < 0.1 else 0,
+                })
+            task_ids = conn.execute(insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True), rows).scalars().all()
+            conn.execute(insert(models.Annotation), [
+                {"task_id": t, "user_id": rnd.choice(users), "response": {}, "pipeline_stage": "L1"} for t in task_ids[::2]
+            ])
+        for (pid,) in conn.execute(select(models.Project.id).where(models.Project.id.in_(projects))):
+            task_stats.rebuild(conn, pid)
+        conn.exec_driver_sql("ANALYZE")
+    return {"project": projects[1], "batch": batches[BATCHES_PER_PROJECT], "user": users[2], "task": task_ids[-1]}
+
+
+def _plan(conn, stmt) -> list[str]:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "postgresql":
+        return [row[0] for row in conn.exec_driver_sql("EXPLAIN " + sql)]
+    return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_avoids_full_scan(plan_ids, name):
+    with engine.connect() as conn:
+        plan = _plan(conn, HOT_QUERIES[name](plan_ids))
+    scans = [line for line in plan if _FULL_SCAN.search(line)]
+    assert not scans, f"{name} scans a hot table:\n" + "\n".join(plan)
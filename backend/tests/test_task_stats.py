@@ -0,0 +1,47 @@
+"""Counter exactness when ORM transitions race Core writers (claims, lease release, reaper)."""
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import models, task_stats
+from app.claims import claim_next_tasks, release_unused_leases
+from app.database import SessionLocal, engine
+
+
+def test_orm_update_of_a_row_moved_by_core_fails_instead_of_miscounting(make_batch):
+    project_id, batch_id, (annotator,) = make_batch(1)
+    stale = SessionLocal()
+    writer = SessionLocal()
+    try:
+        task = stale.query(models.Task).filter(models.Task.batch_id == batch_id).one()  # loaded as L1 / pending
+        assert claim_next_tasks(writer, batch_id, annotator) == [task.id]
+        writer.commit()  # Core: pending -> in_progress, version_id bumped
+
+        task.status = "skipped"  # the after_flush diff would count this as pending -> skipped
+        with pytest.raises(StaleDataError):
+            stale.commit()
+        stale.rollback()
+    finally:
+        stale.close()
+        writer.close()
+    with engine.connect() as conn:
+        assert task_stats.check(conn, project_id) == []
+        assert task_stats.project_counts(conn, project_id)["in_progress"] == 1
+
+
+def test_orm_update_after_reload_counts_from_the_current_row(make_batch):
+    project_id, batch_id, (annotator,) = make_batch(3)
+    db = SessionLocal()
+    try:
+        (task_id,) = claim_next_tasks(db, batch_id, annotator)
+        db.commit()
+        task = db.get(models.Task, task_id)
+        task.status = "skipped"
+        db.commit()
+        assert release_unused_leases(db, user_id=annotator, batch_id=batch_id, expired_only=False) == 0
+        db.commit()
+    finally:
+        db.close()
+    with engine.connect() as conn:
+        assert task_stats.check(conn, project_id) == []
+        counts = task_stats.project_counts(conn, project_id)
+    assert (counts["pending"], counts["skipped"]) == (2, 1)
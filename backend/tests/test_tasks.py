@@ -0,0 +1,36 @@
+"""POST /tasks/bulk: chunked insert, every created task returned without an id list bound per item."""
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import auth, models
+from app.database import SessionLocal, engine
+from app.main import app
+
+client = TestClient(app)  # no lifespan: the conftest database is used as is
+
+
+def test_bulk_create_reselects_without_binding_every_id(make_batch):
+    _, batch_id, _ = make_batch(0)
+    db = SessionLocal()
+    try:
+        ops = models.User(email=f"bulk-ops-{batch_id}@test.local", hashed_password="-", role="ops_manager")
+        db.add(ops)
+        db.commit()
+        headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': str(ops.id), 'role': ops.role})}"}
+    finally:
+        db.close()
+    select_binds = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM tasks" in statement:
+            select_binds.append(len(parameters or ()))
+
+    n = 3000  # SQLite builds before 3.32 allow 999 bound parameters per statement, later ones 32766
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        r = client.post("/tasks/bulk", headers=headers, json={"batch_id": batch_id, "items": [{"i": i} for i in range(n)]})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert r.status_code == 200, r.text[:200]
+    assert [t["content"]["i"] for t in r.json()] == list(range(n))
+    assert select_binds and max(select_binds) < 10
@@ -45,4 +45,30 @@ export async function api(path, options = {}) {
   return data
 }
 
+/** Authenticated fetch returning the raw Response (streamed / binary downloads such as /export). */
+export async function apiFetch(path, options = {}) {
+  const url = path.startsWith('http') ? path : `${API_BASE}${path}`
+  const res = await fetch(url, {
+    ...options,
+    headers: { ...headers(), ...options.headers },
+  })
+  if (res.status === 401) {
+    logout()
+    window.location.reload()
+    throw new Error('Unauthorized')
+  }
+  if (!res.ok) {
+    const text = await res.text()
+    let msg = text || res.statusText
+    try {
+      const data = JSON.parse(text)
+      if (typeof data?.detail === 'string') msg = data.detail
+    } catch {
+      // not JSON
+    }
+    throw new Error(msg || 'Request failed')
+  }
+  return res
+}
+
 export { getToken, setToken }
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import JSZip from 'jszip'
-import { api } from '../api'
+import { api, apiFetch } from '../api'
 
 export function Export() {
   const [projects, setProjects] = useState([])
@@ -8,6 +8,8 @@ export function Export() {
   const [tasks, setTasks] = useState([])
   const [loading, setLoading] = useState(false)
   const [zipLoading, setZipLoading] = useState(false)
+  const [serverExporting, setServerExporting] = useState('')
+  const [error, setError] = useState('')
 
   useEffect(() => {
     api('/projects').then((p) => setProjects(Array.isArray(p) ? p : [])).catch(() => setProjects([]))
@@ -19,22 +21,24 @@ export function Export() {
       return
     }
     setLoading(true)
-    api(`/tasks?project_id=${selectedProjectId}`)
-      .then(async (taskList) => {
-        const list = Array.isArray(taskList) ? taskList : []
-        const withAnnotations = await Promise.all(
-          list.map(async (t) => {
-            try {
-              const anns = await api(`/tasks/${t.id}/annotations`)
-              return { ...t, annotations: Array.isArray(anns) ? anns : [] }
-            } catch {
-              return { ...t, annotations: [] }
-            }
+    setError('')
+    // One streamed server-side export (tasks + every annotation) instead of one /annotations call per task
+    apiFetch(`/export/projects/${selectedProjectId}?format=jsonl&include=all_annotations`)
+      .then((res) => res.text())
+      .then((text) => {
+        const list = text
+          .split('\n')
+          .filter(Boolean)
+          .map((line) => {
+            const row = JSON.parse(line)
+            return { ...row, id: row.task_id, annotations: row.annotations || [] }
           })
-        )
-        setTasks(withAnnotations)
+        setTasks(list)
+      })
+      .catch((err) => {
+        setTasks([])
+        setError(err.message || 'Failed to load tasks')
       })
-      .catch(() => setTasks([]))
       .finally(() => setLoading(false))
   }, [selectedProjectId])
 
@@ -79,6 +83,27 @@ export function Export() {
     URL.revokeObjectURL(url)
   }
 
+  /** Server-side streamed export (JSONL, or ZIP with tasks.jsonl + manifest.json). The server streams it, but the
+   *  download needs the auth header, so the file is buffered in the page (res.blob()) before it is saved. */
+  const handleServerExport = async (format) => {
+    setServerExporting(format)
+    setError('')
+    try {
+      const res = await apiFetch(`/export/projects/${selectedProjectId}?format=${format}`)
+      const blob = await res.blob()
+      const url = URL.createObjectURL(blob)
+      const a = document.createElement('a')
+      a.href = url
+      a.download = `export-project-${selectedProjectId}-${new Date().toISOString().slice(0, 10)}.${format}`
+      a.click()
+      URL.revokeObjectURL(url)
+    } catch (err) {
+      setError(err.message || 'Export failed')
+    } finally {
+      setServerExporting('')
+    }
+  }
+
   /** Option 2: ZIP with images + JSON. JSON references image filenames placed inside the zip. */
   const handleExportZip = async () => {
     setZipLoading(true)
@@ -150,6 +175,7 @@ export function Export() {
             <p className="meta" style={{ marginTop: '0.5rem' }}>
               {loading ? 'Loading…' : `${tasks.length} task(s) with annotations`}
             </p>
+            {error && <div className="login-error" style={{ marginTop: '0.5rem' }}>{error}</div>}
             <div style={{ display: 'flex', flexDirection: 'column', gap: '0.75rem', marginTop: '1rem' }}>
               <div>
                 <strong>1. JSON (metadata + image path/link only)</strong>
@@ -165,6 +191,18 @@ export function Export() {
                   {zipLoading ? 'Building ZIP…' : 'Download ZIP (images + JSON)'}
                 </button>
               </div>
+              <div>
+                <strong>3. Server export (JSONL / ZIP)</strong>
+                <p className="meta" style={{ marginTop: '0.25rem' }}>Streamed by the server: one line per task with its latest annotation. Best for large projects.</p>
+                <div style={{ display: 'flex', gap: '0.5rem' }}>
+                  <button type="button" className="btn btn-primary" onClick={() => handleServerExport('jsonl')} disabled={!!serverExporting}>
+                    {serverExporting === 'jsonl' ? 'Exporting…' : 'Download JSONL'}
+                  </button>
+                  <button type="button" className="btn btn-primary" onClick={() => handleServerExport('zip')} disabled={!!serverExporting}>
+                    {serverExporting === 'zip' ? 'Exporting…' : 'Download ZIP (JSONL + manifest)'}
+                  </button>
+                </div>
+              </div>
               <div style={{ borderTop: '1px solid var(--border)', paddingTop: '0.75rem' }}>
                 <button type="button" className="btn btn-secondary" onClick={handleExportFullJson} disabled={loading}>
                   Export full JSON (raw)